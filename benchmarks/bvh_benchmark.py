@@ -0,0 +1,92 @@
+"""
+Mede a BVH de objetos (construção, refit e consultas) com cenas de vários tamanhos e compara
+as consultas com o teste de todos os objetos, um por vez e vetorizado.
+Uso: python benchmarks/bvh_benchmark.py [N ...]
+"""
+import os
+import sys
+import timeit
+import numpy as np
+import glm
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from objects.transformstore import TransformStore
+from objects.bvh import BoundingVolumeHierarchy
+from rendering.frustum import Frustum
+
+def best(function, repeat: int = 5) -> float:
+    return min(timeit.repeat(function, number=1, repeat=repeat))
+
+def report(name: str, loop_time: float | None, vectorized_time: float, bvh_time: float) -> None:
+    loop = f"loop {loop_time * 1e3:8.2f}ms  " if loop_time is not None else " " * 19
+    print(f"  {name:<22} {loop}vetorizado {vectorized_time * 1e3:7.2f}ms  bvh {bvh_time * 1e3:7.2f}ms")
+
+def make_scene(count: int, rng: np.random.Generator) -> TransformStore:
+    """Objetos espalhados numa área de 1000 x 1000 unidades, com tamanhos entre 0.5 e 4."""
+    store = TransformStore()
+    for _ in range(count):
+        node = store.allocate()
+        half_size = rng.uniform(0.25, 2, 3)
+        store.set_bounds(node, -half_size, half_size)
+    store.positions[:count] = rng.uniform([-500, 0, -500], [500, 50, 500], (count, 3))
+    store.local_dirty[:count] = True
+    store.world_dirty[:count] = True
+    store.has_dirty = True
+    return store
+
+def main(counts: list[int]) -> None:
+    rng = np.random.default_rng(0)
+    view = np.array(glm.lookAt(glm.vec3(0, 20, 0), glm.vec3(1, 20, 0.3), glm.vec3(0, 1, 0)))
+    projection = np.array(glm.perspective(np.deg2rad(45), 16 / 9, 0.1, 300))
+    frustum = Frustum(view, projection)
+    sphere_center, sphere_radius = np.array([10, 5, 10], dtype=np.float32), 30
+    ray_origin, ray_direction = np.array([-500, 10, 0], dtype=np.float32), np.array([1, 0, 0.01], dtype=np.float32)
+
+    for count in counts:
+        store = make_scene(count, rng)
+        bvh = BoundingVolumeHierarchy(store)
+        centers, extents = store.get_node_bounds()
+        aabb_min, aabb_max = centers - extents, centers + extents
+        nodes = np.arange(count)
+
+        print(f"{count} objetos")
+        build_time = best(lambda: bvh.build(nodes, aabb_min, aabb_max))
+        print(f"  {'construção':<22} {build_time * 1e3:7.2f}ms")
+
+        # Refit: 5% dos objetos se movem um pouco por frame
+        moving = rng.choice(count, count // 20, replace=False)
+        def move():
+            store.positions[moving] += rng.uniform(-1, 1, (len(moving), 3)).astype(np.float32)
+            store.mark_dirty(moving)
+            bvh.update()
+        rebuilds = bvh.rebuilds
+        print(f"  {'refit (5% movendo)':<22} {best(move) * 1e3:7.2f}ms  ({bvh.rebuilds - rebuilds} reconstruções em 5 frames)")
+        centers, extents = store.get_node_bounds()
+
+        # Frustum
+        def frustum_loop():
+            return [node for node in nodes if frustum.test_aabbs(centers[node:node + 1], extents[node:node + 1])[0]]
+        frustum_vectorized = lambda: np.flatnonzero(frustum.test_aabbs(centers, extents))
+        assert np.array_equal(np.sort(bvh.query_frustum(frustum)), frustum_vectorized())
+        report(f"frustum ({len(frustum_vectorized())})", best(frustum_loop, 1) if count <= 20000 else None,
+               best(frustum_vectorized), best(lambda: bvh.query_frustum(frustum)))
+
+        # Esfera
+        def sphere_vectorized():
+            closest = np.clip(sphere_center, centers - extents, centers + extents)
+            return np.flatnonzero(np.sum((closest - sphere_center) ** 2, axis=1) <= sphere_radius ** 2)
+        assert np.array_equal(np.sort(bvh.query_sphere(sphere_center, sphere_radius)), sphere_vectorized())
+        report(f"esfera ({len(sphere_vectorized())})", None, best(sphere_vectorized), best(lambda: bvh.query_sphere(sphere_center, sphere_radius)))
+
+        # Raio
+        def ray_vectorized():
+            with np.errstate(divide='ignore', invalid='ignore'):
+                t1 = (centers - extents - ray_origin) / ray_direction
+                t2 = (centers + extents - ray_origin) / ray_direction
+            t_near, t_far = np.max(np.fmin(t1, t2), axis=1), np.min(np.fmax(t1, t2), axis=1)
+            return np.flatnonzero((t_near <= t_far) & (t_far >= 0))
+        assert np.array_equal(np.sort(bvh.query_ray(ray_origin, ray_direction)[0]), ray_vectorized())
+        report(f"raio ({len(ray_vectorized())})", None, best(ray_vectorized), best(lambda: bvh.query_ray(ray_origin, ray_direction)))
+
+if __name__ == "__main__":
+    main([int(arg) for arg in sys.argv[1:]] or [1000, 10000, 50000])
@@ -0,0 +1,55 @@
+"""
+Compara as funções vetorizadas de matrixmath com as originais (uma matriz por chamada).
+Uso: python benchmarks/matrixmath_benchmark.py [N]
+"""
+import os
+import sys
+import timeit
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from matrixmath import *
+
+def report(name: str, old_time: float, new_time: float, count: int) -> None:
+    print(f"{name:<28} antigo {old_time / count * 1e6:8.2f}us  novo {new_time / count * 1e6:8.2f}us  ({old_time / new_time:5.1f}x)")
+
+def main(count: int = 10000, repeat: int = 3) -> None:
+    rng = np.random.default_rng(0)
+    positions = rng.uniform(-10, 10, (count, 3)).astype(np.float32)
+    rotations = rng.uniform(-np.pi, np.pi, (count, 3)).astype(np.float32)
+    scales = rng.uniform(0.5, 2, (count, 3)).astype(np.float32)
+    points = rng.uniform(-1, 1, (count, 3)).astype(np.float32)
+    matrix = compose_trs(positions[0], rotations[0], scales[0])
+
+    single_out = np.empty((4, 4), dtype=np.float32)
+    batch_out = np.empty((count, 4, 4), dtype=np.float32)
+    points_out = np.empty((count, 3), dtype=np.float32)
+
+    def old_trs():
+        for t, r, s in zip(positions, rotations, scales):
+            multiply_transformations([translation_matrix(t), rotation_matrix_all(r), scale_matrix(s)])
+
+    def new_trs_single():
+        for t, r, s in zip(positions, rotations, scales):
+            compose_trs(t, r, s, out=single_out)
+
+    def old_points():
+        for point in points:
+            transform_vector(point, matrix)
+
+    print(f"{count} transformações, melhor de {repeat} execuções")
+    old_time = min(timeit.repeat(old_trs, number=1, repeat=repeat))
+    report("TRS (uma por chamada)", old_time, min(timeit.repeat(new_trs_single, number=1, repeat=repeat)), count)
+    report("TRS (lote, out=)", old_time, min(timeit.repeat(lambda: compose_trs(positions, rotations, scales, out=batch_out), number=1, repeat=repeat)), count)
+
+    old_time = min(timeit.repeat(old_points, number=1, repeat=repeat))
+    report("pontos (lote, out=)", old_time, min(timeit.repeat(lambda: transform_points(points, matrix, out=points_out), number=1, repeat=repeat)), count)
+
+    # Verifica que os resultados são equivalentes
+    reference = multiply_transformations([translation_matrix(positions[0]), rotation_matrix_all(rotations[0]), scale_matrix(scales[0])])
+    assert np.allclose(batch_out[0], reference, atol=1e-5)
+    assert np.allclose(compose_trs(positions[0], rotations[0], scales[0]), reference, atol=1e-5)
+    assert np.allclose(points_out[0], transform_vector(points[0], matrix), atol=1e-5)
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 10000)
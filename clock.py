@@ -0,0 +1,68 @@
+import math
+import time
+from typing import Iterator
+
+class Clock:
+    """
+    Relógio da simulação, passado para os update dos objetos.
+
+    A simulação avança em passos fixos de fixed_delta_time: o tempo real de cada frame (multiplicado
+    por time_scale) é acumulado e consumido em passos inteiros, então a simulação não depende da taxa
+    de quadros. O que sobra no acumulador vira alpha, a fração do próximo passo já decorrida,
+    usada para interpolar as transformações entre os dois últimos passos na renderização.
+    """
+    def __init__(self, fixed_delta_time: float = 1 / 60, time_scale: float = 1.0, max_steps: int = 5):
+        self.fixed_delta_time = fixed_delta_time
+        self.time_scale = time_scale
+        self.max_steps = max_steps
+        'Máximo de passos por frame: em frames muito longos o excesso é descartado, para a simulação não ficar cada vez mais atrasada.'
+
+        self.time = 0.0
+        'Tempo da simulação, em segundos, no fim do passo atual.'
+        self.step_count = 0
+        self.alpha = 0.0
+        self._accumulator = 0.0
+        self._pending_steps = 0
+
+    @property
+    def delta_time(self) -> float:
+        """Duração de um passo da simulação."""
+        return self.fixed_delta_time
+
+    def advance(self, real_delta_time: float) -> int:
+        """Acumula o tempo real de um frame e retorna quantos passos devem ser simulados."""
+        self._accumulator += real_delta_time * self.time_scale
+        steps = int(self._accumulator // self.fixed_delta_time)
+        if steps > self.max_steps:
+            steps = self.max_steps
+            self._accumulator = 0.0
+        else:
+            self._accumulator -= steps * self.fixed_delta_time
+        self.alpha = self._accumulator / self.fixed_delta_time
+        self._pending_steps += steps
+        return steps
+
+    def fast_forward(self, seconds: float) -> int:
+        """Agenda os passos de seconds de simulação de uma vez, sem limite de passos nem tempo real (modo headless)."""
+        steps = math.ceil(seconds / self.fixed_delta_time - 1e-9)
+        self._pending_steps += steps
+        return steps
+
+    def steps(self) -> Iterator[float]:
+        """Consome os passos pendentes, avançando o tempo antes de cada um. Retorna o delta_time de cada passo."""
+        while self._pending_steps > 0:
+            self._pending_steps -= 1
+            self.time += self.fixed_delta_time
+            self.step_count += 1
+            yield self.fixed_delta_time
+
+def simulate(update: callable, clock: Clock, seconds: float) -> float:
+    """
+    Simula seconds de tempo o mais rápido possível, chamando update(clock) a cada passo,
+    e retorna o tempo real gasto, em segundos. Usado em benchmarks e testes determinísticos.
+    """
+    start = time.perf_counter()
+    clock.fast_forward(seconds)
+    for _ in clock.steps():
+        update(clock)
+    return time.perf_counter() - start
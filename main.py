@@ -10,11 +10,23 @@ from rendering.renderer import Renderer
 from camera import Camera
 from scene import Scene
 from rendering.mesh import loaded_meshes
+from rendering.textureregistry import texture_registry
+from objects.transformstore import transform_store
+from objects.scenesnapshot import SnapshotBuffer
+from simulationthread import SimulationThread
+from clock import Clock, simulate
 import numpy as np
+from functools import partial
+import argparse
+import time
 
-def main():
-    # Cria a janela configurada
-    window = Window(1920, 1080, "Bosque")
+def main(simulate_seconds: float | None = None, time_scale: float = 1.0, seed: int | None = None,
+         threaded: bool = False, benchmark_frames: int | None = None):
+    if seed is not None:
+        np.random.seed(seed) # Simulação reproduzível (partículas e pulos dos gnomos são aleatórios)
+
+    # Cria a janela configurada (sem esperar o monitor ao medir o tempo dos frames)
+    window = Window(1920, 1080, "Bosque", vsync=benchmark_frames is None)
     if (window.window == None):
         return
 
@@ -28,28 +40,78 @@ def main():
     # Cria o input para manipular a cena
     input = Input(window)
     scene_input = SceneInput(scene, renderer, input, window)
+    clock = Clock(time_scale=time_scale)
+
+    # Modo headless: simula o tempo pedido o mais rápido possível, sem renderizar, e sai
+    if simulate_seconds is not None:
+        elapsed = simulate(scene_input.update_step, clock, simulate_seconds)
+        print(f"Simulated {simulate_seconds}s ({clock.step_count} steps) in {elapsed * 1000:.1f}ms")
+        window.close()
+
+    # Modo com threads: a simulação de um frame roda em paralelo com a renderização do anterior,
+    # que lê só o snapshot publicado pela simulação
+    simulation = SimulationThread() if threaded else None
+    snapshots = SnapshotBuffer()
+
+    def simulate_frame(delta_time: float, camera_position: np.ndarray) -> None:
+        # Simula os passos fixos que couberem no tempo do frame e interpola as transformações entre os dois últimos
+        clock.advance(delta_time)
+        scene_input.update_steps(clock)
+        scene.skybox.set_pos(camera_position)
+        transform_store.interpolate(clock.alpha)
 
+    def simulate_and_publish(delta_time: float, camera_position: np.ndarray):
+        simulate_frame(delta_time, camera_position)
+        return snapshots.publish(transform_store, scene.get_all_lights(), scene.particle_systems, clock.step_count)
+
+    frame_count = 0
+    start_time = time.perf_counter()
     while not window.should_close():
         window.pre_render()
         delta_time = window.delta_time
 
-        # Atualiza inputs
+        # Continua o envio de texturas carregadas em segundo plano
+        texture_registry.update()
+
+        # Atualiza inputs e a simulação
         camera.update(input, delta_time)
-        scene_input.update(delta_time)
+        scene_input.update_editables(delta_time)
+        if simulation is None:
+            simulate_frame(delta_time, camera.position)
+        else:
+            # O skybox segue a posição da câmera do início do frame (cópia, já que a câmera continua mudando)
+            snapshot = simulation.run_frame(partial(simulate_and_publish, delta_time, camera.position.copy()))
+            renderer.set_snapshot(snapshot if snapshot is not None else simulation.wait())
         input.clear_deltas()
-        
+
         # Renderiza a cena
-        scene.skybox.set_pos(camera.position)
         scene.render_scene(renderer, camera)
         window.post_render()
 
+        frame_count += 1
+        if benchmark_frames is not None and frame_count == benchmark_frames:
+            elapsed = time.perf_counter() - start_time
+            mode = "threaded" if threaded else "serial"
+            print(f"Rendered {frame_count} frames in {elapsed * 1000:.1f}ms ({elapsed / frame_count * 1000:.2f}ms/frame, {mode})")
+            window.close()
+
+    if simulation is not None:
+        simulation.stop()
     for mesh in loaded_meshes.values():
         mesh.destroy()
+    texture_registry.destroy()
     scene.container.destroy()
     renderer.destroy()
     window.destroy()
 
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--simulate', type=float, metavar='SECONDS', help="simula SECONDS segundos sem renderizar e sai")
+    parser.add_argument('--time-scale', type=float, default=1.0, help="velocidade da simulação em relação ao tempo real")
+    parser.add_argument('--seed', type=int, help="semente dos números aleatórios, para simulações reproduzíveis")
+    parser.add_argument('--threaded', action='store_true', help="simula em uma thread separada, em paralelo com a renderização")
+    parser.add_argument('--benchmark', type=int, metavar='FRAMES', help="renderiza FRAMES frames sem vsync, mostra o tempo médio por frame e sai")
+    args = parser.parse_args()
+    main(args.simulate, args.time_scale, args.seed, args.threaded, args.benchmark)
     
@@ -1,3 +1,4 @@
+import math
 import numpy as np
 from typing import List
 
@@ -70,4 +71,137 @@ def translation_matrix(position: np.ndarray) -> np.ndarray:
 
 def transform_vector(vector: np.ndarray, matrix: np.ndarray) -> np.ndarray:
     """Aplica uma matriz de transformação 4x4 em um vetor 3D."""
-    return (matrix @ np.array([*vector, 1]))[:-1]
\ No newline at end of file
+    return (matrix @ np.array([*vector, 1]))[:-1]
+
+def compose_trs(translation: np.ndarray, rotation: np.ndarray, scale: np.ndarray, out: np.ndarray | None = None) -> np.ndarray:
+    """
+    Monta translação * rotação (Euler XYZ, em radianos) * escala diretamente, sem multiplicar matrizes.
+    Equivale a multiply_transformations([translation_matrix(t), rotation_matrix_all(r), scale_matrix(s)]).
+    Aceita vetores (3,) ou lotes (N, 3), retornando uma matriz float32 (4, 4) ou um lote (N, 4, 4).
+    Se out for fornecido, o resultado é escrito nele.
+    """
+    if np.ndim(rotation) == 1 and np.ndim(translation) == 1 and np.ndim(scale) == 1:
+        return _compose_trs_single(translation, rotation, scale, out)
+
+    return _compose_linear(translation, euler_rotation_matrices(rotation), scale, out)
+
+def euler_rotation_matrices(rotation: np.ndarray) -> np.ndarray:
+    """Matrizes de rotação 3x3 (Rx * Ry * Rz) de ângulos de Euler em radianos, de forma (3,) ou (N, 3)."""
+    rotation = np.asarray(rotation, dtype=np.float32)
+    c, s = np.cos(rotation), np.sin(rotation)
+    ca, cb, cc = c[..., 0], c[..., 1], c[..., 2]
+    sa, sb, sc = s[..., 0], s[..., 1], s[..., 2]
+
+    linear = np.empty(rotation.shape[:-1] + (3, 3), dtype=np.float32)
+    linear[..., 0, 0] = cb * cc
+    linear[..., 0, 1] = -cb * sc
+    linear[..., 0, 2] = sb
+    linear[..., 1, 0] = sa * sb * cc + ca * sc
+    linear[..., 1, 1] = ca * cc - sa * sb * sc
+    linear[..., 1, 2] = -sa * cb
+    linear[..., 2, 0] = sa * sc - ca * sb * cc
+    linear[..., 2, 1] = ca * sb * sc + sa * cc
+    linear[..., 2, 2] = ca * cb
+    return linear
+
+def euler_rotation_components(angles: np.ndarray) -> np.ndarray:
+    """
+    Igual a euler_rotation_matrices para ângulos de forma (3, N) (um eixo por linha), retornando (3, 3, N):
+    cada elemento das matrizes é um array contíguo, o que deixa as operações em lote bem mais rápidas.
+    """
+    angles = np.asarray(angles, dtype=np.float32)
+    (ca, cb, cc), (sa, sb, sc) = np.cos(angles), np.sin(angles)
+    components = np.empty((3, 3) + angles.shape[1:], dtype=np.float32)
+    components[0, 0] = cb * cc
+    components[0, 1] = -cb * sc
+    components[0, 2] = sb
+    components[1, 0] = sa * sb * cc + ca * sc
+    components[1, 1] = ca * cc - sa * sb * sc
+    components[1, 2] = -sa * cb
+    components[2, 0] = sa * sc - ca * sb * cc
+    components[2, 1] = ca * sb * sc + sa * cc
+    components[2, 2] = ca * cb
+    return components
+
+def _compose_trs_single(translation: np.ndarray, rotation: np.ndarray, scale: np.ndarray, out: np.ndarray | None) -> np.ndarray:
+    """compose_trs para uma única matriz, com aritmética escalar (mais rápida que operações em arrays de 3 elementos)."""
+    a, b, c = (float(angle) for angle in rotation)
+    x, y, z = (float(value) for value in scale)
+    ca, cb, cc = math.cos(a), math.cos(b), math.cos(c)
+    sa, sb, sc = math.sin(a), math.sin(b), math.sin(c)
+    if out is None:
+        out = np.empty((4, 4), dtype=np.float32)
+    out[:] = (
+        (cb * cc * x, -cb * sc * y, sb * z, translation[0]),
+        ((sa * sb * cc + ca * sc) * x, (ca * cc - sa * sb * sc) * y, -sa * cb * z, translation[1]),
+        ((sa * sc - ca * sb * cc) * x, (ca * sb * sc + sa * cc) * y, ca * cb * z, translation[2]),
+        (0, 0, 0, 1),
+    )
+    return out
+
+def compose_trs_quaternion(translation: np.ndarray, quaternion: np.ndarray, scale: np.ndarray, out: np.ndarray | None = None) -> np.ndarray:
+    """
+    Igual a compose_trs, mas com a rotação dada por quatérnios (x, y, z, w), de forma (4,) ou (N, 4).
+    Os quatérnios são normalizados antes do uso.
+    """
+    quaternion = np.asarray(quaternion, dtype=np.float32)
+    quaternion = quaternion / np.linalg.norm(quaternion, axis=-1, keepdims=True)
+    x, y, z, w = quaternion[..., 0], quaternion[..., 1], quaternion[..., 2], quaternion[..., 3]
+
+    linear = np.empty(quaternion.shape[:-1] + (3, 3), dtype=np.float32)
+    linear[..., 0, 0] = 1 - 2 * (y * y + z * z)
+    linear[..., 0, 1] = 2 * (x * y - z * w)
+    linear[..., 0, 2] = 2 * (x * z + y * w)
+    linear[..., 1, 0] = 2 * (x * y + z * w)
+    linear[..., 1, 1] = 1 - 2 * (x * x + z * z)
+    linear[..., 1, 2] = 2 * (y * z - x * w)
+    linear[..., 2, 0] = 2 * (x * z - y * w)
+    linear[..., 2, 1] = 2 * (y * z + x * w)
+    linear[..., 2, 2] = 1 - 2 * (x * x + y * y)
+    return _compose_linear(translation, linear, scale, out)
+
+def _compose_linear(translation: np.ndarray, linear: np.ndarray, scale: np.ndarray, out: np.ndarray | None) -> np.ndarray:
+    """Completa a matriz 4x4 a partir da rotação 3x3: escala as colunas e insere a translação."""
+    translation = np.asarray(translation, dtype=np.float32)
+    scale = np.asarray(scale, dtype=np.float32)
+    shape = np.broadcast_shapes(translation.shape[:-1], linear.shape[:-2], scale.shape[:-1])
+    if out is None:
+        out = np.empty(shape + (4, 4), dtype=np.float32)
+
+    np.multiply(linear, scale[..., None, :], out=out[..., :3, :3])
+    out[..., :3, 3] = translation
+    out[..., 3, :3] = 0
+    out[..., 3, 3] = 1
+    return out
+
+def transform_points(points: np.ndarray, matrix: np.ndarray, out: np.ndarray | None = None) -> np.ndarray:
+    """
+    Aplica uma matriz de transformação 4x4 em vários pontos 3D (N, 3) de uma vez,
+    sem montar coordenadas homogêneas. Se out for fornecido, o resultado é escrito nele.
+    """
+    points = np.asarray(points, dtype=np.float32)
+    matrix = np.asarray(matrix, dtype=np.float32)
+    out = np.matmul(points, matrix[:3, :3].T, out=out)
+    out += matrix[:3, 3]
+    return out
+
+def normal_matrices(matrices: np.ndarray) -> np.ndarray:
+    """
+    Matrizes de normal (inversa transposta da parte 3x3) de matrizes 4x4, de forma (4, 4) ou (N, 4, 4).
+    Usa a matriz de cofatores dividida pelo determinante, que não falha para matrizes singulares
+    (escala zero): nesse caso os cofatores são usados sem dividir.
+    """
+    matrices = np.asarray(matrices, dtype=np.float32)
+    # Componentes contíguos (3, 3, N), bem mais rápidos que acessar cada elemento das matrizes
+    m = np.ascontiguousarray(np.moveaxis(matrices[..., :3, :3], (-2, -1), (0, 1)))
+    cofactors = np.empty_like(m)
+    # Cofator (i, j) = produto cruzado das linhas que não são i, nas colunas que não são j
+    for i in range(3):
+        r1, r2 = m[(i + 1) % 3], m[(i + 2) % 3]
+        for j in range(3):
+            j1, j2 = (j + 1) % 3, (j + 2) % 3
+            cofactors[i, j] = r1[j1] * r2[j2] - r1[j2] * r2[j1]
+
+    determinants = np.asarray(m[0, 0] * cofactors[0, 0] + m[0, 1] * cofactors[0, 1] + m[0, 2] * cofactors[0, 2])
+    cofactors /= np.where(determinants == 0, 1, determinants)
+    return np.ascontiguousarray(np.moveaxis(cofactors, (0, 1), (-2, -1)))
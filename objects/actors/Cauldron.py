@@ -2,6 +2,7 @@ from objects.object import Object
 from objects.meshobject import MeshObject
 from objects.particlesystem import ParticleSystem
 from input import Input
+from clock import Clock
 import numpy as np
 import glfw
 
@@ -45,10 +46,10 @@ class Cauldron(Object):
         self.particle_system.set_pos([0, 5, 0])
         self.add_child(self.particle_system)
     
-    def update(self, input: Input, delta_time: float) -> None:
-        super().update(input, delta_time)
-        self.t += delta_time
-        self.state_t += delta_time
+    def update(self, input: Input, clock: Clock) -> None:
+        super().update(input, clock)
+        self.t += clock.delta_time
+        self.state_t += clock.delta_time
         self.states[self.state](input)
 
     ### ESTADOS ###
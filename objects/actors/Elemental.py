@@ -1,7 +1,7 @@
 from objects.meshobject import MeshObject
 from objects.object import Object
-import glfw
 import numpy as np
+from clock import Clock
 from objects.lightobject import LightObject
 from rendering.lightdata import LightData
 from rendering.litmode import LitMode
@@ -28,10 +28,10 @@ class Elemental(Object):
 
         self.hovering = False
     
-    def update(self, input, delta_time):
-        super().update(input, delta_time)
+    def update(self, input, clock: Clock):
+        super().update(input, clock)
         #flutuar
-        y_shift = np.sin(glfw.get_time() * self.hovering_frequency*2) * .15
+        y_shift = np.sin(clock.time * self.hovering_frequency*2) * .15
         self.set_pos([self.position[0], self.anchor_y + y_shift, self.position[2]])
 
     #começa ou para de flutuar
@@ -5,7 +5,7 @@ from rendering.lightdata import LightData
 from editablevalue import EditableValueGroup, EditableValue
 from rendering.litmode import LitMode
 import numpy as np
-import glfw
+from clock import Clock
 
 class Firefly(Object):
     def __init__(self):
@@ -48,28 +48,28 @@ class Firefly(Object):
         self.anchor_y = self.position[1]
 
     
-    def update(self, *args) -> None:
-        super().update(*args)
+    def update(self, input, clock: Clock) -> None:
+        super().update(input, clock)
 
-        x, z, rot = self._get_fly_xz_rot()
-        y = self._get_hover_y()
+        x, z, rot = self._get_fly_xz_rot(clock.time)
+        y = self._get_hover_y(clock.time)
         self.set_pos([x, y, z])
         self.set_rot_rad(rot)
 
     
-    def _get_fly_xz_rot(self) -> tuple[float, float]:
+    def _get_fly_xz_rot(self, time: float) -> tuple[float, float]:
         if not self.is_flying:
             return self.position[0], self.position[2], self.rotation
         
-        time = glfw.get_time() * self.fly_frequency
+        time = time * self.fly_frequency
         x = np.sin(time) * self.fly_radius + self.fly_center[0]
         z = np.cos(time) * self.fly_radius + self.fly_center[2]
         return x, z, [0, time + np.pi / 2, 0]
 
-    def _get_hover_y(self) -> float:
+    def _get_hover_y(self, time: float) -> float:
         if not self.is_hovering:
             return self.position[1]
 
         anchor_y = self.fly_center[1] if self.is_flying else self.anchor_y
-        time = glfw.get_time() * self.hover_frequency
+        time = time * self.hover_frequency
         return np.sin(time) * self.hover_amplitude + anchor_y
\ No newline at end of file
@@ -1,6 +1,7 @@
 import objects.meshobject as meshobject
 import objects.object as object
 from input import Input
+from clock import Clock
 import glfw
 class FrogCrowned(object.Object):
     def __init__(self, increase_key = glfw.KEY_UP, decrease_key=glfw.KEY_DOWN, max_size=1.6, min_size=0.25) -> None:
@@ -25,7 +26,8 @@ class FrogCrowned(object.Object):
         self.set_scale_single(self.objects_scale)
 
 
-    def update(self, input : Input, delta_time: float) -> None:
+    def update(self, input : Input, clock: Clock) -> None:
+        delta_time = clock.delta_time
         updated_scale = self.objects_scale
         if input.is_key_held(self.increase_key):
             updated_scale = self.objects_scale + 0.8 * delta_time
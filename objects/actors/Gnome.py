@@ -1,6 +1,7 @@
 import objects.meshobject as meshobject
 import glfw
 from input import Input
+from clock import Clock
 import numpy as np
 
 
@@ -12,10 +13,21 @@ class Gnome(meshobject.MeshObject):
         self.ground_y = ground_y
         self.gravity = gravity
         self.jump_key = jump_key
-        self.auto_jump = False
+        self._auto_jump = False
         self.will_jump = False
         self.jump_interval = 0.0
         self.jump_max = jump_max
+
+    @property
+    def auto_jump(self) -> bool:
+        return self._auto_jump
+
+    @auto_jump.setter
+    def auto_jump(self, value: bool) -> None:
+        self._auto_jump = value
+        if value:
+            self.wake()
+
     def jump(self,delta_time : float, velocity=0.25, ) -> None:
         #esperando dar o intervalo aleatório do pulo
         if self.on_ground:
@@ -40,7 +52,8 @@ class Gnome(meshobject.MeshObject):
         self.jump_interval = np.random.random() * 50
 
     
-    def update(self, input : Input, delta_time: float) -> None:
+    def update(self, input : Input, clock: Clock) -> None:
+        delta_time = clock.delta_time
         #detecta para começar o pulo
         if (input.is_key_held(self.jump_key) or self.auto_jump) and self.on_ground and self.will_jump == False:
             self.start_jump()
@@ -53,4 +66,8 @@ class Gnome(meshobject.MeshObject):
         #aplica velocidade em y
         self.velocity[1] += self.gravity * delta_time
         self.stop_on_ground()
-        self.set_pos(self.position + self.velocity)
\ No newline at end of file
+        self.set_pos(self.position + self.velocity)
+
+        # Parado no chão, o gnomo dorme até a tecla de pulo ser pressionada (ver SceneInput) ou auto_jump ser ligado
+        if self.on_ground and not self.will_jump and not self.auto_jump and not input.is_key_held(self.jump_key):
+            self.sleep()
\ No newline at end of file
@@ -0,0 +1,177 @@
+import numpy as np
+from rendering.frustum import Frustum
+from objects.transformstore import TransformStore
+
+MORTON_BITS = 10
+'Bits por eixo do código de Morton usado para ordenar as folhas na construção.'
+
+class BoundingVolumeHierarchy:
+    """
+    Hierarquia de AABBs sobre os nós com geometria do TransformStore, para consultas espaciais
+    (frustum, esfera e raio) sem testar todos os objetos.
+
+    A árvore é binária e implícita, como um heap: a raiz é o índice 1, os filhos de i são 2i e 2i + 1
+    e as folhas ocupam [size, 2 * size), com as folhas ordenadas pelo código de Morton do centro.
+    Assim a construção, o refit e as consultas são feitos nível a nível com operações vetorizadas.
+
+    Cada folha guarda uma AABB "gorda" (expandida por margin): enquanto a AABB real do objeto continua
+    dentro dela, o movimento não altera a árvore. Folhas que saem são atualizadas junto com seus
+    ancestrais (refit incremental), e a árvore é reconstruída quando objetos entram ou saem ou quando
+    muitas folhas já foram movidas desde a última construção.
+    """
+    def __init__(self, store: TransformStore, margin: float = 1.0, rebuild_ratio: float = 0.5):
+        self.store = store
+        self.margin = margin
+        self.rebuild_ratio = rebuild_ratio
+        'Fração de folhas movidas (desde a construção) a partir da qual a ordem das folhas é refeita.'
+
+        self.version = -1
+        'Versão do store usada no último update.'
+        self.size = 1
+        self.leaf_nodes = np.zeros(0, dtype=np.int64)
+        'Id do nó do store de cada folha, na ordem da árvore.'
+        self.moved_since_build = 0
+        self.rebuilds = 0
+        self.refitted_leaves = 0
+        'Folhas atualizadas no último update (para estatísticas).'
+
+        self.box_min = np.full((2, 3), np.inf, dtype=np.float32)
+        self.box_max = np.full((2, 3), -np.inf, dtype=np.float32)
+        self.tight_min = np.zeros((0, 3), dtype=np.float32)
+        self.tight_max = np.zeros((0, 3), dtype=np.float32)
+
+    def update(self) -> None:
+        """Sincroniza a árvore com o store. Chamado automaticamente pelas consultas."""
+        if self.version == self.store.version and not self.store.has_dirty:
+            return
+        centers, extents = self.store.get_node_bounds()
+        self.version = self.store.version
+
+        count = self.store.count
+        nodes = np.flatnonzero(self.store.alive[:count] & self.store.has_bounds[:count])
+        if len(nodes) != len(self.leaf_nodes) or np.any(np.sort(self.leaf_nodes) != nodes):
+            self.build(nodes, centers[nodes] - extents[nodes], centers[nodes] + extents[nodes])
+            return
+
+        nodes = self.leaf_nodes
+        self.tight_min[:] = centers[nodes] - extents[nodes]
+        self.tight_max[:] = centers[nodes] + extents[nodes]
+        leaves = self.size + np.arange(len(nodes))
+        moved = np.flatnonzero(np.any(self.tight_min < self.box_min[leaves], axis=1) | np.any(self.tight_max > self.box_max[leaves], axis=1))
+        self.refitted_leaves = len(moved)
+        if len(moved) == 0:
+            return
+
+        self.moved_since_build += len(moved)
+        if self.moved_since_build > self.rebuild_ratio * len(nodes):
+            self.build(nodes, self.tight_min, self.tight_max)
+            return
+
+        self.box_min[self.size + moved] = self.tight_min[moved] - self.margin
+        self.box_max[self.size + moved] = self.tight_max[moved] + self.margin
+        parents = np.unique((self.size + moved) // 2)
+        while len(parents) > 0 and parents[0] >= 1:
+            self._refit(parents)
+            parents = np.unique(parents // 2)
+            parents = parents[parents >= 1]
+
+    def build(self, nodes: np.ndarray, aabb_min: np.ndarray, aabb_max: np.ndarray) -> None:
+        """Reconstrói a árvore com as folhas (ids do store) dadas, ordenadas pelo código de Morton."""
+        order = np.argsort(_morton_codes((aabb_min + aabb_max) / 2), kind='stable')
+        count = len(nodes)
+        self.leaf_nodes = np.asarray(nodes, dtype=np.int64)[order]
+        self.tight_min = np.asarray(aabb_min, dtype=np.float32)[order]
+        self.tight_max = np.asarray(aabb_max, dtype=np.float32)[order]
+
+        self.size = 1 << max(count - 1, 0).bit_length()
+        self.box_min = np.full((2 * self.size, 3), np.inf, dtype=np.float32)
+        self.box_max = np.full((2 * self.size, 3), -np.inf, dtype=np.float32)
+        self.box_min[self.size:self.size + count] = self.tight_min - self.margin
+        self.box_max[self.size:self.size + count] = self.tight_max + self.margin
+
+        level = self.size // 2
+        while level >= 1:
+            self._refit(np.arange(level, 2 * level))
+            level //= 2
+
+        self.moved_since_build = 0
+        self.refitted_leaves = count
+        self.rebuilds += 1
+
+    def query_frustum(self, frustum: Frustum) -> np.ndarray:
+        """Ids dos nós cuja AABB intersecta o frustum."""
+        def test(aabb_min, aabb_max):
+            return frustum.test_aabbs((aabb_min + aabb_max) / 2, (aabb_max - aabb_min) / 2)
+        return self.leaf_nodes[self._traverse(test)]
+
+    def query_sphere(self, center: np.ndarray, radius: float) -> np.ndarray:
+        """Ids dos nós cuja AABB intersecta a esfera (ex: o alcance de uma luz)."""
+        center = np.asarray(center, dtype=np.float32)
+        def test(aabb_min, aabb_max):
+            closest = np.clip(center, aabb_min, aabb_max)
+            return np.sum((closest - center) ** 2, axis=1) <= radius * radius
+        return self.leaf_nodes[self._traverse(test)]
+
+    def query_ray(self, origin: np.ndarray, direction: np.ndarray, max_distance: float = np.inf) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Ids dos nós cuja AABB é atingida pelo raio, do mais próximo para o mais distante,
+        e a distância (em unidades de direction) até a entrada em cada AABB.
+        """
+        origin = np.asarray(origin, dtype=np.float32)
+        with np.errstate(divide='ignore'):
+            inverse = 1 / np.asarray(direction, dtype=np.float32)
+
+        def entry_distances(aabb_min, aabb_max):
+            with np.errstate(invalid='ignore'):
+                t1 = (aabb_min - origin) * inverse
+                t2 = (aabb_max - origin) * inverse
+            t_near = np.max(np.fmin(t1, t2), axis=1)
+            t_far = np.min(np.fmax(t1, t2), axis=1)
+            return np.maximum(t_near, 0), (t_near <= t_far) & (t_far >= 0) & (t_near <= max_distance)
+
+        leaves = self._traverse(lambda aabb_min, aabb_max: entry_distances(aabb_min, aabb_max)[1])
+        distances = entry_distances(self.tight_min[leaves], self.tight_max[leaves])[0]
+        order = np.argsort(distances, kind='stable')
+        return self.leaf_nodes[leaves[order]], distances[order]
+
+    def _traverse(self, test) -> np.ndarray:
+        """
+        Desce a árvore nível a nível mantendo os nós que passam em test(mínimos, máximos),
+        e retorna os índices das folhas (na ordem da árvore) que passam também com a AABB real.
+        """
+        self.update()
+        count = len(self.leaf_nodes)
+        if count == 0:
+            return np.zeros(0, dtype=np.int64)
+
+        frontier = np.array([1], dtype=np.int64)
+        while True:
+            # Nós vazios (só folhas de preenchimento abaixo) têm mínimo > máximo
+            frontier = frontier[self.box_min[frontier, 0] <= self.box_max[frontier, 0]]
+            frontier = frontier[test(self.box_min[frontier], self.box_max[frontier])]
+            if len(frontier) == 0 or frontier[0] >= self.size:
+                break
+            frontier = (frontier[:, None] * 2 + np.arange(2)).reshape(-1)
+
+        leaves = frontier - self.size
+        return leaves[test(self.tight_min[leaves], self.tight_max[leaves])]
+
+    def _refit(self, ids: np.ndarray) -> None:
+        """Recalcula as AABBs dos nós internos a partir das dos filhos."""
+        self.box_min[ids] = np.minimum(self.box_min[2 * ids], self.box_min[2 * ids + 1])
+        self.box_max[ids] = np.maximum(self.box_max[2 * ids], self.box_max[2 * ids + 1])
+
+def _morton_codes(points: np.ndarray) -> np.ndarray:
+    """Código de Morton (intercalando MORTON_BITS bits de cada eixo) dos pontos, normalizados pela AABB do conjunto."""
+    if len(points) == 0:
+        return np.zeros(0, dtype=np.int64)
+    low = points.min(axis=0)
+    span = np.maximum(points.max(axis=0) - low, 1e-6)
+    scale = (1 << MORTON_BITS) - 1
+    quantized = ((points - low) / span * scale).astype(np.int64)
+
+    codes = np.zeros(len(points), dtype=np.int64)
+    for bit in range(MORTON_BITS):
+        for axis in range(3):
+            codes |= ((quantized[:, axis] >> bit) & 1) << (3 * bit + axis)
+    return codes
@@ -1,11 +1,16 @@
+import numpy as np
 from objects.object import Object
 from rendering.lightdata import LightData
+from objects.updatescheduler import TickGroup
 
 class LightObject(Object):
+    # Copia a posição depois que o objeto (ou o pai) se moveu no passo
+    tick_group = TickGroup.LATE
+
     def __init__(self, light_data: LightData):
         super().__init__()
         self.light_data = light_data
     
     def update(self, *args):
         super().update(*args)
-        self.light_data.world_position = self.world_position
\ No newline at end of file
+        self.light_data.world_position = np.array(self.world_position, dtype=np.float32)
\ No newline at end of file
@@ -1,15 +1,31 @@
 from OpenGL.GL import *
+import numpy as np
 from objects.object import Object
 from rendering.mesh import Mesh
 from rendering.renderer import Renderer
 from rendering.litmode import LitMode
+from rendering.trianglebvh import RayHits
+from objects.transformstore import transform_store
 
 class MeshObject(Object):
     def __init__(self, obj_sub_dir: str, default_texture_path: str | None = None, lit_mode: LitMode | None = None):
         super().__init__()
         self.mesh = Mesh.from_path(obj_sub_dir, default_texture_path)
         self.lit_mode = lit_mode
+        transform_store.set_bounds(self.node, self.mesh.aabb_min, self.mesh.aabb_max)
     
     def render(self, renderer: Renderer):
         super().render(renderer)
-        renderer.render_mesh(self.mesh, self.world_transformation_matrix, self.lit_mode)
\ No newline at end of file
+        if renderer.is_node_visible(self.node):
+            matrix, normal_matrix = self.get_render_matrices(renderer)
+            renderer.queue_mesh(self.mesh, matrix, self.lit_mode, key=self.node, normal_matrix=normal_matrix)
+
+    def raycast(self, origins: np.ndarray, directions: np.ndarray, max_distance: float = np.inf) -> RayHits:
+        """
+        Lança raios (origens e direções (R, 3) no espaço global) contra os triângulos do mesh.
+        As distâncias são em unidades de direction no espaço global, já que a transformação é afim.
+        """
+        inverse = np.linalg.inv(self.world_transformation_matrix).astype(np.float32)
+        local_origins = np.atleast_2d(origins) @ inverse[:3, :3].T + inverse[:3, 3]
+        local_directions = np.atleast_2d(directions) @ inverse[:3, :3].T
+        return self.mesh.get_triangle_bvh().intersect(local_origins, local_directions, max_distance)
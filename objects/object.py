@@ -3,48 +3,98 @@ import numpy as np
 from typing import List
 from matrixmath import *
 from rendering.renderer import Renderer
+from objects.transformstore import transform_store
+from objects.updatescheduler import update_scheduler, TickGroup
 
 class Object:
+    """
+    Nó da hierarquia da cena. Posição, rotação, escala e matrizes ficam no transform_store;
+    os atributos do objeto são views desses arrays. Os setters apenas marcam o nó como sujo,
+    e as matrizes são recalculadas em lote por transform_store.update() (chamado ao renderizar
+    ou ao ler uma matriz desatualizada).
+    Alterações in-place nas views (ex: obj.position[1] = 2) devem ser seguidas de refresh_model_matrix().
+
+    Só objetos que sobrescrevem update são atualizados, pelo update_scheduler, no grupo tick_group
+    e a cada tick_interval segundos (0: todo passo). Outros podem pedir updates com request_ticks.
+    """
+    tick_group = TickGroup.ANIMATION
+    tick_interval = 0.0
+
     def __init__(self):
-        self.model_matrix = np.identity(4, dtype=np.float32)
-        self.world_transformation_matrix = np.identity(4, dtype=np.float32)
-        self.position = np.array([0.0, 0.0, 0.0], dtype=np.float32)
-        self.rotation = np.array([0.0, 0.0, 0.0], dtype=np.float32)
-        self.scale = np.array([1.0, 1.0, 1.0], dtype=np.float32)
+        self.node = transform_store.allocate()
         self.parent: 'Object' = None
         self.children: List[Object] = []
+        if type(self).update is not Object.update:
+            self.request_ticks()
+
+    @property
+    def position(self) -> np.ndarray:
+        return transform_store.positions[self.node]
+
+    @position.setter
+    def position(self, value: np.ndarray):
+        transform_store.positions[self.node] = value
+        transform_store.mark_dirty(self.node)
+
+    @property
+    def rotation(self) -> np.ndarray:
+        return transform_store.rotations[self.node]
+
+    @rotation.setter
+    def rotation(self, value: np.ndarray):
+        transform_store.rotations[self.node] = value
+        transform_store.mark_dirty(self.node)
+
+    @property
+    def scale(self) -> np.ndarray:
+        return transform_store.scales[self.node]
+
+    @scale.setter
+    def scale(self, value: np.ndarray):
+        transform_store.scales[self.node] = value
+        transform_store.mark_dirty(self.node)
+
+    @property
+    def model_matrix(self) -> np.ndarray:
+        """Matriz local (translação * rotação * escala)."""
+        transform_store.update()
+        return transform_store.local_matrices[self.node]
+
+    @property
+    def world_transformation_matrix(self) -> np.ndarray:
+        """Matriz global (global do pai * local)."""
+        transform_store.update()
+        return transform_store.world_matrices[self.node]
+
+    @property
+    def render_matrix(self) -> np.ndarray:
+        """Matriz global usada na renderização, interpolada entre os dois últimos passos da simulação."""
+        transform_store.update()
+        return transform_store.render_matrices[self.node]
+
+    @property
+    def normal_matrix(self) -> np.ndarray:
+        """Inversa transposta da parte 3x3 da matriz global, usada para transformar normais."""
+        transform_store.update()
+        return transform_store.normal_matrices[self.node]
+
+    def get_render_matrices(self, renderer: Renderer) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Matriz de renderização e de normal do objeto: as do snapshot do renderer quando a simulação roda
+        em outra thread (ver SimulationThread), ou as atuais do transform_store.
+        """
+        snapshot = renderer.snapshot
+        if snapshot is not None:
+            return snapshot.render_matrices[self.node], snapshot.normal_matrices[self.node]
+        return self.render_matrix, self.normal_matrix
 
     def refresh_model_matrix(self):
-        """Recalcula a matriz local com base nas transformações atuais"""
-        translation_mat = translation_matrix(self.position)
-        rotation_mat = rotation_matrix_all(self.rotation)
-        scale_mat = scale_matrix(self.scale)
-
-        new_matrix = multiply_transformations([
-            translation_mat,
-            rotation_mat,
-            scale_mat,
-        ])
-
-        if np.any(new_matrix != self.model_matrix):
-            self.model_matrix = new_matrix
-            self.refresh_world_matrix()
+        """Marca a matriz local para ser recalculada com base nas transformações atuais"""
+        transform_store.mark_dirty(self.node)
     
     def refresh_world_matrix(self):
-        """Recalcula a matriz global com base na global do pai e a model local."""
-        new_matrix = np.identity(4, dtype=np.float32)
-        if self.parent:
-            new_matrix = multiply_transformations([
-                self.parent.world_transformation_matrix,
-                self.model_matrix
-            ])
-        else:
-            new_matrix = self.model_matrix
-        
-        if np.any(new_matrix != self.world_transformation_matrix):
-            self.world_transformation_matrix = new_matrix
-            for child in self.children:
-                child.refresh_world_matrix()
+        """Marca a matriz global (e a dos filhos) para ser recalculada."""
+        transform_store.mark_world_dirty(self.node)
     
     def add_child(self, child: 'Object'):
         self.children.append(child)
@@ -60,20 +110,16 @@ class Object:
 
     def set_parent(self, parent: 'Object'):
         self.parent = parent
-        self.refresh_world_matrix()
+        transform_store.set_parent(self.node, parent.node if parent else -1)
 
     def set_pos(self, pos: np.ndarray):
-        self.position = np.array(pos, dtype=np.float32)
-        self.refresh_model_matrix()
+        self.position = pos
 
     def translate(self, delta: np.ndarray):
         self.position += delta
-        # TODO proper gradual change
-        self.set_pos(self.position)
         
     def set_rot_rad(self, rot: np.ndarray):
-        self.rotation = np.array(rot, dtype=np.float32)
-        self.refresh_model_matrix()
+        self.rotation = rot
 
     def set_rot_deg(self, rot: np.ndarray):
         self.set_rot_rad(np.deg2rad(rot))
@@ -85,8 +131,6 @@ class Object:
 
         rotation = np.array(axis) * radian
         self.rotation += rotation
-        # TODO proper gradual change
-        self.set_rot_rad(self.rotation)
 
         if around_self:
             self.translate(temp_position)
@@ -95,8 +139,7 @@ class Object:
         self.rotate_rad(np.deg2rad(degree), axis, around_self=around_self)
 
     def set_scale(self, scale: np.ndarray):
-        self.scale = np.array(scale, dtype=np.float32)
-        self.refresh_model_matrix()
+        self.scale = scale
     
     def set_scale_single(self, scale: float):
         self.set_scale(np.array([scale, scale, scale], dtype=np.float32))
@@ -106,16 +149,33 @@ class Object:
         return self.world_transformation_matrix[:3, 3]
 
     def destroy(self):
-        """Destrói o objeto e seus filhos"""
+        """Destrói o objeto e seus filhos, liberando seus nós no transform_store"""
         for child in self.children:
             child.destroy()
+        update_scheduler.unregister(self)
+        transform_store.free(self.node)
 
     def update(self, *args):
-        """Atualiza o objeto e seus filhos"""
-        for child in self.children:
-            child.update(*args)
+        """
+        Chamado pelo update_scheduler a cada passo da simulação com (input, clock), só nos objetos registrados.
+        Não faz nada aqui nem atualiza os filhos, que são agendados cada um por si.
+        """
+        pass
+
+    def request_ticks(self, group: TickGroup | None = None, interval: float | None = None) -> None:
+        """Registra o objeto no update_scheduler (por padrão, com tick_group e tick_interval da classe)."""
+        update_scheduler.register(self, self.tick_group if group is None else group, self.tick_interval if interval is None else interval)
+
+    def sleep(self):
+        """Para de receber updates até wake (ex: um objeto parado que só volta a se mover com um evento)."""
+        update_scheduler.sleep(self)
+
+    def wake(self):
+        update_scheduler.wake(self)
     
     def render(self, renderer: Renderer):
-        """Renderiza o objeto e seus filhos"""
+        """Renderiza o objeto e seus filhos, a menos que a subárvore inteira esteja fora do frustum"""
+        if not renderer.is_subtree_visible(self.node):
+            return
         for child in self.children:
             child.render(renderer)
\ No newline at end of file
@@ -1,46 +1,31 @@
 from objects.object import Object
-from objects.meshobject import MeshObject
+from objects.transformstore import transform_store
+from rendering.mesh import Mesh
+from rendering.renderer import Renderer
+from matrixmath import euler_rotation_components
+from objects.updatescheduler import TickGroup
+from clock import Clock
 import numpy as np
 
-class Particle:
-    """Representa uma partícula instanciada."""
-    def __init__(self, obj: Object, start_pos: np.ndarray, end_pos: np.ndarray, start_scale: float, end_scale: float, start_rot: np.ndarray, end_rot: np.ndarray, lifetime: float):
-        self.obj = obj
-        self.start_pos = start_pos
-        self.end_pos = end_pos
-        self.start_scale = start_scale
-        self.end_scale = end_scale
-        self.start_rot = start_rot
-        self.end_rot = end_rot
-        self.lifetime = lifetime
-        self.t = 0
-        self._update_transform()
-
-
-    def update(self, delta_time: float) -> bool:
-        """Retorna True se a partícula deve ser removida."""
-        self.t += delta_time
-        self._update_transform()
-        return self.t > self.lifetime
-    
-    def _update_transform(self):
-        self.obj.set_pos(self._lerp(self.start_pos, self.end_pos))
-        self.obj.set_scale_single(self._lerp(self.start_scale, self.end_scale))
-        self.obj.set_rot_deg(self._lerp(self.start_rot, self.end_rot))
-    
-    def _lerp(self, a, b):
-        return a + (b - a) * (self.t / self.lifetime)
-
-
 class ParticleSystem(Object):
     """
     Objeto que cria partículas em um círculo, animando-as e destruindo-as quando acabam.
+
+    As partículas ficam em arrays de capacidade fixa (estrutura de arrays), indexados por slot:
+    posição, escala e rotação iniciais e finais, idade, tempo de vida e mesh. Slots livres ficam
+    numa pilha, então criar e remover partículas não aloca nada. O update só avança as idades e cria
+    e remove partículas; a interpolação e as matrizes globais de todas as partículas vivas são calculadas
+    de uma vez em get_instances, uma vez por frame renderizado (e não a cada passo da simulação),
+    e cada mesh é desenhado com um único draw instanciado.
     """
-    def __init__(self, meshes: list[str], radius: float = 1, time_to_spawn: float = 0.5, height_range: tuple[float, float] = [1, 2], lifetime__range: tuple[float, float] = [1, 2], scale_range: tuple[float, float] = [1, 2]):
+    # Atualiza depois dos movimentos do passo (ex: do caldeirão, que liga e desliga o emissor)
+    tick_group = TickGroup.LATE
+
+    def __init__(self, meshes: list[str], radius: float = 1, time_to_spawn: float = 0.5, height_range: tuple[float, float] = [1, 2], lifetime__range: tuple[float, float] = [1, 2], scale_range: tuple[float, float] = [1, 2],
+                 capacity: int = 1024):
         super().__init__()
 
-        self.meshes = meshes
-        self.active_particles: list[Particle] = []
+        self.meshes = [Mesh.from_path(mesh) for mesh in meshes]
 
         self.t = 0
         self.radius = radius
@@ -48,47 +33,168 @@ class ParticleSystem(Object):
         self.height_range = height_range
         self.lifetime_range = lifetime__range
         self.scale_range = scale_range
-        
+
         self.active = False
 
-    def update(self, input, delta_time: float):
+        # Estado das partículas, por slot
+        self.capacity = capacity
+        self.start_positions = np.zeros((capacity, 3), dtype=np.float32)
+        self.end_positions = np.zeros((capacity, 3), dtype=np.float32)
+        self.start_scales = np.zeros(capacity, dtype=np.float32)
+        self.end_scales = np.zeros(capacity, dtype=np.float32)
+        self.start_rotations = np.zeros((capacity, 3), dtype=np.float32)
+        self.end_rotations = np.zeros((capacity, 3), dtype=np.float32)
+        'Rotações em radianos.'
+        self.ages = np.zeros(capacity, dtype=np.float32)
+        self.lifetimes = np.ones(capacity, dtype=np.float32)
+        self.mesh_indices = np.zeros(capacity, dtype=np.int32)
+        self.alive = np.zeros(capacity, dtype=bool)
+
+        # Pilha de slots livres: os free_count primeiros itens de free_slots
+        self.free_slots = np.arange(capacity - 1, -1, -1, dtype=np.int64)
+        self.free_count = capacity
+
+        # Matrizes globais das partículas vivas de cada mesh, recalculadas em get_instances quando
+        # as partículas ou o emissor mudaram desde o último cálculo
+        self.world_matrices = [np.zeros((0, 4, 4), dtype=np.float32) for _ in self.meshes]
+        self.normal_matrices = [np.zeros((0, 3, 3), dtype=np.float32) for _ in self.meshes]
+        self._matrices_dirty = False
+        self._emitter_matrix: np.ndarray | None = None
+
+        self._set_bounds()
+
+    @property
+    def particle_count(self) -> int:
+        return self.capacity - self.free_count
+
+    def update(self, input, clock: Clock):
+        super().update(input, clock)
+        delta_time = clock.delta_time
         self.t += delta_time
 
+        # Cria uma partícula a cada time_to_spawn, mesmo que o frame seja mais longo que isso
         if self.active and self.t > self.time_to_spawn:
+            count = int(self.t // self.time_to_spawn) if self.time_to_spawn > 0 else 1
             self.t = 0
-            rand_mesh = np.random.choice(self.meshes)
-            self._spawn_particle(rand_mesh)
-
-        for particle in self.active_particles:
-            if particle.update(delta_time):
-                self._despawn_particle(particle)
-
-    def _spawn_particle(self, mesh: str):
-        start_pos = self._rand_pos_in_circle()
-        y_off = np.random.uniform(self.height_range[0], self.height_range[1])
-        end_pos = start_pos + np.array([0, y_off, 0], dtype=np.float32)
-
-        start_scale = np.random.uniform(self.scale_range[0], self.scale_range[1])
-        end_scale = 0
-
-        start_rot = np.random.uniform(0, 360, size=3)
-        end_rot = np.random.uniform(0, 360, size=3)
-
-        lifetime = np.random.uniform(self.lifetime_range[0], self.lifetime_range[1])
-
-        obj = MeshObject(mesh)
-        particle = Particle(obj, start_pos, end_pos, start_scale, end_scale, start_rot, end_rot, lifetime)
-        self.active_particles.append(particle)
-        self.add_child(obj)
-
-    def _despawn_particle(self, particle: Particle):
-        self.active_particles.remove(particle)
-        self.remove_child(particle.obj)
-        particle.obj.destroy()
-
-    def _rand_pos_in_circle(self):
-        angle = np.random.uniform(0, 2 * np.pi)
-        r = self.radius * np.sqrt(np.random.uniform(0, 1))
+            self.spawn(count)
+
+        if self.particle_count > 0:
+            self.ages[self.alive] += delta_time
+            self._despawn(np.flatnonzero(self.alive & (self.ages > self.lifetimes)))
+            self._matrices_dirty = True
+
+    def render(self, renderer: Renderer):
+        super().render(renderer)
+        if not renderer.is_node_visible(self.node):
+            return
+        snapshot = renderer.snapshot
+        instances = snapshot.instances[self.node] if snapshot is not None else self.get_instances()
+        emitter_matrix, _ = self.get_render_matrices(renderer)
+        for mesh, matrices, normals in instances:
+            if len(matrices) > 0:
+                renderer.queue_mesh_instances(mesh, matrices, normals, emitter_matrix, key=self.node)
+
+    def get_instances(self) -> list[tuple[Mesh, np.ndarray, np.ndarray]]:
+        """(mesh, matrizes globais, matrizes de normal) das partículas vivas de cada mesh, no estado do último update."""
+        emitter_matrix = self.world_transformation_matrix
+        if self._matrices_dirty or not np.array_equal(emitter_matrix, self._emitter_matrix):
+            self._update_matrices(np.asarray(emitter_matrix, dtype=np.float32))
+            self._emitter_matrix = emitter_matrix.copy()
+            self._matrices_dirty = False
+        return list(zip(self.meshes, self.world_matrices, self.normal_matrices))
+
+    def spawn(self, count: int) -> None:
+        """Cria até count partículas (limitado pelos slots livres), com parâmetros sorteados para todas de uma vez."""
+        count = min(count, self.free_count)
+        if count <= 0:
+            return
+        self.free_count -= count
+        slots = self.free_slots[self.free_count:self.free_count + count]
+
+        start_positions = self._rand_pos_in_circle(count)
+        self.start_positions[slots] = start_positions
+        self.end_positions[slots] = start_positions
+        self.end_positions[slots, 1] += np.random.uniform(self.height_range[0], self.height_range[1], count)
+
+        self.start_scales[slots] = np.random.uniform(self.scale_range[0], self.scale_range[1], count)
+        self.end_scales[slots] = 0
+
+        self.start_rotations[slots] = np.deg2rad(np.random.uniform(0, 360, size=(count, 3)))
+        self.end_rotations[slots] = np.deg2rad(np.random.uniform(0, 360, size=(count, 3)))
+
+        self.lifetimes[slots] = np.random.uniform(self.lifetime_range[0], self.lifetime_range[1], count)
+        self.ages[slots] = 0
+        self.mesh_indices[slots] = np.random.randint(len(self.meshes), size=count)
+        self.alive[slots] = True
+        self._matrices_dirty = True
+
+    def _despawn(self, slots: np.ndarray) -> None:
+        """Devolve os slots para a pilha de livres."""
+        if len(slots) == 0:
+            return
+        self.alive[slots] = False
+        self.free_slots[self.free_count:self.free_count + len(slots)] = slots
+        self.free_count += len(slots)
+        self._matrices_dirty = True
+
+    def _update_matrices(self, emitter_matrix: np.ndarray) -> None:
+        """
+        Interpola posição, escala e rotação de todas as partículas vivas e monta suas matrizes globais.
+        As contas são feitas com um array contíguo por elemento das matrizes (layout (3, 3, N)),
+        e cada resultado é escrito uma única vez no layout (N, 4, 4) enviado para a GPU.
+        """
+        slots = np.flatnonzero(self.alive)
+        count = len(slots)
+        # np.take é bem mais rápido que indexar com [slots] arrays de mais de uma dimensão
+        progress = np.take(self.ages, slots) / np.take(self.lifetimes, slots)
+        positions = self._lerp(np.take(self.start_positions, slots, axis=0), np.take(self.end_positions, slots, axis=0), progress[:, None])
+        scales = self._lerp(np.take(self.start_scales, slots), np.take(self.end_scales, slots), progress)
+        rotations = self._lerp(np.take(self.start_rotations, slots, axis=0), np.take(self.end_rotations, slots, axis=0), progress[:, None])
+
+        # Parte linear global = E * R * s, com E a 3x3 do emissor: uma única multiplicação (3, 3) @ (3, 3N)
+        # em vez de montar as matrizes locais e multiplicá-las em lote pela do emissor
+        emitter_linear = emitter_matrix[:3, :3]
+        rotation_components = euler_rotation_components(rotations.T).reshape(3, 3 * count)
+        rotated = (emitter_linear @ rotation_components).reshape(3, 3, count)
+
+        world_matrices = np.zeros((count, 4, 4), dtype=np.float32)
+        world_matrices[:, :3, :3] = (rotated * scales).transpose(2, 0, 1)
+        world_matrices[:, :3, 3] = positions @ emitter_linear.T + emitter_matrix[:3, 3]
+        world_matrices[:, 3, 3] = 1
+
+        # Matriz de normal = inversa transposta de E * R * s = N * R / s, com N a matriz de normal do emissor.
+        # Com o emissor em escala uniforme k, N = E / k², então basta dividir E * R por k² * s
+        inverse_scales = np.divide(1, scales, out=np.zeros_like(scales), where=scales != 0)
+        gram = emitter_linear.T @ emitter_linear
+        squared_scale = gram[0, 0]
+        if squared_scale > 0 and np.allclose(gram, squared_scale * np.identity(3, dtype=np.float32), atol=1e-5 * squared_scale):
+            normals = (rotated * (inverse_scales / squared_scale)).transpose(2, 0, 1)
+        else:
+            emitter_normal = np.asarray(self.normal_matrix, dtype=np.float32)
+            normals = ((emitter_normal @ rotation_components).reshape(3, 3, count) * inverse_scales).transpose(2, 0, 1)
+
+        # Agrupa por mesh para um draw instanciado de cada. Os arrays são sempre novos (nunca alterados depois
+        # de prontos), então um SceneSnapshot pode guardar só as referências
+        mesh_indices = self.mesh_indices[slots]
+        for i in range(len(self.meshes)):
+            selected = mesh_indices == i if len(self.meshes) > 1 else slice(None)
+            self.world_matrices[i] = world_matrices[selected]
+            self.normal_matrices[i] = normals[selected]
+
+    def _set_bounds(self) -> None:
+        """AABB local que contém qualquer partícula: o círculo de criação, a altura máxima e o maior mesh na maior escala."""
+        extent = max(float(np.max(np.linalg.norm([mesh.aabb_min, mesh.aabb_max], axis=1))) for mesh in self.meshes)
+        extent *= max(self.scale_range)
+        reach = self.radius + extent
+        transform_store.set_bounds(self.node, [-reach, -extent, -reach], [reach, max(self.height_range) + extent, reach])
+
+    def _rand_pos_in_circle(self, count: int) -> np.ndarray:
+        angle = np.random.uniform(0, 2 * np.pi, count)
+        r = self.radius * np.sqrt(np.random.uniform(0, 1, count))
         x = r * np.cos(angle)
         y = r * np.sin(angle)
-        return np.array([x, 0, y], dtype=np.float32)
+        return np.stack([x, np.zeros(count), y], axis=1).astype(np.float32)
+
+    @staticmethod
+    def _lerp(a, b, t):
+        return a + (b - a) * t
@@ -0,0 +1,78 @@
+import numpy as np
+from objects.transformstore import TransformStore, CullResult, cull_bounds
+from rendering.frustum import Frustum
+from rendering.lightdata import LightData
+
+class SceneSnapshot:
+    """
+    Cópia do estado da cena lido pela renderização, tirada no fim dos passos da simulação de um frame:
+    matrizes de renderização (já interpoladas) e de normal, AABBs para o culling, posições das luzes
+    e as instâncias dos sistemas de partículas. Depois de publicado, o snapshot não muda
+    (os arrays ficam somente leitura), então a renderização pode lê-lo sem travas enquanto
+    a simulação do próximo frame altera o transform_store em outra thread.
+
+    Cores das luzes e parâmetros de materiais não são copiados: só são editados na thread da renderização.
+    """
+    def __init__(self):
+        self.count = 0
+        self.step_count = 0
+        self.render_matrices = np.zeros((0, 4, 4), dtype=np.float32)
+        self.normal_matrices = np.zeros((0, 3, 3), dtype=np.float32)
+        self.alive_bounds = np.zeros(0, dtype=bool)
+        self.centers = np.zeros((0, 3), dtype=np.float32)
+        self.extents = np.zeros((0, 3), dtype=np.float32)
+        self.subtree_min = np.zeros((0, 3), dtype=np.float32)
+        self.subtree_max = np.zeros((0, 3), dtype=np.float32)
+        self.light_positions: dict[int, np.ndarray] = {}
+        'Posição global de cada luz, pelo id do LightData.'
+        self.instances: dict[int, list[tuple]] = {}
+        'Instâncias de cada fonte (ex: um ParticleSystem), pelo nó: listas de (mesh, matrizes globais, matrizes de normal).'
+
+    def capture(self, store: TransformStore, lights: list[LightData], instance_sources: list, step_count: int = 0) -> None:
+        """Copia o estado atual, reaproveitando os arrays do snapshot quando o número de nós não mudou."""
+        centers, extents, subtree_min, subtree_max = store.get_world_bounds()
+        count = store.count
+        self.count = count
+        self.step_count = step_count
+        self.render_matrices = _copy_into(self.render_matrices, store.render_matrices[:count])
+        self.normal_matrices = _copy_into(self.normal_matrices, store.normal_matrices[:count])
+        self.alive_bounds = _copy_into(self.alive_bounds, store.alive[:count] & store.has_bounds[:count])
+        self.centers = _copy_into(self.centers, centers)
+        self.extents = _copy_into(self.extents, extents)
+        self.subtree_min = _copy_into(self.subtree_min, subtree_min)
+        self.subtree_max = _copy_into(self.subtree_max, subtree_max)
+        # LightObject e ParticleSystem trocam os arrays a cada update em vez de alterá-los, então basta guardar as referências
+        self.light_positions = {id(light): light.world_position for light in lights}
+        self.instances = {source.node: source.get_instances() for source in instance_sources}
+
+    def cull(self, frustum: Frustum) -> CullResult:
+        """Mesmo teste de TransformStore.cull, sobre as AABBs copiadas."""
+        return cull_bounds(frustum, self.alive_bounds, self.centers, self.extents, self.subtree_min, self.subtree_max)
+
+class SnapshotBuffer:
+    """
+    Dois snapshots usados alternadamente: a simulação escreve no de trás e o publica trocando a referência
+    de front, uma atribuição atômica em Python, sem travas. A renderização lê sempre front.
+    O snapshot de trás só pode ser reescrito depois que a renderização terminar de usá-lo, o que
+    SimulationThread garante iniciando a simulação de um frame só depois de entregar o anterior.
+    """
+    def __init__(self):
+        self.front: SceneSnapshot | None = None
+        self._back = SceneSnapshot()
+        self._spare = SceneSnapshot()
+
+    def publish(self, store: TransformStore, lights: list[LightData], instance_sources: list, step_count: int = 0) -> SceneSnapshot:
+        snapshot = self._back
+        snapshot.capture(store, lights, instance_sources, step_count)
+        self._back = self.front if self.front is not None else self._spare
+        self.front = snapshot
+        return snapshot
+
+def _copy_into(target: np.ndarray, source: np.ndarray) -> np.ndarray:
+    """Copia source para target se as formas forem iguais (senão para um array novo), deixando o resultado somente leitura."""
+    if target.shape != source.shape:
+        target = np.empty_like(source)
+    target.flags.writeable = True
+    target[...] = source
+    target.flags.writeable = False
+    return target
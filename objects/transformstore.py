@@ -0,0 +1,267 @@
+import numpy as np
+from matrixmath import compose_trs, normal_matrices
+from rendering.frustum import Frustum
+
+class CullResult:
+    """
+    Visibilidade de todos os nós em relação a um frustum.
+    subtree_visible: se a AABB do nó e de todos os seus descendentes intersecta o frustum.
+    node_visible: se a AABB do próprio nó intersecta o frustum (falso para nós sem bounds).
+    """
+    def __init__(self, subtree_visible: np.ndarray, node_visible: np.ndarray, drawn_objects: int, culled_objects: int):
+        self.subtree_visible = subtree_visible
+        self.node_visible = node_visible
+        self.drawn_objects = drawn_objects
+        self.culled_objects = culled_objects
+
+class TransformStore:
+    """
+    Guarda as transformações de todos os objetos em arrays contíguos indexados pelo id do nó:
+    posição, rotação e escala locais, matrizes locais, globais e de normal, pai e profundidade,
+    além da AABB local dos nós que possuem geometria (usada no frustum culling).
+
+    Escritas apenas marcam o nó como sujo. update() recalcula de uma vez as matrizes locais
+    sujas e, nível a nível da hierarquia (pais antes dos filhos), as matrizes globais dos nós
+    sujos e de seus descendentes, com operações vetorizadas. As matrizes de normal são
+    recalculadas junto, só para os nós cuja matriz global mudou.
+
+    Com a simulação em passos fixos, begin_step e end_step guardam as matrizes globais em volta de cada
+    passo, e interpolate calcula render_matrices entre os dois últimos passos para a renderização.
+    """
+    def __init__(self, capacity: int = 64):
+        self.count = 0
+        'Maior id já usado + 1.'
+        self.free_ids: list[int] = []
+        self.has_dirty = False
+        self.version = 0
+        'Incrementado sempre que matrizes globais, bounds ou a hierarquia mudam (usado por estruturas derivadas, como a BVH).'
+        self._order: np.ndarray | None = None
+        self._level_starts: np.ndarray | None = None
+        self._allocate_arrays(capacity)
+
+    def allocate(self) -> int:
+        """Cria um nó sem pai e com a transformação identidade, retornando seu id."""
+        if self.free_ids:
+            node = self.free_ids.pop()
+        else:
+            if self.count == len(self.parents):
+                self._grow()
+            node = self.count
+            self.count += 1
+
+        self.positions[node] = 0
+        self.rotations[node] = 0
+        self.scales[node] = 1
+        self.local_matrices[node] = np.identity(4)
+        self.world_matrices[node] = np.identity(4)
+        self.normal_matrices[node] = np.identity(3)
+        self.has_previous[node] = False
+        self.parents[node] = -1
+        self.alive[node] = True
+        self.local_dirty[node] = False
+        self.world_dirty[node] = False
+        self.has_bounds[node] = False
+        self._order = None
+        self.version += 1
+        return node
+
+    def free(self, node: int) -> None:
+        """Libera o id do nó para ser reaproveitado. Os filhos devem ter sido liberados ou desvinculados antes."""
+        self.alive[node] = False
+        self.has_bounds[node] = False
+        self.parents[node] = -1
+        self.local_dirty[node] = False
+        self.world_dirty[node] = False
+        self.free_ids.append(node)
+        self._order = None
+        self.version += 1
+
+    def set_parent(self, node: int, parent: int) -> None:
+        """Define o pai do nó (-1 para nenhum). A matriz global é recalculada no próximo update."""
+        self.parents[node] = parent
+        self._order = None
+        self.mark_world_dirty(node)
+
+    def set_bounds(self, node: int, aabb_min: np.ndarray, aabb_max: np.ndarray) -> None:
+        """Define a AABB local (no espaço do nó) da geometria do nó."""
+        self.bounds_centers[node] = (np.asarray(aabb_min) + aabb_max) / 2
+        self.bounds_extents[node] = (np.asarray(aabb_max) - aabb_min) / 2
+        self.has_bounds[node] = True
+        self.version += 1
+
+    def mark_dirty(self, node: int) -> None:
+        """Marca a transformação local (e portanto a global) do nó como desatualizada."""
+        self.local_dirty[node] = True
+        self.world_dirty[node] = True
+        self.has_dirty = True
+
+    def mark_world_dirty(self, node: int) -> None:
+        self.world_dirty[node] = True
+        self.has_dirty = True
+
+    def update(self) -> None:
+        """Recalcula as matrizes locais sujas e as globais (e de normal) afetadas, em ordem topológica."""
+        if not self.has_dirty:
+            return
+        count = self.count
+
+        # Matrizes locais: T * R * S
+        local_ids = np.flatnonzero(self.local_dirty[:count])
+        if len(local_ids) > 0:
+            self.local_matrices[local_ids] = compose_trs(self.positions[local_ids], self.rotations[local_ids], self.scales[local_ids])
+            self.local_dirty[local_ids] = False
+
+        # Matrizes globais: nível a nível, um nó é recalculado se ele ou o pai foram recalculados
+        order, level_starts = self._get_order()
+        dirty = self.world_dirty
+        for start, end in zip(level_starts[:-1], level_starts[1:]):
+            ids = order[start:end]
+            parents = self.parents[ids]
+            has_parent = parents >= 0
+            dirty[ids] |= has_parent & dirty[np.where(has_parent, parents, ids)]
+
+            roots = ids[dirty[ids] & ~has_parent]
+            self.world_matrices[roots] = self.local_matrices[roots]
+            children = ids[dirty[ids] & has_parent]
+            self.world_matrices[children] = self.world_matrices[self.parents[children]] @ self.local_matrices[children]
+
+        # Matrizes de normal (inversa transposta) dos nós recalculados
+        world_ids = np.flatnonzero(dirty[:count])
+        if len(world_ids) > 0:
+            self.normal_matrices[world_ids] = normal_matrices(self.world_matrices[world_ids])
+
+        dirty[:count] = False
+        self.has_dirty = False
+        self.version += 1
+
+    def begin_step(self) -> None:
+        """Guarda as matrizes globais de antes de um passo da simulação."""
+        self.update()
+        self.previous_world_matrices[:self.count] = self.world_matrices[:self.count]
+
+    def end_step(self) -> None:
+        """Guarda as matrizes globais de depois do passo. Só os nós que existiam antes do passo podem ser interpolados."""
+        self.update()
+        self.stepped_world_matrices[:self.count] = self.world_matrices[:self.count]
+        self.has_previous[:self.count] = self.alive[:self.count]
+
+    def interpolate(self, alpha: float) -> None:
+        """
+        Calcula render_matrices: as matrizes globais interpoladas entre os dois últimos passos, com alpha em [0, 1].
+        Nós movidos fora da simulação desde o último passo (ex: o skybox, que segue a câmera) usam a matriz atual.
+        As matrizes de normal não são interpoladas, já que mudam pouco entre dois passos.
+        """
+        self.update()
+        if self.render_matrices is self.world_matrices:
+            self.render_matrices = np.empty_like(self.world_matrices)
+        count = self.count
+        previous = self.previous_world_matrices[:count]
+        current = self.world_matrices[:count]
+        unchanged = self.has_previous[:count] & np.all(current == self.stepped_world_matrices[:count], axis=(1, 2))
+        self.render_matrices[:count] = np.where(unchanged[:, None, None], previous + (current - previous) * np.float32(alpha), current)
+
+    def get_node_bounds(self) -> tuple[np.ndarray, np.ndarray]:
+        """Retorna (centros, extensões) das AABBs globais de cada nó. Nós sem geometria têm extensão zero."""
+        self.update()
+        count = self.count
+        matrices = self.world_matrices[:count]
+        linear = matrices[:, :3, :3]
+        centers = np.einsum('nij,nj->ni', linear, self.bounds_centers[:count]) + matrices[:, :3, 3]
+        extents = np.einsum('nij,nj->ni', np.abs(linear), self.bounds_extents[:count])
+        return centers, extents
+
+    def get_world_bounds(self) -> tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Retorna (centros, extensões) das AABBs globais de cada nó e (mínimos, máximos) das AABBs
+        que envolvem cada nó e seus descendentes, propagadas das folhas para a raiz.
+        Nós sem geometria têm extensão zero e não contribuem para as AABBs das subárvores.
+        """
+        centers, extents = self.get_node_bounds()
+        count = self.count
+
+        # AABB vazia (mínimo > máximo) para nós sem geometria
+        has_bounds = self.has_bounds[:count, None]
+        subtree_min = np.where(has_bounds, centers - extents, np.inf).astype(np.float32)
+        subtree_max = np.where(has_bounds, centers + extents, -np.inf).astype(np.float32)
+
+        order, level_starts = self._get_order()
+        for start, end in zip(level_starts[-2:0:-1], level_starts[-1:1:-1]):
+            ids = order[start:end]
+            parents = self.parents[ids]
+            np.minimum.at(subtree_min, parents, subtree_min[ids])
+            np.maximum.at(subtree_max, parents, subtree_max[ids])
+        return centers, extents, subtree_min, subtree_max
+
+    def cull(self, frustum: Frustum) -> CullResult:
+        """Testa todos os nós e subárvores contra o frustum de uma vez."""
+        centers, extents, subtree_min, subtree_max = self.get_world_bounds()
+        alive_bounds = self.alive[:self.count] & self.has_bounds[:self.count]
+        return cull_bounds(frustum, alive_bounds, centers, extents, subtree_min, subtree_max)
+
+    def _get_order(self) -> tuple[np.ndarray, np.ndarray]:
+        """Ids vivos ordenados por profundidade e o início de cada nível, recalculados quando a hierarquia muda."""
+        if self._order is None:
+            ids = np.flatnonzero(self.alive[:self.count])
+            depths = np.zeros(len(ids), dtype=np.int64)
+            ancestors = self.parents[ids]
+            while np.any(ancestors >= 0):
+                has_ancestor = ancestors >= 0
+                depths += has_ancestor
+                ancestors = np.where(has_ancestor, self.parents[np.maximum(ancestors, 0)], -1)
+
+            sort = np.argsort(depths, kind='stable')
+            self._order = ids[sort]
+            levels = depths[sort]
+            self._level_starts = np.searchsorted(levels, np.arange(levels[-1] + 2 if len(levels) else 1))
+        return self._order, self._level_starts
+
+    def _allocate_arrays(self, capacity: int) -> None:
+        self.positions = np.zeros((capacity, 3), dtype=np.float32)
+        self.rotations = np.zeros((capacity, 3), dtype=np.float32)
+        self.scales = np.ones((capacity, 3), dtype=np.float32)
+        self.local_matrices = np.tile(np.identity(4, dtype=np.float32), (capacity, 1, 1))
+        self.world_matrices = np.tile(np.identity(4, dtype=np.float32), (capacity, 1, 1))
+        self.normal_matrices = np.tile(np.identity(3, dtype=np.float32), (capacity, 1, 1))
+        self.previous_world_matrices = np.tile(np.identity(4, dtype=np.float32), (capacity, 1, 1))
+        self.stepped_world_matrices = np.tile(np.identity(4, dtype=np.float32), (capacity, 1, 1))
+        self.has_previous = np.zeros(capacity, dtype=bool)
+        self.render_matrices = self.world_matrices
+        'Matrizes usadas na renderização: as globais, até a primeira chamada a interpolate.'
+        self.parents = np.full(capacity, -1, dtype=np.int64)
+        self.alive = np.zeros(capacity, dtype=bool)
+        self.local_dirty = np.zeros(capacity, dtype=bool)
+        self.world_dirty = np.zeros(capacity, dtype=bool)
+        self.bounds_centers = np.zeros((capacity, 3), dtype=np.float32)
+        self.bounds_extents = np.zeros((capacity, 3), dtype=np.float32)
+        self.has_bounds = np.zeros(capacity, dtype=bool)
+
+    def _grow(self) -> None:
+        """Dobra a capacidade, copiando os dados. Views antigas continuam válidas, mas deixam de ser atualizadas."""
+        old = (self.positions, self.rotations, self.scales, self.local_matrices, self.world_matrices,
+               self.normal_matrices, self.previous_world_matrices, self.stepped_world_matrices, self.has_previous,
+               self.parents, self.alive, self.local_dirty, self.world_dirty,
+               self.bounds_centers, self.bounds_extents, self.has_bounds)
+        self._allocate_arrays(len(self.parents) * 2)
+        new = (self.positions, self.rotations, self.scales, self.local_matrices, self.world_matrices,
+               self.normal_matrices, self.previous_world_matrices, self.stepped_world_matrices, self.has_previous,
+               self.parents, self.alive, self.local_dirty, self.world_dirty,
+               self.bounds_centers, self.bounds_extents, self.has_bounds)
+        for old_array, new_array in zip(old, new):
+            new_array[:len(old_array)] = old_array
+
+def cull_bounds(frustum: Frustum, alive_bounds: np.ndarray, centers: np.ndarray, extents: np.ndarray,
+                subtree_min: np.ndarray, subtree_max: np.ndarray) -> CullResult:
+    """Testa as AABBs dos nós (centros e extensões) e das subárvores (mínimos e máximos, vazias se mínimo > máximo) contra o frustum."""
+    node_visible = alive_bounds & frustum.test_aabbs(centers, extents)
+    subtree_valid = np.all(subtree_min <= subtree_max, axis=1)
+    subtree_visible = np.zeros(len(alive_bounds), dtype=bool)
+    subtree_visible[subtree_valid] = frustum.test_aabbs(
+        (subtree_min[subtree_valid] + subtree_max[subtree_valid]) / 2,
+        (subtree_max[subtree_valid] - subtree_min[subtree_valid]) / 2,
+    )
+
+    drawn_objects = int(np.count_nonzero(node_visible))
+    culled_objects = int(np.count_nonzero(alive_bounds)) - drawn_objects
+    return CullResult(subtree_visible, node_visible, drawn_objects, culled_objects)
+
+transform_store = TransformStore()
@@ -0,0 +1,102 @@
+import bisect
+from enum import Enum
+
+class TickGroup(Enum):
+    PRE_PHYSICS = 0
+    'Antes dos movimentos: leitura de input e decisões.'
+    ANIMATION = 1
+    'Movimento e animação dos objetos (padrão).'
+    LATE = 2
+    'Depois de todos os movimentos: o que segue a posição final de outro objeto (ex: luzes, partículas).'
+
+class TickEntry:
+    """Registro de um objeto no agendador: grupo, intervalo e se está acordado."""
+    def __init__(self, obj, group: TickGroup, interval: float, order: int):
+        self.obj = obj
+        self.group = group
+        self.interval = interval
+        self.order = order
+        self.next_time = 0.0
+        self.awake = True
+
+    def __lt__(self, other: 'TickEntry') -> bool:
+        return self.order < other.order
+
+class UpdateScheduler:
+    """
+    Chama update(input, clock) a cada passo da simulação só nos objetos registrados: por padrão, os que
+    sobrescrevem Object.update (ver Object.__init__). Os grupos rodam na ordem de TickGroup e, dentro
+    de cada grupo, os objetos na ordem de registro (pais antes dos filhos criados no construtor).
+
+    Com interval, o objeto só é atualizado quando pelo menos interval segundos de simulação passaram
+    desde o último update, e deve usar clock.time em vez de clock.delta_time.
+    Objetos dormindo saem das listas dos grupos, então o custo de um passo depende só dos objetos acordados.
+    wake pode ser chamado de qualquer thread (ex: num callback de tecla): o objeto volta no início do próximo passo.
+    """
+    def __init__(self):
+        self.entries: dict[int, TickEntry] = {}
+        'Registro de cada objeto, pelo nó.'
+        self.groups: dict[TickGroup, list[TickEntry]] = {group: [] for group in TickGroup}
+        'Registros acordados de cada grupo, na ordem de registro.'
+        self._wake_requests: list = []
+        self._next_order = 0
+        self.ticks = 0
+        'Updates chamados no último passo.'
+
+    @property
+    def awake_count(self) -> int:
+        return sum(len(entries) for entries in self.groups.values())
+
+    def register(self, obj, group: TickGroup = TickGroup.ANIMATION, interval: float = 0.0) -> None:
+        """Agenda os updates do objeto, substituindo o registro anterior se houver."""
+        self.unregister(obj)
+        entry = TickEntry(obj, group, interval, self._next_order)
+        self._next_order += 1
+        self.entries[obj.node] = entry
+        self.groups[group].append(entry)
+
+    def unregister(self, obj) -> None:
+        entry = self.entries.pop(obj.node, None)
+        if entry is not None and entry.awake:
+            self.groups[entry.group].remove(entry)
+
+    def sleep(self, obj) -> None:
+        """Para de atualizar o objeto até wake. Deve ser chamado na thread da simulação (ex: no próprio update)."""
+        entry = self.entries.get(obj.node)
+        if entry is not None and entry.awake:
+            entry.awake = False
+            self.groups[entry.group].remove(entry)
+
+    def wake(self, obj) -> None:
+        """Volta a atualizar o objeto a partir do próximo passo."""
+        self._wake_requests.append(obj)
+
+    def is_awake(self, obj) -> bool:
+        entry = self.entries.get(obj.node)
+        return entry is not None and entry.awake
+
+    def update(self, input, clock) -> None:
+        """Um passo: acorda os objetos pedidos e atualiza os acordados, grupo a grupo."""
+        self._apply_wake_requests()
+        self.ticks = 0
+        for entries in self.groups.values():
+            # Cópia: objetos podem dormir ou ser registrados durante o próprio update
+            for entry in tuple(entries):
+                if not entry.awake:
+                    continue
+                if entry.interval > 0:
+                    if clock.time < entry.next_time:
+                        continue
+                    entry.next_time = clock.time + entry.interval
+                entry.obj.update(input, clock)
+                self.ticks += 1
+
+    def _apply_wake_requests(self) -> None:
+        while self._wake_requests:
+            obj = self._wake_requests.pop()
+            entry = self.entries.get(obj.node)
+            if entry is not None and entry.obj is obj and not entry.awake:
+                entry.awake = True
+                bisect.insort(self.groups[entry.group], entry)
+
+update_scheduler = UpdateScheduler()
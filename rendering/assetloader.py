@@ -0,0 +1,83 @@
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import os
+import time
+from rendering.mesh import Mesh, loaded_meshes, ASSETS_SUB_FOLDER
+from rendering.materials import find_texture_path
+from rendering.textureimage import TextureImage, decode_texture
+from rendering.meshcache import load_obj_data
+from rendering.objparser import ObjData
+
+class PreparedMesh:
+    """
+    Dados de um mesh preparados fora da thread principal: vértices, índices, materiais
+    e texturas já decodificadas. Só falta criar os buffers e texturas OpenGL.
+    """
+    def __init__(self, obj_path: str, default_texture_path: str | None, obj_data: ObjData, images: dict[str, TextureImage], parse_time: float, decode_time: float):
+        self.obj_path = obj_path
+        self.default_texture_path = default_texture_path
+        self.obj_data = obj_data
+        self.images = images
+        self.parse_time = parse_time
+        self.decode_time = decode_time
+
+class AssetTiming:
+    """Tempos (em segundos) gastos em cada etapa do carregamento de um asset."""
+    def __init__(self, obj_path: str, parse_time: float, decode_time: float, upload_time: float):
+        self.obj_path = obj_path
+        self.parse_time = parse_time
+        self.decode_time = decode_time
+        self.upload_time = upload_time
+
+    def __str__(self):
+        return f"{self.obj_path}: parse {self.parse_time * 1000:.1f}ms, decode {self.decode_time * 1000:.1f}ms, upload {self.upload_time * 1000:.1f}ms"
+
+def prepare_mesh(obj_path: str, default_texture_path: str | None = None) -> PreparedMesh:
+    """
+    Parte do carregamento que só usa CPU: parsing de .obj/.mtl (ou leitura do cache)
+    e decodificação das texturas. Não usa OpenGL, então roda em outro processo.
+    """
+    start = time.perf_counter()
+    obj_data = load_obj_data(os.path.join(ASSETS_SUB_FOLDER, obj_path))
+    parse_time = time.perf_counter() - start
+
+    texture_paths = [material.texture_path for material in obj_data.materials if material.texture_path is not None]
+    if default_texture_path is not None:
+        asset_sub_folder = os.path.join(ASSETS_SUB_FOLDER, os.path.dirname(obj_path))
+        texture_paths.append(find_texture_path(default_texture_path, asset_sub_folder))
+
+    start = time.perf_counter()
+    images = {path: decode_texture(path) for path in dict.fromkeys(texture_paths)}
+    decode_time = time.perf_counter() - start
+
+    return PreparedMesh(obj_path, default_texture_path, obj_data, images, parse_time, decode_time)
+
+def preload_meshes(assets: list[tuple[str, str | None]], max_workers: int | None = None) -> list[AssetTiming]:
+    """
+    Carrega os meshes em paralelo: o trabalho de CPU roda em um ProcessPoolExecutor e,
+    conforme cada resultado chega, a thread principal (dona do contexto OpenGL) apenas
+    envia os dados para a GPU. Os meshes ficam em loaded_meshes, então Mesh.from_path
+    passa a retorná-los diretamente.
+    Retorna os tempos de cada asset, que também são impressos.
+    """
+    pending = [asset for asset in dict.fromkeys(assets) if asset not in loaded_meshes]
+    if not pending:
+        return []
+
+    start = time.perf_counter()
+    timings = []
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        futures = [executor.submit(prepare_mesh, obj_path, default_texture_path) for obj_path, default_texture_path in pending]
+        for future in as_completed(futures):
+            prepared = future.result()
+
+            upload_start = time.perf_counter()
+            key = (prepared.obj_path, prepared.default_texture_path)
+            loaded_meshes[key] = Mesh(prepared.obj_path, prepared.default_texture_path, prepared.obj_data, prepared.images)
+            upload_time = time.perf_counter() - upload_start
+
+            timings.append(AssetTiming(prepared.obj_path, prepared.parse_time, prepared.decode_time, upload_time))
+
+    for timing in timings:
+        print(timing)
+    print(f"Loaded {len(timings)} meshes in {(time.perf_counter() - start) * 1000:.1f}ms")
+    return timings
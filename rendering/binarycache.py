@@ -0,0 +1,113 @@
+import numpy as np
+import hashlib
+import json
+import os
+import tempfile
+import zlib
+
+CACHE_FOLDER = '.cache'
+_MAGIC = b'BINCACHE'
+_ALIGNMENT = 16
+
+class CacheEntry:
+    """Conteúdo de um arquivo de cache: metadados (JSON) e arrays mapeados em memória."""
+    def __init__(self, metadata: dict, arrays: dict[str, np.ndarray]):
+        self.metadata = metadata
+        self.arrays = arrays
+
+def get_cache_path(kind: str, source_path: str) -> str:
+    """Caminho do arquivo de cache de um arquivo de origem, único por caminho, em '.cache/kind'."""
+    digest = hashlib.sha1(os.path.normpath(source_path).encode()).hexdigest()[:16]
+    name = os.path.splitext(os.path.basename(source_path))[0]
+    return os.path.join(CACHE_FOLDER, kind, f"{name}-{digest}.bin")
+
+def read_cache(cache_path: str, version: int) -> CacheEntry | None:
+    """
+    Lê um cache gravado por write_cache, mapeando os arrays direto do arquivo (mmap).
+    Retorna None se o cache não existir, for de outra versão, se algum arquivo de origem
+    tiver mudado desde a gravação ou se estiver corrompido.
+    """
+    if not os.path.isfile(cache_path):
+        return None
+
+    try:
+        header, data_offset = _read_header(cache_path)
+        if header['version'] != version:
+            return None
+        if any(_file_signature(path) != signature for path, signature in header['sources']):
+            return None
+
+        data = np.memmap(cache_path, dtype=np.uint8, mode='r', offset=data_offset)
+        if data.size != header['data_size'] or zlib.crc32(data) != header['crc']:
+            raise ValueError("payload does not match header")
+
+        arrays = {}
+        for name, (offset, dtype, shape) in header['arrays'].items():
+            count = int(np.prod(shape))
+            arrays[name] = np.frombuffer(data, dtype=dtype, count=count, offset=offset).reshape(shape)
+        return CacheEntry(header['metadata'], arrays)
+    except (OSError, ValueError, KeyError, TypeError) as e:
+        print(f"Invalid cache {cache_path}, rebuilding: {e}")
+        return None
+
+def write_cache(cache_path: str, version: int, sources: list[str], metadata: dict, arrays: dict[str, np.ndarray]) -> None:
+    """
+    Grava um cabeçalho JSON seguido dos arrays crus e alinhados, de forma que possam ser
+    mapeados em memória na leitura. sources são os arquivos cujo tamanho e data de
+    modificação invalidam o cache.
+    """
+    # Arrays alinhados, com offsets relativos ao início dos dados
+    layout = {}
+    payload = bytearray()
+    for name, array in arrays.items():
+        array = np.ascontiguousarray(array)
+        payload.extend(b'\0' * (-len(payload) % _ALIGNMENT))
+        layout[name] = [len(payload), array.dtype.str, list(array.shape)]
+        payload.extend(array.tobytes())
+
+    header = {
+        'version': version,
+        'sources': [[path, _file_signature(path)] for path in sources],
+        'arrays': layout,
+        'metadata': metadata,
+        'data_size': len(payload),
+        'crc': zlib.crc32(payload),
+    }
+    header_bytes = json.dumps(header).encode()
+    header_bytes += b' ' * (-(len(_MAGIC) + 4 + len(header_bytes)) % _ALIGNMENT)
+
+    # Grava em um arquivo temporário e substitui, para nunca deixar um cache pela metade.
+    # O nome é único por chamada: threads do mesmo processo podem gravar o mesmo cache ao mesmo tempo
+    folder = os.path.dirname(cache_path)
+    os.makedirs(folder, exist_ok=True)
+    descriptor, temp_path = tempfile.mkstemp(dir=folder, prefix=os.path.basename(cache_path) + '.', suffix='.tmp')
+    try:
+        with os.fdopen(descriptor, 'wb') as file:
+            file.write(_MAGIC)
+            file.write(len(header_bytes).to_bytes(4, 'little'))
+            file.write(header_bytes)
+            file.write(payload)
+        os.replace(temp_path, cache_path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+def _read_header(cache_path: str) -> tuple[dict, int]:
+    """Retorna o cabeçalho e o offset onde começam os dados."""
+    with open(cache_path, 'rb') as file:
+        if file.read(len(_MAGIC)) != _MAGIC:
+            raise ValueError("wrong magic")
+        header_size = int.from_bytes(file.read(4), 'little')
+        header_bytes = file.read(header_size)
+        if len(header_bytes) != header_size:
+            raise ValueError("truncated header")
+    return json.loads(header_bytes), len(_MAGIC) + 4 + header_size
+
+def _file_signature(path: str) -> list[int] | None:
+    """Tamanho e data de modificação de um arquivo, usados para detectar caches desatualizados."""
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return [stat.st_size, stat.st_mtime_ns]
@@ -0,0 +1,155 @@
+from OpenGL.GL import *
+import numpy as np
+from rendering.uniformbuffer import UniformBuffer, CLUSTER_BLOCK_BINDING
+from rendering.lightdata import ATTENUATION
+
+CLUSTER_GRID = (16, 9, 24)
+'Clusters em x e y (tiles da tela) e em profundidade (fatias exponenciais entre near e far).'
+CLUSTER_BLOCK_SIZE = 32
+'Tamanho do ClusterBlock (std140): uvec4 clusterGrid e vec4 clusterDepth.'
+LIGHT_BUFFER_BINDING = 0
+CLUSTER_BUFFER_BINDING = 1
+LIGHT_INDEX_BUFFER_BINDING = 2
+'Bindings dos shader storage buffers de lit.frag.'
+LIGHT_CUTOFF = 1 / 256
+'Contribuição (cor * atenuação) abaixo da qual a luz é ignorada, o que define o alcance de cada luz.'
+LIGHT_SIZE = 48
+'Tamanho de uma ClusterLight (std430): position (xyz e alcance), color (rgb e se o alcance é explícito) e groups.'
+
+def get_light_ranges(colors: np.ndarray) -> np.ndarray:
+    """
+    Distância a partir da qual cada luz contribui menos que LIGHT_CUTOFF,
+    resolvendo cor / (c + l * d + q * d²) = LIGHT_CUTOFF.
+    """
+    constant, linear, quadratic = ATTENUATION
+    strength = np.max(np.asarray(colors, dtype=np.float64).reshape(-1, 3), axis=1)
+    c = constant - strength / LIGHT_CUTOFF
+    ranges = (-linear + np.sqrt(np.maximum(linear * linear - 4 * quadratic * c, 0))) / (2 * quadratic)
+    return np.where(c < 0, ranges, 0).astype(np.float32)
+
+class ClusteredLighting:
+    """
+    Iluminação clusterizada: o frustum é dividido em clusters (tiles da tela x fatias de profundidade)
+    e, a cada frame, a CPU atribui a cada cluster as luzes cuja esfera de alcance intersecta sua AABB
+    (no espaço da câmera). O fragment shader avalia só as luzes do cluster do fragmento, então o número
+    de luzes por frame deixa de ser limitado por MAX_LIGHTS.
+
+    As luzes levam uma máscara de grupos: cada chamada a Renderer.set_light_uniforms é um grupo,
+    e um draw só recebe as luzes do seu grupo (ex: as luzes do interior não iluminam o exterior).
+    """
+    def __init__(self, grid: tuple[int, int, int] = CLUSTER_GRID):
+        self.grid = grid
+        self.cluster_block = UniformBuffer(CLUSTER_BLOCK_SIZE, CLUSTER_BLOCK_BINDING)
+        self.light_buffer, self.cluster_buffer, self.light_index_buffer = glGenBuffers(3)
+        self.light_count = 0
+        self.assignment_count = 0
+        'Pares (luz, cluster) do último update.'
+
+        self._projection_key: bytes | None = None
+        self._x_bounds = self._y_bounds = self._z_bounds = None
+
+    def update(self, view: np.ndarray, projection: np.ndarray, positions: np.ndarray, colors: np.ndarray,
+               light_ranges: np.ndarray, groups: np.ndarray) -> None:
+        """
+        Atribui as luzes (posições e cores (L, 3), alcances explícitos (L,), NaN quando não definidos,
+        e máscaras de grupo (L,)) aos clusters e envia tudo para a GPU.
+        """
+        positions = np.asarray(positions, dtype=np.float32).reshape(-1, 3)
+        colors = np.asarray(colors, dtype=np.float32).reshape(-1, 3)
+        light_ranges = np.asarray(light_ranges, dtype=np.float32)
+        explicit = ~np.isnan(light_ranges)
+        ranges = np.where(explicit, np.minimum(light_ranges, get_light_ranges(colors)), get_light_ranges(colors))
+        self._update_cluster_bounds(projection)
+
+        view = np.asarray(view, dtype=np.float32)
+        view_positions = positions @ view[:3, :3].T + view[:3, 3]
+        clusters, light_indices = self.assign(view_positions, ranges)
+
+        lights = np.zeros((len(positions), LIGHT_SIZE // 4), dtype=np.float32)
+        lights[:, 0:3] = positions
+        lights[:, 3] = ranges
+        lights[:, 4:7] = colors
+        lights[:, 7] = explicit
+        lights[:, 8].view(np.uint32)[:] = groups
+        _upload_storage(self.light_buffer, lights)
+        _upload_storage(self.cluster_buffer, clusters)
+        _upload_storage(self.light_index_buffer, light_indices)
+        self.light_count = len(positions)
+        self.assignment_count = len(light_indices)
+
+    def assign(self, view_positions: np.ndarray, ranges: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Testa as esferas das luzes (no espaço da câmera) contra as AABBs de todos os clusters de uma vez.
+        A AABB do cluster (x, y, z) é o produto de intervalos que dependem só de (z, x), (z, y) e z,
+        então as distâncias ao quadrado são calculadas por eixo e somadas por broadcast.
+        Retorna (início e quantidade na lista de índices, por cluster) e a lista de índices de luzes.
+        """
+        grid_x, grid_y, grid_z = self.grid
+        cluster_count = grid_x * grid_y * grid_z
+        if len(view_positions) == 0:
+            return np.zeros((cluster_count, 2), dtype=np.uint32), np.zeros(1, dtype=np.uint32)
+
+        x, y, z = view_positions[:, 0:1, None], view_positions[:, 1:2, None], view_positions[:, 2:3]
+        dx = np.clip(x, self._x_bounds[..., 0], self._x_bounds[..., 1]) - x
+        dy = np.clip(y, self._y_bounds[..., 0], self._y_bounds[..., 1]) - y
+        dz = np.clip(z, self._z_bounds[:, 0], self._z_bounds[:, 1]) - z
+        squared = dx * dx
+        distances = (squared[:, :, None, :] + (dy * dy)[:, :, :, None]) + (dz * dz)[:, :, None, None]
+        inside = distances <= (ranges * ranges)[:, None, None, None]
+
+        # Ordem (cluster, luz), com o índice do cluster = (z * grid_y + y) * grid_x + x
+        cluster_ids, light_ids = np.nonzero(inside.reshape(len(view_positions), cluster_count).T)
+        counts = np.bincount(cluster_ids, minlength=cluster_count)
+        clusters = np.stack([np.cumsum(counts) - counts, counts], axis=1).astype(np.uint32)
+        light_indices = light_ids.astype(np.uint32) if len(light_ids) else np.zeros(1, dtype=np.uint32)
+        return clusters, light_indices
+
+    def bind(self) -> None:
+        self.cluster_block.bind()
+        glBindBufferBase(GL_SHADER_STORAGE_BUFFER, LIGHT_BUFFER_BINDING, self.light_buffer)
+        glBindBufferBase(GL_SHADER_STORAGE_BUFFER, CLUSTER_BUFFER_BINDING, self.cluster_buffer)
+        glBindBufferBase(GL_SHADER_STORAGE_BUFFER, LIGHT_INDEX_BUFFER_BINDING, self.light_index_buffer)
+
+    def destroy(self) -> None:
+        self.cluster_block.destroy()
+        glDeleteBuffers(3, [self.light_buffer, self.cluster_buffer, self.light_index_buffer])
+
+    def _update_cluster_bounds(self, projection: np.ndarray) -> None:
+        """
+        Recalcula os intervalos das AABBs dos clusters no espaço da câmera quando a projeção muda.
+        As fatias de profundidade são exponenciais: a fatia k vai de near * (far / near)^(k / Z) até a próxima.
+        """
+        projection = np.asarray(projection, dtype=np.float32)
+        key = projection.tobytes()
+        if key == self._projection_key:
+            return
+        self._projection_key = key
+
+        grid_x, grid_y, grid_z = self.grid
+        near = projection[2, 3] / (projection[2, 2] - 1)
+        far = projection[2, 3] / (projection[2, 2] + 1)
+        depths = near * (far / near) ** (np.arange(grid_z + 1) / grid_z)
+
+        # Em cada fatia, a extensão de cada tile cresce com a profundidade: o intervalo cobre as duas pontas
+        def tile_bounds(count: int, scale: float) -> np.ndarray:
+            edges = np.linspace(-1, 1, count + 1) / scale
+            ends = np.stack([edges[None, :] * depths[:-1, None], edges[None, :] * depths[1:, None]], axis=-1)
+            low = np.minimum(ends[:, :-1].min(axis=-1), ends[:, 1:].min(axis=-1))
+            high = np.maximum(ends[:, :-1].max(axis=-1), ends[:, 1:].max(axis=-1))
+            return np.stack([low, high], axis=-1).astype(np.float32)
+
+        self._x_bounds = tile_bounds(grid_x, projection[0, 0])
+        self._y_bounds = tile_bounds(grid_y, projection[1, 1])
+        self._z_bounds = np.stack([-depths[1:], -depths[:-1]], axis=1).astype(np.float32)
+
+        scale = grid_z / np.log(far / near)
+        data = np.zeros(CLUSTER_BLOCK_SIZE // 4, dtype=np.float32)
+        data[0:3].view(np.uint32)[:] = self.grid
+        data[4:6] = near, scale
+        self.cluster_block.write(data)
+
+def _upload_storage(buffer: int, data: np.ndarray) -> None:
+    data = np.ascontiguousarray(data)
+    glBindBuffer(GL_SHADER_STORAGE_BUFFER, buffer)
+    glBufferData(GL_SHADER_STORAGE_BUFFER, data.nbytes, data, GL_STREAM_DRAW)
+    glBindBuffer(GL_SHADER_STORAGE_BUFFER, 0)
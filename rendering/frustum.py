@@ -0,0 +1,35 @@
+import numpy as np
+
+class Frustum:
+    """
+    Os 6 planos do volume de visão (esquerda, direita, baixo, cima, perto, longe), extraídos da
+    matriz projeção * visualização. Cada plano é (a, b, c, d), com a normal apontando para dentro
+    e normalizada, de forma que a*x + b*y + c*z + d é a distância assinada do ponto ao plano.
+    """
+    def __init__(self, view: np.ndarray, projection: np.ndarray):
+        clip = np.asarray(projection, dtype=np.float64) @ np.asarray(view, dtype=np.float64)
+        planes = np.array([
+            clip[3] + clip[0],
+            clip[3] - clip[0],
+            clip[3] + clip[1],
+            clip[3] - clip[1],
+            clip[3] + clip[2],
+            clip[3] - clip[2],
+        ])
+        planes /= np.linalg.norm(planes[:, :3], axis=1, keepdims=True)
+        self.planes = planes.astype(np.float32)
+
+    def test_aabbs(self, centers: np.ndarray, extents: np.ndarray) -> np.ndarray:
+        """
+        Testa várias AABBs (centro e meia-extensão, (N, 3)) de uma vez.
+        Retorna True para as que não estão totalmente fora de algum plano (teste conservador).
+        """
+        normals = self.planes[:, :3]
+        distances = centers @ normals.T + self.planes[:, 3]
+        radii = extents @ np.abs(normals).T
+        return np.all(distances + radii >= 0, axis=1)
+
+    def test_spheres(self, centers: np.ndarray, radii: np.ndarray) -> np.ndarray:
+        """Testa várias esferas (centros (N, 3), raios (N,)) de uma vez."""
+        distances = centers @ self.planes[:, :3].T + self.planes[:, 3]
+        return np.all(distances + radii[:, None] >= 0, axis=1)
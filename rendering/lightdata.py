@@ -1,6 +1,14 @@
 import numpy as np
 from editablevalue import EditableValue;
 
+ATTENUATION = (1.0, 0.01, 0.001)
+'Termos constante, linear e quadrático de calc_attenuation em lit.frag.'
+
+def calc_attenuation(distances: np.ndarray) -> np.ndarray:
+    """Mesma atenuação por distância de lit.frag."""
+    constant, linear, quadratic = ATTENUATION
+    return 1.0 / (constant + linear * distances + quadratic * distances * distances)
+
 class LightData:
     """
     Classe que representa uma fonte de luz em uma cena.
@@ -13,11 +21,14 @@ class LightData:
                  default_intensity: float = 1.0,
                  min_intensity: float = 0.0,
                  max_intensity: float = 1.5,
-                 world_position: np.ndarray = [0, 0, 0]):
+                 world_position: np.ndarray = [0, 0, 0],
+                 light_range: float | None = None):
         self.name = name
         self.default_color = np.array(color, dtype=np.float32)
         self.intensity = EditableValue(default_intensity, min_intensity, max_intensity, name + ' Intensity')
         self.world_position = np.array(world_position, dtype=np.float32)
+        self.light_range = light_range
+        'Se definido, a luz se apaga suavemente até essa distância (só na iluminação clusterizada), limitando os clusters que ela ocupa.'
     
     @property
     def color(self) -> np.ndarray:
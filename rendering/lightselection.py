@@ -0,0 +1,49 @@
+import numpy as np
+from rendering.lightdata import LightData, calc_attenuation
+
+class LightGroup:
+    """
+    Luzes candidatas de um trecho da cena (ex: as de uma célula), com posições e intensidades
+    em arrays para a seleção. state muda sempre que alguma luz se move ou muda de cor.
+    positions substitui as posições atuais das luzes (ex: as de um SceneSnapshot).
+    """
+    def __init__(self, index: int, lights: list[LightData], positions: list[np.ndarray] | None = None):
+        self.index = index
+        self.lights = list(lights)
+        if positions is None:
+            positions = [light.world_position for light in self.lights]
+        self.positions = np.array(positions, dtype=np.float32).reshape(-1, 3)
+        self.strengths = np.array([np.max(light.color) for light in self.lights], dtype=np.float32)
+        self.state = self.positions.tobytes() + self.strengths.tobytes() + np.array([id(light) for light in self.lights]).tobytes()
+
+class LightSelector:
+    """
+    Escolhe, para cada objeto, as count luzes do grupo que mais o iluminam: intensidade vezes a atenuação
+    do shader na distância até a esfera envolvente do objeto. As luzes escolhidas ficam na ordem do grupo.
+    A escolha é guardada por objeto e só é refeita quando o objeto ou alguma luz do grupo muda.
+    """
+    def __init__(self, count: int):
+        self.count = count
+        self.cache: dict[int, tuple[bytes, bytes, tuple[LightData, ...]]] = {}
+        self.selections = 0
+        'Escolhas recalculadas desde o último reset_stats (as demais vieram do cache).'
+
+    def select(self, key: int, center: np.ndarray, radius: float, group: LightGroup) -> tuple[LightData, ...]:
+        if len(group.lights) <= self.count:
+            return tuple(group.lights)
+
+        object_state = np.append(center, radius).astype(np.float32).tobytes()
+        cached = self.cache.get(key)
+        if cached is not None and cached[0] == object_state and cached[1] == group.state:
+            return cached[2]
+
+        distances = np.maximum(np.linalg.norm(group.positions - center, axis=1) - radius, 0)
+        influences = group.strengths * calc_attenuation(distances)
+        chosen = np.sort(np.argsort(-influences, kind='stable')[:self.count])
+        selection = tuple(group.lights[i] for i in chosen)
+        self.cache[key] = (object_state, group.state, selection)
+        self.selections += 1
+        return selection
+
+    def reset_stats(self) -> None:
+        self.selections = 0
@@ -1,11 +1,15 @@
 from OpenGL.GL import *
-from PIL import Image
 import numpy as np
 import os
 from editablevalue import EditableValue
 from rendering.litmode import LitMode
+from rendering.textureimage import TextureImage
+from rendering.textureregistry import TextureEntry, texture_registry
+from rendering.uniformbuffer import UniformBuffer, MATERIAL_BLOCK_BINDING
 
 TEXTURE_SUB_FOLDER = 'textures'
+MATERIAL_BLOCK_SIZE = 64
+'Tamanho do MaterialBlock (std140): ka, kd e ks como vec4, ns e colorMultiplier.'
 
 class LightParameters:
     """
@@ -44,10 +48,18 @@ class Material:
                  color_multiplier_editable: EditableValue = None,
                  lit_mode: LitMode = LitMode.LIT,
                  wrap_type = GL_REPEAT,
-                 filter_type = GL_LINEAR):
-        self.texture_id = None
+                 filter_type = GL_LINEAR,
+                 image: TextureImage | None = None,
+                 anisotropy: float = 1.0):
+        """
+        filter_type pode ser um filtro com mipmap (ex: GL_LINEAR_MIPMAP_LINEAR para trilinear),
+        e anisotropy > 1 habilita filtragem anisotrópica.
+        """
+        self.texture: TextureEntry = None
         self.ebo = None
         self.indices = None
+        self.uniform_buffer: UniformBuffer = None
+        self.uploaded_color_multiplier = None
         
         self.light_parameters = light_parameters
         self.color_multiplier_editable = color_multiplier_editable
@@ -55,40 +67,72 @@ class Material:
         if color_multiplier_editable is None:
             self.color_multiplier_editable = EditableValue(1.0, 0.35, 1.5, 'Cor')
 
-        self._load_texture(texture_path, wrap_type, filter_type)
+        self._load_texture(texture_path, wrap_type, filter_type, image, anisotropy)
+        self.uniform_buffer = UniformBuffer(MATERIAL_BLOCK_SIZE, MATERIAL_BLOCK_BINDING, usage=GL_STATIC_DRAW)
+        self.update_uniform_buffer()
+
+    @property
+    def texture_id(self) -> int:
+        """Id da textura atual, que é um placeholder enquanto a textura real carrega."""
+        return self.texture.texture_id
 
     @property
     def color_multiplier(self) -> float:
         return self.color_multiplier_editable.value
 
-    def _load_texture(self, texture_path: str, wrap_type, filter_type) -> None:
-        self.texture_id = glGenTextures(1)
-
-        glBindTexture(GL_TEXTURE_2D, self.texture_id)
-        self.set_wrap_mode(wrap_type)
-        self.set_filter_mode(filter_type)
-
-        img = Image.open(texture_path).convert("RGBA")
-        img_width, img_height = img.size
-        image_data = img.tobytes("raw", "RGBA", 0, -1)
-        glTexImage2D(
-            GL_TEXTURE_2D, 0,
-            GL_RGBA,
-            img_width, img_height, 0,
-            GL_RGBA,
-            GL_UNSIGNED_BYTE,
-            image_data
-        )
+    def _load_texture(self, texture_path: str, wrap_type, filter_type, image: TextureImage | None = None, anisotropy: float = 1.0) -> None:
+        """
+        Obtém a textura do registro compartilhado, que só carrega o arquivo se nenhum outro material
+        já usar a mesma imagem com os mesmos parâmetros. O carregamento é assíncrono: até terminar,
+        o material usa um placeholder. Se a imagem já tiver sido decodificada (ex: por outro processo),
+        ela é usada no lugar do arquivo.
+        """
+        self.texture_path = texture_path
+        self.wrap_type = wrap_type
+        self.filter_type = filter_type
+        self.anisotropy = anisotropy
+        self.texture = texture_registry.acquire(texture_path, wrap_type, filter_type, image, anisotropy)
 
     def set_wrap_mode(self, wrap_type):
-        glBindTexture(GL_TEXTURE_2D, self.texture_id)
-        glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_WRAP_S, wrap_type)
-        glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_WRAP_T, wrap_type)
+        self._set_sampling(wrap_type, self.filter_type, self.anisotropy)
+
+    def set_filter_mode(self, filter_type, anisotropy: float | None = None):
+        """Filtros com mipmap usam a pirâmide pré-calculada (e em cache) da textura."""
+        if anisotropy is None:
+            anisotropy = self.anisotropy
+        self._set_sampling(self.wrap_type, filter_type, anisotropy)
 
-    def set_filter_mode(self, filter_type):
-        glBindTexture(GL_TEXTURE_2D, self.texture_id)
-        glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MIN_FILTER, filter_type)
-        glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MAG_FILTER, filter_type)
+    def _set_sampling(self, wrap_type, filter_type, anisotropy: float):
+        """
+        Texturas são compartilhadas, então não alteramos os parâmetros da atual:
+        trocamos pela textura do registro com os novos parâmetros.
+        """
+        if wrap_type == self.wrap_type and filter_type == self.filter_type and anisotropy == self.anisotropy:
+            return
+        old_texture = self.texture
+        self._load_texture(self.texture_path, wrap_type, filter_type, anisotropy=anisotropy)
+        texture_registry.release(old_texture)
+
+    def update_uniform_buffer(self) -> None:
+        """Reescreve o MaterialBlock com os parâmetros de iluminação e o multiplicador de cor atuais."""
+        params = self.light_parameters
+        data = np.zeros(MATERIAL_BLOCK_SIZE // 4, dtype=np.float32)
+        data[0:3] = params.ka
+        data[4:7] = params.kd
+        data[8:11] = params.ks
+        data[12] = params.ns
+        data[13] = self.color_multiplier
+        self.uniform_buffer.write(data)
+        self.uploaded_color_multiplier = self.color_multiplier
+
+    def bind_uniform_buffer(self) -> None:
+        """
+        Liga o MaterialBlock do material para a próxima renderização.
+        O buffer só é reescrito se o multiplicador de cor (editável) tiver mudado.
+        """
+        if self.color_multiplier != self.uploaded_color_multiplier:
+            self.update_uniform_buffer()
+        self.uniform_buffer.bind()
 
     def setup_ebo(self, indices: np.ndarray) -> None:
         """
@@ -102,26 +146,85 @@ class Material:
         glBufferData(GL_ELEMENT_ARRAY_BUFFER, indices.nbytes, indices, GL_STATIC_DRAW)
 
     def destroy(self):
-        glDeleteTextures([self.texture_id])
+        texture_registry.release(self.texture)
         if self.ebo is not None:
             glDeleteBuffers(1, [self.ebo])
+        if self.uniform_buffer is not None:
+            self.uniform_buffer.destroy()
 
     @staticmethod
-    def try_load_material(file_name: str, root_path: str, light_parameters: LightParameters = LightParameters()):
+    def try_load_material(file_name: str, root_path: str, light_parameters: LightParameters = LightParameters(), images: dict[str, TextureImage] | None = None):
         """
         Tenta carregar um material a partir de uma textura. 
         Tenta primeiro em 'root_path/textures/file_name', depois em 'root_path/file_name'.
         Se não conseguir, lança uma exceção.
         """
-        file_path = os.path.join(root_path, TEXTURE_SUB_FOLDER, file_name)
-        if os.path.isfile(file_path):
-            return Material(file_path, light_parameters=light_parameters)
-        
-        file_path = os.path.join(root_path, file_name)
-        if os.path.isfile(file_path):
-            return Material(file_path, light_parameters=light_parameters)
-        
-        raise Exception(f"Could not find texture {file_name} in {root_path}")
+        file_path = find_texture_path(file_name, root_path)
+        image = images.get(file_path) if images is not None else None
+        return Material(file_path, light_parameters=light_parameters, image=image)
+
+def find_texture_path(file_name: str, root_path: str) -> str:
+    """
+    Procura uma textura primeiro em 'root_path/textures/file_name', depois em 'root_path/file_name'.
+    Se não encontrar, lança uma exceção.
+    """
+    file_path = os.path.join(root_path, TEXTURE_SUB_FOLDER, file_name)
+    if os.path.isfile(file_path):
+        return file_path
+    
+    file_path = os.path.join(root_path, file_name)
+    if os.path.isfile(file_path):
+        return file_path
+    
+    raise Exception(f"Could not find texture {file_name} in {root_path}")
+
+class MaterialDescription:
+    """
+    Dados de um material lidos de um arquivo .mtl, sem nenhum recurso OpenGL.
+    Se texture_path for None, o material não tem textura e é ignorado.
+    """
+    def __init__(self, name: str | None, texture_path: str | None, light_parameters: LightParameters | None):
+        self.name = name
+        self.texture_path = texture_path
+        self.light_parameters = light_parameters
+
+def parse_mtl(mtl_path: str) -> list[MaterialDescription]:
+    """Lê um arquivo .mtl, retornando a descrição de cada material na ordem do arquivo."""
+    if not os.path.exists(mtl_path):
+        print(f"Mtl file {mtl_path} does not exist")
+        return []
+
+    descriptions = []
+    folder = os.path.dirname(mtl_path)
+    current_material_name = None
+    current_light_parameters: LightParameters = None
+    
+    with open(mtl_path, "r") as file:
+        for line in file:
+            values = line.strip().split(maxsplit=1)
+            if not values:
+                continue
+
+            if values[0] == 'newmtl':
+                if current_material_name is not None:
+                    print(f"Material {current_material_name} has no texture")
+                    descriptions.append(MaterialDescription(current_material_name, None, None))
+                current_material_name = values[1]
+                current_light_parameters = LightParameters()
+            elif values[0] == 'map_Kd': # albedo
+                file_name = os.path.basename(values[1])
+                texture_path = find_texture_path(file_name, folder)
+                descriptions.append(MaterialDescription(current_material_name, texture_path, current_light_parameters))
+                # reseta
+                current_material_name = None
+                current_light_parameters = None
+            elif current_light_parameters is not None: # parametros de luz (ks, kd, etc)
+                current_light_parameters.read_line(values[0], values[1])
+
+    if current_material_name is not None:
+        print(f"Material {current_material_name} has no texture")
+        descriptions.append(MaterialDescription(current_material_name, None, None))
+    return descriptions
 
 class MaterialLibrary:
     """
@@ -132,39 +235,19 @@ class MaterialLibrary:
         self.materials: dict[str, Material] = {}
 
     def load_mtl(self, mtl_path: str) -> None:
-        if not os.path.exists(mtl_path):
-            print(f"Mtl file {mtl_path} does not exist")
-            return
+        self.load_descriptions(parse_mtl(mtl_path))
 
-        folder = os.path.dirname(mtl_path)
-        current_material_name = None
-        current_light_parameters: LightParameters = None
-        
-        with open(mtl_path, "r") as file:
-            for line in file:
-                values = line.strip().split(maxsplit=1)
-                if not values:
-                    continue
-
-                if values[0] == 'newmtl':
-                    if current_material_name is not None:
-                        print(f"Material {current_material_name} has no texture")
-                        self.materials[current_material_name] = None
-                    current_material_name = values[1]
-                    current_light_parameters = LightParameters()
-                elif values[0] == 'map_Kd': # albedo
-                    file_name = os.path.basename(values[1])
-                    new_material = Material.try_load_material(file_name, folder, light_parameters=current_light_parameters)
-                    self.materials[current_material_name] = new_material
-                    # reseta
-                    current_material_name = None
-                    current_light_parameters = None
-                elif current_light_parameters is not None: # parametros de luz (ks, kd, etc)
-                    current_light_parameters.read_line(values[0], values[1])
-
-        if current_material_name is not None:
-            print(f"Material {current_material_name} has no texture")
-            self.materials[current_material_name] = None
+    def load_descriptions(self, descriptions: list[MaterialDescription], images: dict[str, TextureImage] | None = None) -> None:
+        """
+        Cria os materiais descritos, na ordem fornecida. Descrições sem textura viram None.
+        images permite fornecer texturas já decodificadas, indexadas pelo caminho.
+        """
+        for description in descriptions:
+            if description.texture_path is None:
+                self.materials[description.name] = None
+                continue
+            image = images.get(description.texture_path) if images is not None else None
+            self.materials[description.name] = Material(description.texture_path, light_parameters=description.light_parameters, image=image)
 
     def get_or_default(self, material_name: str) -> Material:
         """
@@ -185,8 +268,15 @@ class MaterialLibrary:
     
     def set(self, material_name: str, material: Material):
         self.materials[material_name] = material   
+
+    def set_filter_mode(self, filter_type, anisotropy: float | None = None):
+        """Aplica o filtro de textura a todos os materiais da biblioteca."""
+        for material in self.materials.values():
+            if material is not None:
+                material.set_filter_mode(filter_type, anisotropy)
     
     def destroy(self):
+        """Destrói os materiais, liberando suas referências às texturas compartilhadas."""
         for material in self.materials.values():
             if material is not None:
                 material.destroy()
\ No newline at end of file
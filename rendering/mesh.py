@@ -1,9 +1,19 @@
 import numpy as np
 from OpenGL.GL import *
 from rendering.materials import MaterialLibrary, Material
+from rendering.textureimage import TextureImage
+from rendering.objparser import ObjData, VERTEX_SIZE
+from rendering.meshcache import load_obj_data
+from rendering.trianglebvh import TriangleBVH, load_triangle_bvh
 import os
 
 ASSETS_SUB_FOLDER = 'assets'
+INSTANCE_ATTRIBUTE_LOCATION = 3
+'Primeira localização dos atributos por instância de lit.vert: in_model e in_mvp (mat4, 4 localizações cada, uma por coluna) e in_normalMatrix (mat3).'
+INSTANCE_SIZE = 176
+'Bytes por instância: colunas de in_model e in_mvp e as 3 colunas de in_normalMatrix, cada uma alinhada como vec4.'
+INSTANCE_BUFFER_BINDING = 3
+'Binding de vertex buffer do buffer de instâncias, separado dos bindings usados por glVertexAttribPointer (0 a 2).'
 
 loaded_meshes = {}
 
@@ -11,9 +21,16 @@ class Mesh:
     """
     Objeto que representa um mesh carregado de um arquivo .obj
     """
-    def __init__(self, obj_path: str, default_texture_path: str | None = None):
+    def __init__(self, obj_path: str, default_texture_path: str | None = None,
+                 obj_data: ObjData | None = None, images: dict[str, TextureImage] | None = None):
+        """
+        obj_data e images permitem fornecer dados já preparados fora da thread principal
+        (ver rendering.assetloader), restando apenas o envio para a GPU.
+        """
         self.obj_name = os.path.basename(obj_path).rstrip(".obj")
         self.asset_sub_folder = os.path.join(ASSETS_SUB_FOLDER, os.path.dirname(obj_path))
+        self.obj_path = os.path.join(ASSETS_SUB_FOLDER, obj_path)
+        self.triangle_bvh: TriangleBVH | None = None
 
         # Criação dos buffers
         self.vao = glGenVertexArrays(1)
@@ -22,11 +39,11 @@ class Mesh:
         # Carrega a textura padrão, se existir
         self.material_library = MaterialLibrary()
         if default_texture_path is not None:
-            default_material = Material.try_load_material(default_texture_path, self.asset_sub_folder)
+            default_material = Material.try_load_material(default_texture_path, self.asset_sub_folder, images=images)
             self.material_library.set(None, default_material)
 
         # Carrega o modelo
-        self._load_obj(os.path.join(ASSETS_SUB_FOLDER, obj_path))
+        self._load_obj(self.obj_path, obj_data, images)
 
         # Verifica erro
         error = glGetError()
@@ -39,97 +56,34 @@ class Mesh:
         glDeleteBuffers(1, [self.vbo])
         self.material_library.destroy()
 
-    def _load_obj(self, obj_path: str):
-        raw_vertex_list = []
-        raw_uv_list = []
-        raw_vn_list = []
-        
-        vertices = []
-        material_indices = {}
-        unique_vertex_map = {}
-
-        current_mat = None
-        with open(obj_path, "r") as file:
-            for line in file:
-                values = line.strip().split()
-                if not values:
-                    continue
-                ### recuperando materiais
-                if values[0] == 'mtllib':
-                    path = " ".join(values[1:])
-                    mtl_path = os.path.join(self.asset_sub_folder, path)
-                    self.material_library.load_mtl(mtl_path)
-                elif values[0] == 'usemtl':
-                    current_mat = values[1]
-                ### recuperando vertices
-                elif values[0] == 'v':
-                    raw_vertex_list.append(values[1:4])
-                ### recuperando coordenadas de textura
-                elif values[0] == 'vt':
-                    raw_uv_list.append(values[1:3])
-                ### recuperando normais
-                elif values[0] == 'vn':
-                    raw_vn_list.append(values[1:4])
-                ### recuperando faces 
-                elif values[0] == 'f':
-                    face = self._circular_sliding_window_of_three(values[1:])
-                    for v in face:
-                        # no .obj uma face é definida por indice_vertice/indice_vt/indice_vn
-                        # nesse trabalho não usaremos normais (vn)
-                        parts = v.split('/')
-                        if len(parts) == 1:
-                            print(f"Face sem coordenada de textura em {obj_path}")
-                            continue
-
-                        vertex_idx = int(parts[0])
-                        uv_idx = int(parts[1])
-                        vn_idx = int(parts[2]) if len(parts) > 2 else None
-
-                        # índices negativos são do fim da lista
-                        if vertex_idx < 0: 
-                            vertex_idx += len(raw_vertex_list) + 1
-                        if uv_idx < 0:
-                            uv_idx += len(raw_uv_list) + 1
-                        if vn_idx is not None and vn_idx < 0:
-                            vn_idx += len(raw_vn_list) + 1
-
-                        # prepara para armazenar os indices no material atual
-                        if current_mat not in material_indices:
-                            material_indices[current_mat] = []
-                        indices = material_indices[current_mat]
-
-                        # mantemos unicidade das tuplas vertice/uv/vn
-                        key = (vertex_idx, uv_idx, vn_idx)
-                        # se a tupla ja foi armazenada, usa o mesmo indice
-                        if key in unique_vertex_map: 
-                            indices.append(unique_vertex_map[key])
-                        # caso contrário, armazena a tupla e o indice
-                        else:
-                            vertex = raw_vertex_list[int(vertex_idx) - 1]
-                            uv = raw_uv_list[int(uv_idx) - 1]
-                            vn = raw_vn_list[int(vn_idx) - 1] if vn_idx is not None else [0.0, 0.0, 0.0]
-
-                            idx = len(unique_vertex_map)
-                            unique_vertex_map[key] = idx
-
-                            vertices.extend([*vertex, *uv, *vn])
-                            indices.append(idx)
+    def _load_obj(self, obj_path: str, obj_data: ObjData | None = None, images: dict[str, TextureImage] | None = None):
+        # Dados compilados do .obj, vindos do cache binário quando possível
+        if obj_data is None:
+            obj_data = load_obj_data(obj_path)
+
+        ### recuperando materiais
+        self.material_library.load_descriptions(obj_data.materials, images)
+
+        self._compute_bounds(obj_data.vertices[:, 0:3])
+        indices = list(obj_data.material_indices.values())
+        self.triangles = np.concatenate(indices).reshape(-1, 3) if indices else np.zeros((0, 3), dtype=np.uint32)
+        'Índices dos triângulos de todos os materiais, usados pela BVH de triângulos.'
 
         # Define o contexto como sendo o VAO desse objeto
         glBindVertexArray(self.vao)
 
         # Envia dados de vértices para GPU
-        self.vertices = np.array(vertices, dtype=np.float32)
+        self.vertices = obj_data.vertices.reshape(-1)
         glBindBuffer(GL_ARRAY_BUFFER, self.vbo)
         glBufferData(GL_ARRAY_BUFFER, self.vertices.nbytes, self.vertices, GL_STATIC_DRAW)
 
         # Envia índices para cada material
-        for mat_name, indices in material_indices.items():
+        for mat_name, indices in obj_data.material_indices.items():
             material = self.material_library.get_or_default(mat_name)
             material.setup_ebo(indices)
 
-        # Define o layout dos atributos de vértice no shader
-        stride = 8 * self.vertices.itemsize  # 3 (posição) + 2 (uv) + 3 (normais) = 8
+        # Define o layout dos atributos de vértice no shader
+        stride = VERTEX_SIZE * self.vertices.itemsize  # 3 (posição) + 2 (uv) + 3 (normais) = 8
 
         glEnableVertexAttribArray(0)  # Posição
         glVertexAttribPointer(0, 3, GL_FLOAT, GL_FALSE, stride, ctypes.c_void_p(0))
@@ -139,19 +93,34 @@ class Mesh:
 
         glEnableVertexAttribArray(2)  # Normais
         glVertexAttribPointer(2, 3, GL_FLOAT, GL_FALSE, stride, ctypes.c_void_p(5 * self.vertices.itemsize))
+
+        # Matrizes de modelo, projection * view * model e de normal por instância.
+        # O buffer é do Renderer e é vinculado a cada frame.
+        for column in range(11):
+            location = INSTANCE_ATTRIBUTE_LOCATION + column
+            glEnableVertexAttribArray(location)
+            glVertexAttribFormat(location, 3 if column >= 8 else 4, GL_FLOAT, GL_FALSE, column * 16)
+            glVertexAttribBinding(location, INSTANCE_BUFFER_BINDING)
+        glVertexBindingDivisor(INSTANCE_BUFFER_BINDING, 1)
         
         # Limpa o contexto do VAO
         glBindVertexArray(0)
 
-    def _circular_sliding_window_of_three(self, arr: list) -> list:
-        if len(arr) == 3:
-            return arr
-        
-        circular_arr = arr + [arr[0]]
-        result = []
-        for i in range(len(circular_arr) - 2):
-            result.extend(circular_arr[i:i+3])
-        return result
+    def get_triangle_bvh(self) -> TriangleBVH:
+        """BVH dos triângulos no espaço local do mesh, construída (ou lida do cache em disco) na primeira chamada."""
+        if self.triangle_bvh is None:
+            positions = self.vertices.reshape(-1, VERTEX_SIZE)[:, 0:3]
+            self.triangle_bvh = load_triangle_bvh(self.obj_path, positions, self.triangles)
+        return self.triangle_bvh
+
+    def _compute_bounds(self, positions: np.ndarray):
+        """Calcula a AABB local e a esfera envolvente (centrada na AABB) dos vértices."""
+        if len(positions) == 0:
+            positions = np.zeros((1, 3), dtype=np.float32)
+        self.aabb_min = positions.min(axis=0)
+        self.aabb_max = positions.max(axis=0)
+        self.bounding_center = (self.aabb_min + self.aabb_max) / 2
+        self.bounding_radius = float(np.max(np.linalg.norm(positions - self.bounding_center, axis=1)))
 
     @staticmethod
     def from_path(obj_path: str, default_texture_path: str | None = None) -> "Mesh":
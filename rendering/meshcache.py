@@ -0,0 +1,88 @@
+import os
+from rendering.binarycache import get_cache_path, read_cache, write_cache
+from rendering.objparser import ObjData, parse_obj
+from rendering.materials import MaterialDescription, LightParameters, parse_mtl
+
+CACHE_KIND = 'meshes'
+CACHE_VERSION = 1
+
+def load_obj_data(obj_path: str) -> ObjData:
+    """
+    Retorna os dados compilados de um .obj (vértices, índices e materiais).
+    Usa o cache binário se ele existir e estiver válido; caso contrário, faz o parsing
+    do .obj e dos .mtl e grava um novo cache para as próximas execuções.
+    """
+    cache_path = get_cache_path(CACHE_KIND, obj_path)
+    obj_data = read_obj_cache(cache_path, obj_path)
+    if obj_data is not None:
+        return obj_data
+
+    obj_data = compile_obj(obj_path)
+    try:
+        write_obj_cache(cache_path, obj_path, obj_data)
+    except OSError as e:
+        print(f"Could not write mesh cache {cache_path}: {e}")
+    return obj_data
+
+def compile_obj(obj_path: str) -> ObjData:
+    """Faz o parsing do .obj e de todos os .mtl que ele referencia."""
+    obj_data = parse_obj(obj_path)
+    folder = os.path.dirname(obj_path)
+    for path in obj_data.mtllibs:
+        obj_data.materials.extend(parse_mtl(os.path.join(folder, path)))
+    return obj_data
+
+def read_obj_cache(cache_path: str, obj_path: str) -> ObjData | None:
+    """Lê os dados de um .obj gravados por write_obj_cache, ou None se o cache não for válido."""
+    entry = read_cache(cache_path, CACHE_VERSION)
+    if entry is None:
+        return None
+
+    try:
+        metadata = entry.metadata
+        if metadata['obj_path'] != os.path.normpath(obj_path):
+            return None
+
+        materials = [
+            MaterialDescription(name, texture_path, _light_parameters_from_json(params))
+            for name, texture_path, params in metadata['materials']
+        ]
+        material_indices = {name: entry.arrays[key] for name, key in metadata['material_indices']}
+        return ObjData(entry.arrays['vertices'], material_indices, metadata['mtllibs'], materials)
+    except (KeyError, TypeError, ValueError) as e:
+        print(f"Invalid mesh cache {cache_path}, rebuilding: {e}")
+        return None
+
+def write_obj_cache(cache_path: str, obj_path: str, obj_data: ObjData) -> None:
+    """Grava o array intercalado de vértices, os índices de cada material e os materiais."""
+    arrays = {'vertices': obj_data.vertices}
+    material_indices = []
+    for i, (name, indices) in enumerate(obj_data.material_indices.items()):
+        key = f"indices_{i}"
+        arrays[key] = indices
+        material_indices.append([name, key])
+
+    # Arquivos de origem: o .obj e os .mtl referenciados
+    folder = os.path.dirname(obj_path)
+    sources = [obj_path] + [os.path.join(folder, path) for path in obj_data.mtllibs]
+
+    metadata = {
+        'obj_path': os.path.normpath(obj_path),
+        'material_indices': material_indices,
+        'materials': [
+            [material.name, material.texture_path, _light_parameters_to_json(material.light_parameters)]
+            for material in obj_data.materials
+        ],
+        'mtllibs': obj_data.mtllibs,
+    }
+    write_cache(cache_path, CACHE_VERSION, sources, metadata, arrays)
+
+def _light_parameters_to_json(params: LightParameters | None) -> dict | None:
+    if params is None:
+        return None
+    return {'ka': params.ka.tolist(), 'kd': params.kd.tolist(), 'ks': params.ks.tolist(), 'ns': params.ns}
+
+def _light_parameters_from_json(params: dict | None) -> LightParameters | None:
+    if params is None:
+        return None
+    return LightParameters(params['ka'], params['kd'], params['ks'], params['ns'])
@@ -0,0 +1,74 @@
+import numpy as np
+from rendering.binarycache import get_cache_path, read_cache, write_cache
+from rendering.textureimage import TextureImage, decode_texture
+
+CACHE_KIND = 'mips'
+CACHE_VERSION = 1
+ALPHA_CUTOFF = 0.9
+'Mesmo limiar do discard de lit.frag, usado para preservar a cobertura de texturas recortadas.'
+
+def load_mip_chain(texture_path: str, image: TextureImage | None = None) -> list[TextureImage]:
+    """
+    Retorna todos os níveis de mipmap de uma textura, do maior para o 1x1.
+    Usa a pirâmide já calculada em cache se ela existir e estiver válida; caso contrário,
+    decodifica a imagem (se não for fornecida), calcula os níveis e grava o cache.
+    """
+    cache_path = get_cache_path(CACHE_KIND, texture_path)
+    entry = read_cache(cache_path, CACHE_VERSION)
+    if entry is not None:
+        levels = [entry.arrays[f"level_{i}"] for i in range(len(entry.arrays))]
+        return [TextureImage(level.shape[1], level.shape[0], level) for level in levels]
+
+    if image is None:
+        image = decode_texture(texture_path)
+    levels = build_mip_chain(image)
+    try:
+        arrays = {f"level_{i}": level.data for i, level in enumerate(levels)}
+        write_cache(cache_path, CACHE_VERSION, [texture_path], {}, arrays)
+    except OSError as e:
+        print(f"Could not write mip cache {cache_path}: {e}")
+    return levels
+
+def build_mip_chain(image: TextureImage) -> list[TextureImage]:
+    """
+    Calcula a pirâmide de mipmaps com filtro box 2x2.
+    Em texturas com transparência, o alfa de cada nível é escalado para manter a mesma fração
+    de pixels acima de ALPHA_CUTOFF, evitando que folhas e grama sumam à distância.
+    """
+    pixels = np.frombuffer(image.data, dtype=np.uint8).reshape(image.height, image.width, 4)
+    levels = [TextureImage(image.width, image.height, pixels)]
+
+    alpha = pixels[..., 3]
+    has_cutout = bool(np.any(alpha < 255))
+    coverage = np.mean(alpha >= ALPHA_CUTOFF * 255)
+
+    current = pixels.astype(np.float32)
+    while current.shape[0] > 1 or current.shape[1] > 1:
+        current = _downsample(current)
+        level = current.copy()
+        if has_cutout:
+            level[..., 3] *= _alpha_scale(current[..., 3], coverage)
+        level = np.clip(np.rint(level), 0, 255).astype(np.uint8)
+        levels.append(TextureImage(level.shape[1], level.shape[0], level))
+    return levels
+
+def _downsample(pixels: np.ndarray) -> np.ndarray:
+    """Média de blocos 2x2 (ou 2x1 quando uma das dimensões já é 1). Dimensões ímpares perdem a última linha/coluna."""
+    height, width = pixels.shape[:2]
+    if height > 1:
+        pixels = (pixels[0:height // 2 * 2:2] + pixels[1:height // 2 * 2:2]) * 0.5
+    if width > 1:
+        pixels = (pixels[:, 0:width // 2 * 2:2] + pixels[:, 1:width // 2 * 2:2]) * 0.5
+    return pixels
+
+def _alpha_scale(alpha: np.ndarray, coverage: float, iterations: int = 12) -> float:
+    """Busca binária pela escala de alfa que mantém a cobertura acima do limiar."""
+    cutoff = ALPHA_CUTOFF * 255
+    low, high = 0.0, 4.0
+    for _ in range(iterations):
+        scale = (low + high) / 2
+        if np.mean(alpha * scale >= cutoff) < coverage:
+            low = scale
+        else:
+            high = scale
+    return max((low + high) / 2, 1.0) if coverage > 0 else 1.0
@@ -0,0 +1,201 @@
+import numpy as np
+
+VERTEX_SIZE = 8
+'Floats por vértice no VBO: 3 (posição) + 2 (uv) + 3 (normais).'
+
+class ObjData:
+    """
+    Resultado do parsing de um arquivo .obj, sem nenhum recurso OpenGL.
+    vertices: array float32 (N, 8) com posição, uv e normal intercalados.
+    material_indices: índices (uint32) de cada material, na ordem em que aparecem no arquivo.
+    mtllibs: caminhos dos .mtl referenciados, relativos à pasta do .obj.
+    materials: descrições (MaterialDescription) dos materiais dos mtllibs, quando já lidas.
+    """
+    def __init__(self, vertices: np.ndarray, material_indices: dict[str | None, np.ndarray], mtllibs: list[str], materials: list | None = None):
+        self.vertices = vertices
+        self.material_indices = material_indices
+        self.mtllibs = mtllibs
+        self.materials = materials if materials is not None else []
+
+def parse_obj(obj_path: str) -> ObjData:
+    """
+    Lê um arquivo .obj de uma vez, convertendo os blocos v/vt/vn e f em arrays.
+    A triangulação e a unicidade das tuplas vértice/uv/normal são feitas com operações vetorizadas.
+    """
+    with open(obj_path, "r") as file:
+        text = file.read()
+    lines = text.splitlines()
+    if text[:1].isspace() or '\n ' in text or '\n\t' in text:
+        lines = [line.strip() for line in lines]
+
+    # Classifica as linhas pelo prefixo (palavra-chave + separador)
+    heads = np.array([line[:3] for line in lines], dtype='U3')
+    if '\t' in text:
+        heads = np.char.replace(heads, '\t', ' ')
+    v_lines = np.flatnonzero(np.char.startswith(heads, 'v '))
+    vt_lines = np.flatnonzero(heads == 'vt ')
+    vn_lines = np.flatnonzero(heads == 'vn ')
+    f_lines = np.flatnonzero(np.char.startswith(heads, 'f '))
+
+    mtllibs = []
+    usemtl_lines, usemtl_names = [], []
+    for i in np.flatnonzero((heads == 'mtl') | (heads == 'use')):
+        values = lines[i].split(maxsplit=1)
+        if len(values) < 2:
+            continue
+        if values[0] == 'mtllib':
+            mtllibs.append(" ".join(values[1].split()))
+        elif values[0] == 'usemtl':
+            usemtl_lines.append(i)
+            usemtl_names.append(values[1].split()[0])
+
+    v_rows = [lines[i][2:] for i in v_lines]
+    vt_rows = [lines[i][3:] for i in vt_lines]
+    vn_rows = [lines[i][3:] for i in vn_lines]
+    face_rows = [lines[i][2:] for i in f_lines]
+
+    # quantidade de v/vt/vn lidos até cada face, para resolver índices negativos
+    face_offsets = np.stack([
+        np.searchsorted(v_lines, f_lines),
+        np.searchsorted(vt_lines, f_lines),
+        np.searchsorted(vn_lines, f_lines),
+    ], axis=1)
+
+    # material ativo em cada face (None antes do primeiro usemtl)
+    material_slots = np.searchsorted(usemtl_lines, f_lines, side='right')
+    slot_names = [None, *usemtl_names]
+    material_ids: dict[str | None, int] = {}
+    slot_ids = np.empty(len(slot_names), dtype=np.int64)
+    used_slots, first_faces = np.unique(material_slots, return_index=True)
+    for slot in used_slots[np.argsort(first_faces)]:
+        name = slot_names[slot]
+        if name not in material_ids:
+            material_ids[name] = len(material_ids)
+        slot_ids[slot] = material_ids[name]
+    face_materials = slot_ids[material_slots]
+
+    positions = _parse_float_rows(v_rows, 3)
+    uvs = _parse_float_rows(vt_rows, 2)
+    normals = _parse_float_rows(vn_rows, 3)
+
+    if not face_rows:
+        return ObjData(np.zeros((0, VERTEX_SIZE), dtype=np.float32), {}, mtllibs)
+
+    # Cada canto de face vira uma linha (v, vt, vn), vn = 0 quando ausente
+    corner_counts = np.fromiter(map(len, map(str.split, face_rows)), dtype=np.int64, count=len(face_rows))
+    corners, valid = _parse_face_corners(face_rows)
+    if not np.all(valid):
+        print(f"{np.count_nonzero(~valid)} cantos de face sem coordenada de textura em {obj_path}")
+
+    # índices negativos são relativos ao fim da lista no momento da face
+    offsets = np.repeat(face_offsets, corner_counts, axis=0)
+    corners = np.where(corners < 0, corners + offsets + 1, corners)
+
+    # Triangula como uma janela deslizante circular de três cantos
+    triangle_corners = _triangulate(corner_counts)
+    triangle_faces = np.repeat(np.arange(len(face_rows)), _triangle_counts(corner_counts))
+    corner_materials = np.repeat(triangle_faces, 3)
+    corner_materials = face_materials[corner_materials]
+
+    # Cantos sem uv são descartados depois da triangulação
+    keep = valid[triangle_corners]
+    triangle_corners = triangle_corners[keep]
+    corner_materials = corner_materials[keep]
+
+    # Mantemos unicidade das tuplas vertice/uv/vn, na ordem da primeira ocorrência
+    tuples = corners[triangle_corners]
+    unique_rows, indices = _unique_in_order(tuples)
+
+    vertices = np.zeros((len(unique_rows), VERTEX_SIZE), dtype=np.float32)
+    vertices[:, 0:3] = positions[unique_rows[:, 0] - 1]
+    vertices[:, 3:5] = uvs[unique_rows[:, 1] - 1]
+    has_normal = unique_rows[:, 2] != 0
+    vertices[has_normal, 5:8] = normals[unique_rows[has_normal, 2] - 1]
+
+    material_indices = {
+        name: indices[corner_materials == mat_id].astype(np.uint32)
+        for name, mat_id in material_ids.items()
+    }
+    material_indices = {name: idx for name, idx in material_indices.items() if len(idx) > 0}
+    return ObjData(vertices, material_indices, mtllibs)
+
+def _parse_float_rows(rows: list[str], width: int) -> np.ndarray:
+    """Converte as linhas de um bloco (v, vt ou vn) em um array float32 (N, width)."""
+    if not rows:
+        return np.zeros((0, width), dtype=np.float32)
+
+    flat = np.fromstring(" ".join(rows), dtype=np.float32, sep=" ")
+    if flat.size % len(rows) == 0 and flat.size // len(rows) >= width:
+        return flat.reshape(len(rows), -1)[:, :width]
+
+    # Linhas com quantidades diferentes de componentes (ex: "v x y z w" misturado)
+    return np.array([row.split()[:width] for row in rows], dtype=np.float32)
+
+def _parse_face_corners(face_rows: list[str]) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Converte os cantos 'v/vt/vn' de todas as faces em um array int64 (C, 3).
+    Retorna também a máscara de cantos válidos (que possuem coordenada de textura).
+    """
+    tokens = " ".join(face_rows).split()
+    parts_per_corner = tokens[0].count('/') + 1
+    if parts_per_corner >= 2 and '//' not in tokens[0]:
+        flat = np.fromstring(" ".join(tokens).replace('/', ' '), dtype=np.int64, sep=" ")
+        if flat.size == len(tokens) * parts_per_corner:
+            corners = np.zeros((len(tokens), 3), dtype=np.int64)
+            corners[:, :min(parts_per_corner, 3)] = flat.reshape(len(tokens), -1)[:, :3]
+            return corners, np.ones(len(tokens), dtype=bool)
+
+    # Formatos misturados: converte canto a canto
+    corners = np.zeros((len(tokens), 3), dtype=np.int64)
+    valid = np.zeros(len(tokens), dtype=bool)
+    for i, token in enumerate(tokens):
+        parts = token.split('/')
+        if len(parts) == 1 or parts[1] == '':
+            continue
+        valid[i] = True
+        corners[i, 0] = int(parts[0])
+        corners[i, 1] = int(parts[1])
+        if len(parts) > 2 and parts[2] != '':
+            corners[i, 2] = int(parts[2])
+    return corners, valid
+
+def _triangle_counts(corner_counts: np.ndarray) -> np.ndarray:
+    """Faces de 3 cantos geram 1 triângulo, as demais geram n - 1 (janela circular)."""
+    return np.where(corner_counts == 3, 1, np.maximum(corner_counts - 1, 0))
+
+def _triangulate(corner_counts: np.ndarray) -> np.ndarray:
+    """
+    Retorna os índices (globais) dos cantos de cada triângulo, achatados.
+    O triângulo i de uma face de n cantos usa os cantos i, i+1 e (i+2) % n.
+    """
+    triangle_counts = _triangle_counts(corner_counts)
+    face_starts = np.concatenate(([0], np.cumsum(corner_counts)[:-1]))
+    triangle_starts = np.concatenate(([0], np.cumsum(triangle_counts)[:-1]))
+
+    triangle_faces = np.repeat(np.arange(len(corner_counts)), triangle_counts)
+    local = np.arange(len(triangle_faces)) - triangle_starts[triangle_faces]
+    n = corner_counts[triangle_faces]
+
+    triangles = np.stack([local, local + 1, (local + 2) % n], axis=1)
+    triangles += face_starts[triangle_faces, None]
+    return triangles.reshape(-1)
+
+def _unique_in_order(rows: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Equivalente vetorizado de um dicionário tupla -> índice.
+    Retorna as linhas únicas na ordem da primeira ocorrência e o índice de cada linha de entrada.
+    """
+    if len(rows) == 0:
+        return rows, np.zeros(0, dtype=np.int64)
+
+    # Empacota (v, vt, vn) em uma única chave inteira
+    low = rows.min(axis=0)
+    span = rows.max(axis=0) - low + 1
+    shifted = rows - low
+    keys = (shifted[:, 0] * span[1] + shifted[:, 1]) * span[2] + shifted[:, 2]
+
+    _, first, inverse = np.unique(keys, return_index=True, return_inverse=True)
+    order = np.argsort(first, kind='stable')
+    rank = np.empty_like(order)
+    rank[order] = np.arange(len(order))
+    return rows[first[order]], rank[inverse.reshape(-1)]
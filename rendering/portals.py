@@ -0,0 +1,159 @@
+import numpy as np
+from rendering.lightdata import LightData
+
+MAX_PORTAL_DEPTH = 8
+'Quantos portais em sequência são atravessados a partir da célula da câmera.'
+NEAR_W = 1e-4
+'Coordenada w mínima (no clip space) para um ponto ser considerado à frente da câmera.'
+
+class CylinderVolume:
+    """
+    Cilindro vertical no espaço local de um objeto, usado para delimitar células.
+    transform deve ter world_transformation_matrix e node (ex: um Object).
+    """
+    def __init__(self, transform, radius: float, y_min: float, y_max: float):
+        self.transform = transform
+        self.radius = radius
+        self.y_min = y_min
+        self.y_max = y_max
+
+    def contains(self, world_point: np.ndarray, snapshot=None) -> bool:
+        local = np.linalg.inv(_get_matrix(self.transform, snapshot)) @ np.append(world_point, 1.0)
+        return bool(np.hypot(local[0], local[2]) <= self.radius and self.y_min <= local[1] <= self.y_max)
+
+class Cell:
+    """
+    Região da cena com seu container de objetos e seu conjunto de luzes.
+    core é um volume certamente dentro da célula e envelope um volume que a contém inteira;
+    entre os dois (ex: dentro das paredes) a câmera é considerada em todas as células possíveis.
+    Sem envelope, a célula ocupa todo o espaço fora das demais.
+    walls são objetos da célula que também delimitam as vizinhas (ex: a casca do cogumelo, vista por
+    dentro e por fora) e são renderizados com as luzes desta célula sempre que uma vizinha é visível.
+    """
+    def __init__(self, name: str, container, lights: list[LightData], core: CylinderVolume | None = None, envelope: CylinderVolume | None = None, walls: list | None = None):
+        self.name = name
+        self.container = container
+        self.lights = lights
+        self.core = core
+        self.envelope = envelope
+        self.walls = walls or []
+        self.portals: list['Portal'] = []
+
+class Portal:
+    """
+    Abertura entre duas células, dada por um polígono no espaço local de transform.
+    A visibilidade usa o retângulo de tela que envolve o polígono projetado.
+    """
+    def __init__(self, name: str, transform, points: np.ndarray, cell_a: Cell, cell_b: Cell):
+        self.name = name
+        self.transform = transform
+        self.points = np.asarray(points, dtype=np.float32)
+        self.cells = (cell_a, cell_b)
+        cell_a.portals.append(self)
+        cell_b.portals.append(self)
+
+    def other(self, cell: Cell) -> Cell:
+        return self.cells[1] if cell is self.cells[0] else self.cells[0]
+
+    def get_screen_rect(self, view_projection: np.ndarray, snapshot=None) -> np.ndarray | None:
+        """
+        Retângulo [x_min, y_min, x_max, y_max] em coordenadas normalizadas de tela que envolve o portal,
+        recortado no plano near. None se o portal estiver inteiramente atrás da câmera.
+        """
+        points = np.hstack([self.points, np.ones((len(self.points), 1), dtype=np.float32)])
+        clip = points @ (view_projection @ _get_matrix(self.transform, snapshot)).T
+        clip = _clip_polygon_near(clip)
+        if len(clip) == 0:
+            return None
+        ndc = clip[:, :2] / clip[:, 3:4]
+        return np.concatenate([ndc.min(axis=0), ndc.max(axis=0)])
+
+class PortalSystem:
+    """
+    Visibilidade por células e portais. A partir da célula da câmera, atravessa os portais
+    que aparecem na tela, restringindo a área visível ao retângulo recortado de cada portal.
+    Células não alcançadas podem ser ignoradas inteiras na renderização, junto com suas luzes.
+    As consultas aceitam um SceneSnapshot, de onde as matrizes dos portais e volumes são lidas
+    quando a simulação roda em outra thread.
+    """
+    def __init__(self, cells: list[Cell]):
+        self.cells = cells
+
+    def get_camera_cells(self, position: np.ndarray, snapshot=None) -> list[Cell]:
+        """Células que podem conter a câmera: mais de uma quando a posição é ambígua."""
+        cells = []
+        for cell in self.cells:
+            if cell.core is not None and cell.core.contains(position, snapshot):
+                return [cell]
+            if cell.envelope is None or cell.envelope.contains(position, snapshot):
+                cells.append(cell)
+        return cells
+
+    def get_visible_cells(self, position: np.ndarray, view: np.ndarray, projection: np.ndarray, snapshot=None) -> list[Cell]:
+        """Células visíveis da câmera, na ordem em que foram declaradas."""
+        view_projection = np.asarray(projection, dtype=np.float32) @ np.asarray(view, dtype=np.float32)
+        full_screen = np.array([-1, -1, 1, 1], dtype=np.float32)
+
+        visible = set()
+        stack = [(cell, full_screen, None, 0) for cell in self.get_camera_cells(position, snapshot)]
+        while stack:
+            cell, rect, entry_portal, depth = stack.pop()
+            visible.add(cell)
+            if depth >= MAX_PORTAL_DEPTH:
+                continue
+
+            for portal in cell.portals:
+                if portal is entry_portal:
+                    continue
+                portal_rect = portal.get_screen_rect(view_projection, snapshot)
+                if portal_rect is None:
+                    continue
+                clipped = np.concatenate([np.maximum(rect[:2], portal_rect[:2]), np.minimum(rect[2:], portal_rect[2:])])
+                if np.any(clipped[:2] >= clipped[2:]):
+                    continue
+                stack.append((portal.other(cell), clipped, portal, depth + 1))
+
+        return [cell for cell in self.cells if cell in visible]
+
+    def get_wall_cells(self, visible_cells: list[Cell]) -> list[Cell]:
+        """Células não visíveis cujas paredes devem ser renderizadas por serem vizinhas de uma célula visível."""
+        return [
+            cell for cell in self.cells
+            if cell.walls and cell not in visible_cells
+            and any(portal.other(cell) in visible_cells for portal in cell.portals)
+        ]
+
+def _get_matrix(transform, snapshot) -> np.ndarray:
+    """Matriz global de transform, lida do snapshot se houver."""
+    if snapshot is None:
+        return transform.world_transformation_matrix
+    return snapshot.render_matrices[transform.node]
+
+def _clip_polygon_near(clip: np.ndarray) -> np.ndarray:
+    """Recorta um polígono em clip space pelo plano w = NEAR_W (Sutherland-Hodgman)."""
+    inside = clip[:, 3] > NEAR_W
+    if np.all(inside):
+        return clip
+    if not np.any(inside):
+        return clip[:0]
+
+    result = []
+    for i in range(len(clip)):
+        current, following = clip[i], clip[(i + 1) % len(clip)]
+        current_inside, following_inside = inside[i], inside[(i + 1) % len(clip)]
+        if current_inside:
+            result.append(current)
+        if current_inside != following_inside:
+            t = (NEAR_W - current[3]) / (following[3] - current[3])
+            result.append(current + t * (following - current))
+    return np.array(result)
+
+def arc_portal_points(center_angle: float, half_angle: float, radius: float, y_min: float, y_max: float, samples: int = 5) -> np.ndarray:
+    """
+    Polígono de uma abertura em uma parede cilíndrica (ângulos em graus, medidos de +x para +z),
+    com pontos ao longo do arco para acompanhar a curvatura.
+    """
+    angles = np.deg2rad(np.linspace(center_angle - half_angle, center_angle + half_angle, samples))
+    bottom = np.stack([np.cos(angles) * radius, np.full(samples, y_min), np.sin(angles) * radius], axis=1)
+    top = np.stack([np.cos(angles) * radius, np.full(samples, y_max), np.sin(angles) * radius], axis=1)
+    return np.concatenate([bottom, top[::-1]])
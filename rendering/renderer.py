@@ -1,10 +1,29 @@
 from OpenGL.GL import *
 import numpy as np
+import time
 from camera import Camera
 from rendering.lightdata import LightData
-from rendering.mesh import Mesh
+from rendering.mesh import Mesh, INSTANCE_BUFFER_BINDING, INSTANCE_SIZE
+from matrixmath import normal_matrices
 from editablevalue import EditableValue
 from rendering.litmode import LitMode
+from rendering.renderqueue import DrawItem, RenderQueue, RenderStats
+from rendering.frustum import Frustum
+from rendering.uniformbuffer import UniformBuffer, FRAME_BLOCK_BINDING, LIGHT_BLOCK_BINDING
+from rendering.clusteredlighting import ClusteredLighting
+from rendering.lightselection import LightGroup, LightSelector
+from rendering.shaderprogram import ShaderProgram, read_shader_source
+
+MAX_LIGHTS = 3
+'Deve ser igual ao MAX_LIGHTS de lit.frag. Só limita o modo sem iluminação clusterizada.'
+FRAME_BLOCK_SIZE = 176
+'Tamanho do FrameBlock (std140): view, projection, viewPos, ambientLightColor e lightParamMultipliers.'
+LIGHT_BLOCK_SIZE = 16 + 32 * MAX_LIGHTS
+'Tamanho do LightBlock (std140): numLights (alinhado em 16 bytes) e MAX_LIGHTS luzes de dois vec4.'
+LIGHT_BLOCK_SLOTS = 16
+'Slots iniciais do LightBlock, um por conjunto de luzes distinto no frame (o buffer cresce se precisar).'
+MAX_LIGHT_GROUPS = 32
+'Grupos de luzes por frame (bits da máscara de grupos da iluminação clusterizada).'
 
 class Renderer:
     """
@@ -12,21 +31,49 @@ class Renderer:
     delegando a renderização para os programas de shader adequados.
     """
     def __init__(self, vert_path: str, frag_path: str):
-        # Cria o programa
-        self.program = glCreateProgram()
-        if not self.program:
-            raise RuntimeError('Error creating program')
-        
-        # Compila os shaders
-        self.vertex = self._compile_shader(GL_VERTEX_SHADER, vert_path, 'Vertex Shader')
-        self.fragment = self._compile_shader(GL_FRAGMENT_SHADER, frag_path, 'Fragment Shader')
-
-        # Linka o programa e verifica erros
-        glLinkProgram(self.program)
-        if not glGetProgramiv(self.program, GL_LINK_STATUS):
-            print(glGetProgramInfoLog(self.program))
-            raise RuntimeError('Linking error')
-        glUseProgram(self.program)
+        # Compila (ou carrega do cache) de uma vez todas as variantes do shader, uma por combinação de #defines
+        start = time.perf_counter()
+        vertex_source = read_shader_source(vert_path, 'Vertex Shader')
+        fragment_source = read_shader_source(frag_path, 'Fragment Shader')
+        self.programs: dict[tuple[str, ...], ShaderProgram] = {
+            defines: ShaderProgram(vertex_source, fragment_source, defines)
+            for defines in get_variant_defines()
+        }
+        cached = sum(program.from_cache for program in self.programs.values())
+        print(f"Loaded {len(self.programs)} shader programs in {(time.perf_counter() - start) * 1000:.1f}ms "
+              f"({cached} from cache, {len(self.programs) - cached} compiled)")
+        self.program = self.get_program(LitMode.LIT, MAX_LIGHTS, clustered=False)
+        'Programa em uso pelos envios genéricos (set_int, set_mat4...).'
+
+        # Blocos de uniforms compartilhados (o de material pertence a cada Material)
+        self.frame_block = UniformBuffer(FRAME_BLOCK_SIZE, FRAME_BLOCK_BINDING)
+        self.frame_data = np.zeros(FRAME_BLOCK_SIZE // 4, dtype=np.float32)
+        self.frame_block.bind()
+        self.light_block = UniformBuffer(LIGHT_BLOCK_SIZE, LIGHT_BLOCK_BINDING, slots=LIGHT_BLOCK_SLOTS)
+
+        # Luzes: cada chamada a set_light_uniforms define um grupo de candidatas, e cada objeto recebe
+        # as MAX_LIGHTS mais influentes do grupo. Conjuntos iguais compartilham um slot do LightBlock.
+        self.light_group = LightGroup(0, [])
+        self.light_group_count = 0
+        self.light_selector = LightSelector(MAX_LIGHTS)
+        self.light_sets: dict[tuple[int, ...], tuple[int, tuple[LightData, ...]]] = {}
+
+        # Iluminação clusterizada: todas as luzes do frame, com a máscara dos grupos (slots) em que aparecem
+        self.clustered_lighting = ClusteredLighting()
+        self.use_clustered_lighting = True
+        self.frame_lights: dict[int, tuple[LightData, int]] = {}
+        self.view = np.identity(4, dtype=np.float32)
+        self.projection = np.identity(4, dtype=np.float32)
+
+        # Fila de draws do frame e contadores do último envio
+        self.render_queue = RenderQueue()
+        self.instance_buffer = glGenBuffers(1)
+        self.stats = RenderStats()
+        self.camera_position = np.zeros(3, dtype=np.float32)
+        self.frustum: Frustum | None = None
+        self.visibility = None
+        self.snapshot = None
+        'SceneSnapshot do frame, lido no lugar do estado atual da cena quando a simulação roda em outra thread.'
 
         # Habilita teste de profundidade
         glEnable(GL_DEPTH_TEST)
@@ -49,107 +96,342 @@ class Renderer:
             'ns': EditableValue(1, 0, 2, 'Ns Multiplier'),
         }
 
+    def toggle_clustered_lighting(self) -> None:
+        self.use_clustered_lighting = not self.use_clustered_lighting
+        print(f"Clustered lighting: {'on' if self.use_clustered_lighting else 'off'}")
+
     def toggle_wireframe(self) -> None:
         if glGetIntegerv(GL_POLYGON_MODE)[0] == GL_FILL:
             glPolygonMode(GL_FRONT_AND_BACK, GL_LINE)
         else:
             glPolygonMode(GL_FRONT_AND_BACK, GL_FILL)
     
-    # Funções para enviar parâmetros genéricos
+    def get_program(self, lit_mode: LitMode, light_count: int, clustered: bool) -> ShaderProgram:
+        """Variante do shader para o modo de iluminação e as luzes do draw."""
+        return self.programs[get_defines(lit_mode, light_count, clustered)]
+
+    # Funções para enviar parâmetros genéricos ao programa em uso
+    # Todas ignoram o envio se a uniform já tiver o mesmo valor no programa.
     def set_mat4(self, name: str, value: np.ndarray) -> None:
-        value = value.reshape(1,16) # Achata a matriz para formato OpenGL
-        glUniformMatrix4fv(glGetUniformLocation(self.program, name), 1, GL_TRUE, value)
+        self.program.set_mat4(name, value)
 
     def set_int(self, name: str, value: int) -> None:
-        glUniform1i(glGetUniformLocation(self.program, name), value)
+        self.program.set_int(name, value)
 
     def set_float(self, name: str, value: float) -> None:
-        glUniform1f(glGetUniformLocation(self.program, name), value)
+        self.program.set_float(name, value)
 
     def set_vec3(self, name: str, value: np.ndarray) -> None:
-        glUniform3fv(glGetUniformLocation(self.program, name), 1, value)
+        self.program.set_vec3(name, value)
     
     def set_bool(self, name: str, value: bool) -> None:
-        self.set_int(name, int(value))
+        self.program.set_bool(name, value)
 
     # Funções para enviar parâmetros especiais
     def set_camera_uniforms(self, camera: Camera) -> None:
-        """Define a matriz de visualização e a matriz de projeção a partir de uma câmera."""
+        """
+        Atualiza o FrameBlock com a matriz de visualização, a matriz de projeção e a posição da câmera.
+        Os multiplicadores globais de parâmetros de luz também são enviados aqui, uma vez por frame,
+        e o frustum da câmera é guardado em self.frustum para o culling.
+        Também recomeça os grupos e conjuntos de luzes do frame.
+        """
         view = camera.get_view_matrix()
-        self.set_mat4("view", view)
-
         projection = camera.get_projection_matrix()
-        self.set_mat4("projection", projection)
+        self.view, self.projection = view, projection
+        self.frustum = Frustum(view, projection)
 
-        position = camera.position
-        self.set_vec3("viewPos", position)
+        # std140 espera matrizes por coluna, então enviamos as transpostas
+        self.frame_data[0:16] = np.asarray(view, dtype=np.float32).T.reshape(16)
+        self.frame_data[16:32] = np.asarray(projection, dtype=np.float32).T.reshape(16)
+        self.frame_data[32:35] = camera.position
+        self.camera_position = np.array(camera.position, dtype=np.float32)
+        multipliers = self.light_param_multipliers
+        self.frame_data[40:44] = [multipliers[name].value for name in ('ka', 'kd', 'ks', 'ns')]
+        self.frame_block.write(self.frame_data)
+        self.light_group_count = 0
+        self.light_sets.clear()
+        self.frame_lights.clear()
+        self.light_selector.reset_stats()
     
     def set_light_uniforms(self, lights: list[LightData]):
-        """Define as luzes a serem consideradas na renderização."""
-        self.set_int("numLights", len(lights))
-        for i in range(len(lights)):
-            light = lights[i]
-            self.set_vec3(f"lights[{i}].position", light.world_position)
-            self.set_vec3(f"lights[{i}].color", light.color)
-    
+        """
+        Define as luzes candidatas (um grupo) dos próximos draws adicionados à fila.
+        Sem iluminação clusterizada, cada objeto recebe as MAX_LIGHTS luzes do grupo que mais o iluminam;
+        com ela, o objeto recebe todas as luzes do grupo que alcançam o seu cluster.
+        """
+        if self.light_group_count == MAX_LIGHT_GROUPS:
+            raise RuntimeError(f"More than {MAX_LIGHT_GROUPS} light groups in a frame")
+        index = self.light_group_count
+        self.light_group_count += 1
+        self.light_group = LightGroup(index, lights, [self.get_light_position(light) for light in lights])
+
+        for light in lights:
+            _, groups = self.frame_lights.get(id(light), (light, 0))
+            self.frame_lights[id(light)] = (light, groups | 1 << index)
+
     def set_ambient_light(self, ambient_light: LightData):
-        """Define a luz ambiente."""
-        self.set_vec3("ambientLightColor", ambient_light.color)
+        """Define a luz ambiente no FrameBlock."""
+        self.frame_data[36:39] = ambient_light.color
+        self.frame_block.write(self.frame_data)
 
-    def set_lit_mode(self, lit_mode: LitMode):
-        is_lit = lit_mode is LitMode.LIT or lit_mode is LitMode.LIT_BACKFACES        
-        self.set_bool("lit", is_lit)
-        self.set_bool("lightBackfaces", lit_mode is LitMode.LIT_BACKFACES)
+    def set_snapshot(self, snapshot) -> None:
+        """
+        Define o SceneSnapshot de onde os próximos frames leem matrizes, culling, posições de luzes e instâncias.
+        Com None, tudo é lido do estado atual da cena.
+        """
+        self.snapshot = snapshot
+
+    def get_light_position(self, light: LightData) -> np.ndarray:
+        """Posição global da luz no snapshot do frame, ou a atual se não houver snapshot."""
+        if self.snapshot is None:
+            return light.world_position
+        return self.snapshot.light_positions.get(id(light), light.world_position)
+
+    def set_visibility(self, visibility) -> None:
+        """
+        Define o resultado do frustum culling do frame (um CullResult, indexado pelo nó dos objetos).
+        Com None, todos os objetos são considerados visíveis.
+        """
+        self.visibility = visibility
+
+    def is_subtree_visible(self, node: int) -> bool:
+        return self.visibility is None or bool(self.visibility.subtree_visible[node])
+
+    def is_node_visible(self, node: int) -> bool:
+        return self.visibility is None or bool(self.visibility.node_visible[node])
 
-    def render_mesh(self, mesh: Mesh, world_transformation_matrix: np.ndarray, lit_mode_override: LitMode | None = None):
+    def queue_mesh(self, mesh: Mesh, world_transformation_matrix: np.ndarray, lit_mode_override: LitMode | None = None,
+                   key: int | None = None, normal_matrix: np.ndarray | None = None):
         """
-        Renderiza um mesh e seus materiais a partir da matriz de transformação.
+        Adiciona à fila um draw por material do mesh, com a matriz de transformação e as luzes do grupo atual.
         Se lit_mode_override for None, utiliza o modo de iluminação configurado no material da mesh.
-        """        
-        self.set_mat4('model', world_transformation_matrix)
+        key identifica o objeto (ex: seu nó) para guardar a escolha de luzes entre frames.
+        normal_matrix é a matriz de normal já calculada (ex: a do TransformStore); se omitida, é calculada aqui.
+        Nada é desenhado até submit_queue.
+        """
+        if normal_matrix is None:
+            normal_matrix = normal_matrices(world_transformation_matrix)
+        self._queue_materials(mesh, world_transformation_matrix, normal_matrix, world_transformation_matrix, lit_mode_override, key)
 
-        glBindVertexArray(mesh.vao)
-        offsets = self.light_param_multipliers
-        for material in mesh.material_library.materials.values():
-            params = material.light_parameters
-            self.set_vec3('ka', params.ka * offsets['ka'].value)
-            self.set_vec3('kd', params.kd * offsets['kd'].value)
-            self.set_vec3('ks', params.ks * offsets['ks'].value)
-            self.set_float('ns', params.ns * offsets['ns'].value)
-            self.set_float('colorMultiplier', material.color_multiplier)
+    def queue_mesh_instances(self, mesh: Mesh, world_transformation_matrices: np.ndarray, normal_matrices: np.ndarray,
+                             light_matrix: np.ndarray, lit_mode_override: LitMode | None = None, key: int | None = None):
+        """
+        Igual a queue_mesh, mas com um lote de matrizes ((N, 4, 4) e as de normal (N, 3, 3)), desenhado como
+        N instâncias de um único draw por material. As luzes são escolhidas uma vez para todo o lote,
+        com o mesh na transformação light_matrix (ex: a do emissor de partículas).
+        """
+        self._queue_materials(mesh, world_transformation_matrices, normal_matrices, light_matrix, lit_mode_override, key)
 
+    def _queue_materials(self, mesh: Mesh, world_transformation_matrix: np.ndarray, normal_matrix: np.ndarray,
+                         light_matrix: np.ndarray, lit_mode_override: LitMode | None, key: int | None):
+        light_slot, light_count = self._get_light_slot(mesh, light_matrix, key)
+        for material in mesh.material_library.materials.values():
             lit_mode = material.lit_mode if lit_mode_override is None else lit_mode_override
-            self.set_lit_mode(lit_mode)
-            
-            glBindTexture(GL_TEXTURE_2D, material.texture_id)
-            glBindBuffer(GL_ELEMENT_ARRAY_BUFFER, material.ebo)
-            glDrawElements(GL_TRIANGLES, len(material.indices), GL_UNSIGNED_INT, None)
-    
+            program = self.get_program(lit_mode, light_count, self.use_clustered_lighting)
+            self.render_queue.add(DrawItem(program, mesh, material, world_transformation_matrix, normal_matrix, lit_mode, light_slot))
+
+    def _get_light_slot(self, mesh: Mesh, world_transformation_matrix: np.ndarray, key: int | None) -> tuple[int, int]:
+        """
+        Slot do LightBlock com as luzes escolhidas para o objeto, reaproveitando o de um conjunto igual já usado
+        no frame, e a quantidade de luzes. Com iluminação clusterizada, o slot é o índice do grupo,
+        usado pelo shader para filtrar as luzes.
+        """
+        group = self.light_group
+        if self.use_clustered_lighting:
+            return group.index, len(group.lights)
+
+        if key is None or len(group.lights) <= MAX_LIGHTS:
+            lights = tuple(group.lights[:MAX_LIGHTS])
+        else:
+            matrix = np.asarray(world_transformation_matrix, dtype=np.float32)
+            center = matrix[:3, :3] @ mesh.bounding_center + matrix[:3, 3]
+            radius = mesh.bounding_radius * float(np.max(np.linalg.norm(matrix[:3, :3], axis=0)))
+            lights = self.light_selector.select(key, center, radius, group)
+
+        set_key = tuple(id(light) for light in lights)
+        if set_key not in self.light_sets:
+            self.light_sets[set_key] = (len(self.light_sets), lights)
+        return self.light_sets[set_key][0], len(lights)
+
+    def submit_queue(self) -> RenderStats:
+        """
+        Ordena a fila por estado e desenha todos os itens, pulando binds iguais ao anterior.
+        Itens consecutivos com o mesmo mesh, material, luzes e modo de iluminação viram um único
+        glDrawElementsInstanced, com as matrizes de modelo lidas do buffer de instâncias.
+        O estado vinculado é esquecido a cada envio, pois outras partes (ex: upload de texturas)
+        também fazem binds. Retorna os contadores do envio, também guardados em self.stats.
+        """
+        stats = RenderStats()
+        program = light_slot = texture_id = vao = material = None
+
+        queue = self.render_queue
+        queue.sort(self.camera_position)
+        base_instances = self._upload_instances(queue.items)
+        if self.use_clustered_lighting:
+            self._upload_clusters()
+        else:
+            self._upload_light_sets()
+
+        items = queue.items
+        first = 0
+        while first < len(items):
+            item = items[first]
+            count = 1
+            while first + count < len(items) and self._is_same_batch(item, items[first + count]):
+                count += 1
+
+            if item.program is not program:
+                program = self.program = item.program
+                glUseProgram(program.id)
+                stats.program_binds += 1
+            else:
+                stats.skipped_binds += 1
+
+            if item.light_slot != light_slot:
+                light_slot = item.light_slot
+                if not self.use_clustered_lighting:
+                    self.light_block.bind(light_slot)
+                stats.light_binds += 1
+            else:
+                stats.skipped_binds += 1
+
+            if item.material.texture_id != texture_id:
+                texture_id = item.material.texture_id
+                glBindTexture(GL_TEXTURE_2D, texture_id)
+                stats.texture_binds += 1
+            else:
+                stats.skipped_binds += 1
+
+            if item.mesh.vao != vao:
+                vao = item.mesh.vao
+                glBindVertexArray(vao)
+                glBindVertexBuffer(INSTANCE_BUFFER_BINDING, self.instance_buffer, 0, INSTANCE_SIZE)
+                stats.vao_binds += 1
+                material = None # O EBO faz parte do estado do VAO
+            else:
+                stats.skipped_binds += 1
+
+            if item.material is not material:
+                material = item.material
+                material.bind_uniform_buffer()
+                glBindBuffer(GL_ELEMENT_ARRAY_BUFFER, material.ebo)
+                stats.material_binds += 1
+                stats.ebo_binds += 1
+            else:
+                stats.skipped_binds += 2
+
+            if self.use_clustered_lighting:
+                program.set_int("lightGroup", light_slot) # Uniform de cada programa, ignorada se não mudou
+            instance_count = item.instance_count if item.batched else count
+            glDrawElementsInstancedBaseInstance(GL_TRIANGLES, len(material.indices), GL_UNSIGNED_INT, None, instance_count, base_instances[first])
+            stats.draws += 1
+            stats.instances += instance_count
+            stats.triangles += len(material.indices) // 3 * instance_count
+            first += count
+
+        if self.use_clustered_lighting:
+            stats.lights = self.clustered_lighting.light_count
+            stats.light_assignments = self.clustered_lighting.assignment_count
+        else:
+            stats.light_sets = len(self.light_sets)
+            stats.light_selections = self.light_selector.selections
+        if self.visibility is not None:
+            stats.drawn_objects = self.visibility.drawn_objects
+            stats.culled_objects = self.visibility.culled_objects
+
+        queue.clear()
+        self.stats = stats
+        return stats
+
+    def _is_same_batch(self, a: DrawItem, b: DrawItem) -> bool:
+        """Se os dois itens podem ser desenhados no mesmo draw instanciado."""
+        return (a.mesh is b.mesh and a.material is b.material and a.program is b.program
+                and a.light_slot == b.light_slot and a.lit_mode is b.lit_mode and not a.batched and not b.batched)
+
+    def _upload_light_sets(self) -> None:
+        """Envia de uma vez todos os conjuntos de luzes distintos do frame, um por slot do LightBlock."""
+        if not self.light_sets:
+            return
+        data = np.zeros((len(self.light_sets), LIGHT_BLOCK_SIZE // 4), dtype=np.float32)
+        for slot, lights in self.light_sets.values():
+            data[slot, 0:1].view(np.int32)[0] = len(lights)
+            for i, light in enumerate(lights):
+                offset = 4 + i * 8
+                data[slot, offset:offset + 3] = self.get_light_position(light)
+                data[slot, offset + 4:offset + 7] = light.color
+        self.light_block.write_slots(data)
+
+    def _upload_clusters(self) -> None:
+        """Atribui as luzes do frame aos clusters da câmera atual e vincula os buffers."""
+        lights = list(self.frame_lights.values())
+        positions = np.array([self.get_light_position(light) for light, _ in lights], dtype=np.float32).reshape(-1, 3)
+        colors = np.array([light.color for light, _ in lights], dtype=np.float32).reshape(-1, 3)
+        ranges = np.array([np.nan if light.light_range is None else light.light_range for light, _ in lights], dtype=np.float32)
+        groups = np.array([groups for _, groups in lights], dtype=np.uint32)
+        self.clustered_lighting.update(self.view, self.projection, positions, colors, ranges, groups)
+        self.clustered_lighting.bind()
+
+    def _upload_instances(self, items: list[DrawItem]) -> list[int]:
+        """
+        Envia as matrizes de todos os itens, na ordem da fila, para o buffer de instâncias:
+        modelo, projection * view * model (calculada aqui de uma vez) e normal.
+        Retorna a primeira instância de cada item. Lotes (ex: partículas) são enviados uma vez só,
+        mesmo que o mesh tenha vários materiais.
+        """
+        base_instances = []
+        batches: dict[int, int] = {}
+        models, normals = [], []
+        instance_count = 0
+        for item in items:
+            if item.batched and id(item.world_transformation_matrix) in batches:
+                base_instances.append(batches[id(item.world_transformation_matrix)])
+                continue
+            if item.batched:
+                batches[id(item.world_transformation_matrix)] = instance_count
+            base_instances.append(instance_count)
+            models.append(np.reshape(item.world_transformation_matrix, (-1, 4, 4)))
+            normals.append(np.reshape(item.normal_matrix, (-1, 3, 3)))
+            instance_count += item.instance_count
+        if not items:
+            return base_instances
+
+        models = np.concatenate(models).astype(np.float32)
+        normals = np.concatenate(normals)
+        mvps = (self.projection @ self.view).astype(np.float32) @ models
+
+        # Atributos de matriz são lidos por coluna, então enviamos as transpostas
+        instances = np.zeros((len(models), INSTANCE_SIZE // 4), dtype=np.float32)
+        instances[:, 0:16] = models.transpose(0, 2, 1).reshape(-1, 16)
+        instances[:, 16:32] = mvps.transpose(0, 2, 1).reshape(-1, 16)
+        instances[:, 32:44].reshape(-1, 3, 4)[:, :, :3] = normals.transpose(0, 2, 1)
+        glBindBuffer(GL_ARRAY_BUFFER, self.instance_buffer)
+        glBufferData(GL_ARRAY_BUFFER, instances.nbytes, instances, GL_STREAM_DRAW)
+        glBindBuffer(GL_ARRAY_BUFFER, 0)
+        return base_instances
+
     def destroy(self):
-        glDetachShader(self.program, self.vertex)
-        glDetachShader(self.program, self.fragment)
-        glDeleteShader(self.vertex)
-        glDeleteShader(self.fragment)
-        glDeleteProgram(self.program)
-
-    def _compile_shader(self, shader_type: any, shader_path: str, name: str) -> any:
-        try:
-            with open(shader_path, 'r') as shader_file:
-                shader_code = shader_file.read()
-        except IOError as e:
-            print(f"Erro ao abrir {name}")
-            raise e
-        
-        # Cria e compila o shader
-        shader = glCreateShader(shader_type)
-        glShaderSource(shader, shader_code)
-        
-        glCompileShader(shader)
-        if not glGetShaderiv(shader, GL_COMPILE_STATUS):
-            error = glGetShaderInfoLog(shader).decode()
-            print(error)
-            raise RuntimeError(f"Erro de compilacao do {name}")
-        
-        # Anexa o shader ao programa
-        glAttachShader(self.program, shader)
-        return shader
\ No newline at end of file
+        self.frame_block.destroy()
+        self.light_block.destroy()
+        self.clustered_lighting.destroy()
+        glDeleteBuffers(1, [self.instance_buffer])
+        for program in self.programs.values():
+            program.destroy()
+
+def get_defines(lit_mode: LitMode, light_count: int, clustered: bool) -> tuple[str, ...]:
+    """
+    #defines da variante do shader: o modo de iluminação e, nos modos iluminados, CLUSTERED
+    ou a quantidade de luzes do LightBlock (LIGHT_COUNT), para que o laço de luzes tenha tamanho fixo.
+    """
+    if lit_mode is LitMode.UNLIT:
+        return ('UNLIT',)
+    if clustered:
+        return (lit_mode.name, 'CLUSTERED')
+    return (lit_mode.name, f'LIGHT_COUNT {min(light_count, MAX_LIGHTS)}')
+
+def get_variant_defines() -> list[tuple[str, ...]]:
+    """Todas as variantes usadas pelo Renderer."""
+    variants = {get_defines(LitMode.UNLIT, 0, False)}
+    for lit_mode in (LitMode.LIT, LitMode.LIT_BACKFACES):
+        variants.add(get_defines(lit_mode, 0, True))
+        variants.update(get_defines(lit_mode, light_count, False) for light_count in range(MAX_LIGHTS + 1))
+    return sorted(variants)
@@ -0,0 +1,96 @@
+import numpy as np
+from rendering.mesh import Mesh
+from rendering.materials import Material
+from rendering.litmode import LitMode
+from rendering.shaderprogram import ShaderProgram
+
+class DrawItem:
+    """
+    Um draw pendente: um material de um mesh, com a transformação (e a matriz de normal), o modo de iluminação
+    e o conjunto de luzes escolhido para o objeto (slot do LightBlock ou, na iluminação clusterizada, o grupo).
+    As matrizes podem ser um lote ((N, 4, 4) e (N, 3, 3)), desenhado como N instâncias (ex: partículas).
+    """
+    def __init__(self, program: ShaderProgram, mesh: Mesh, material: Material, world_transformation_matrix: np.ndarray,
+                 normal_matrix: np.ndarray, lit_mode: LitMode, light_slot: int):
+        self.program = program
+        self.mesh = mesh
+        self.material = material
+        self.world_transformation_matrix = world_transformation_matrix
+        self.normal_matrix = normal_matrix
+        self.lit_mode = lit_mode
+        self.light_slot = light_slot
+        self.batched = np.ndim(world_transformation_matrix) == 3
+        self.instance_count = len(world_transformation_matrix) if self.batched else 1
+
+class RenderStats:
+    """
+    Contadores de um frame: draws (instanciados) enviados, binds feitos por tipo de estado, binds evitados,
+    objetos desenhados/descartados pelo frustum culling e dados das luzes: conjuntos distintos enviados
+    e escolhas por objeto recalculadas ou, na iluminação clusterizada, luzes e pares (luz, cluster).
+    """
+    def __init__(self):
+        self.draws = 0
+        self.instances = 0
+        self.triangles = 0
+        self.program_binds = 0
+        self.light_binds = 0
+        self.texture_binds = 0
+        self.vao_binds = 0
+        self.material_binds = 0
+        self.ebo_binds = 0
+        self.skipped_binds = 0
+        self.drawn_objects = 0
+        self.culled_objects = 0
+        self.light_sets = 0
+        self.light_selections = 0
+        self.lights = 0
+        self.light_assignments = 0
+        'Pares (luz, cluster) da iluminação clusterizada.'
+
+    @property
+    def state_changes(self) -> int:
+        """Total de binds efetivamente enviados ao OpenGL."""
+        return (self.program_binds + self.light_binds + self.texture_binds
+                + self.vao_binds + self.material_binds + self.ebo_binds)
+
+    def __str__(self):
+        return (f"{self.draws} draws, {self.instances} instances, {self.triangles} tris, {self.state_changes} state changes "
+                f"(program {self.program_binds}, lights {self.light_binds}, texture {self.texture_binds}, "
+                f"vao {self.vao_binds}, material {self.material_binds}, ebo {self.ebo_binds}), "
+                f"{self.skipped_binds} redundant binds skipped, "
+                f"{self.drawn_objects} objects drawn, {self.culled_objects} culled, "
+                f"{self.light_sets} light sets ({self.light_selections} reselected), "
+                f"{self.lights} clustered lights ({self.light_assignments} light-cluster pairs)")
+
+class RenderQueue:
+    """
+    Fila de draws de um frame. A cena emite os itens durante a travessia e a fila os ordena
+    por estado (programa, luzes, textura, VAO, material) antes do envio, para que o Renderer
+    possa pular binds repetidos e desenhar de uma vez, com instancing, os itens que só diferem
+    na transformação. Dentro do mesmo estado, os itens vão da frente para trás para aproveitar
+    o teste de profundidade.
+
+    Todos os materiais são tratados como opacos: o shader descarta fragmentos abaixo do limiar de alfa.
+    """
+    def __init__(self):
+        self.items: list[DrawItem] = []
+
+    def add(self, item: DrawItem) -> None:
+        self.items.append(item)
+
+    def sort(self, camera_position: np.ndarray) -> None:
+        """Ordena os itens por estado e, por último, pela distância até a câmera."""
+        if not self.items:
+            return
+        positions = np.array([item.world_transformation_matrix[..., :3, 3].reshape(-1, 3)[0] for item in self.items], dtype=np.float32)
+        distances = np.sum((positions - camera_position) ** 2, axis=1).tolist()
+
+        keys = [
+            (item.program.id, item.light_slot, item.material.texture_id, item.mesh.vao, item.material.ebo, item.lit_mode.value, distance)
+            for item, distance in zip(self.items, distances)
+        ]
+        order = sorted(range(len(self.items)), key=keys.__getitem__)
+        self.items = [self.items[i] for i in order]
+
+    def clear(self) -> None:
+        self.items.clear()
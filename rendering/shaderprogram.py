@@ -0,0 +1,194 @@
+from OpenGL.GL import *
+import numpy as np
+import ctypes
+import hashlib
+import os
+from rendering.binarycache import CACHE_FOLDER, read_cache, write_cache
+
+CACHE_KIND = 'programs'
+CACHE_VERSION = 1
+
+class ShaderProgram:
+    """
+    Programa de shader linkado a partir dos códigos de vértice e fragmento, compilados com
+    uma lista de #defines (uma variante). Guarda as localizações das uniforms e o último valor
+    enviado a cada uma, para ignorar envios repetidos.
+
+    O programa linkado é guardado em cache no disco (glGetProgramBinary), com uma chave que inclui os códigos,
+    os #defines e o driver. Nas próximas execuções ele é carregado com glProgramBinary, voltando
+    a compilar se o cache não existir ou o driver recusar o binário.
+    """
+    def __init__(self, vertex_source: str, fragment_source: str, defines: tuple[str, ...] = ()):
+        self.defines = defines
+        self.id = glCreateProgram()
+        if not self.id:
+            raise RuntimeError('Error creating program')
+
+        cache_path = get_program_cache_path(vertex_source, fragment_source, defines)
+        self.from_cache = self._load_binary(cache_path)
+        if not self.from_cache:
+            self._compile(vertex_source, fragment_source)
+            self._save_binary(cache_path)
+
+        # Consulta as localizações de todas as uniforms uma única vez
+        self.uniform_locations = self._get_uniform_locations()
+        self.uniform_values: dict[int, object] = {}
+
+    # Funções para enviar parâmetros genéricos, sem precisar que o programa esteja em uso.
+    # Todas ignoram o envio se a uniform já tiver o mesmo valor no programa.
+    def set_mat4(self, name: str, value: np.ndarray) -> None:
+        location = self.get_uniform_location(name)
+        value = np.asarray(value, dtype=np.float32).reshape(1,16) # Achata a matriz para formato OpenGL
+        if self._is_uniform_unchanged(location, value.tobytes()):
+            return
+        glProgramUniformMatrix4fv(self.id, location, 1, GL_TRUE, value)
+
+    def set_int(self, name: str, value: int) -> None:
+        location = self.get_uniform_location(name)
+        value = int(value)
+        if self._is_uniform_unchanged(location, value):
+            return
+        glProgramUniform1i(self.id, location, value)
+
+    def set_float(self, name: str, value: float) -> None:
+        location = self.get_uniform_location(name)
+        value = float(value)
+        if self._is_uniform_unchanged(location, value):
+            return
+        glProgramUniform1f(self.id, location, value)
+
+    def set_vec3(self, name: str, value: np.ndarray) -> None:
+        location = self.get_uniform_location(name)
+        value = np.asarray(value, dtype=np.float32)
+        if self._is_uniform_unchanged(location, value.tobytes()):
+            return
+        glProgramUniform3fv(self.id, location, 1, value)
+
+    def set_bool(self, name: str, value: bool) -> None:
+        self.set_int(name, int(value))
+
+    def get_uniform_location(self, name: str) -> int:
+        """Localização da uniform no programa, ou -1 se ela não existir (o envio é ignorado pelo OpenGL)."""
+        return self.uniform_locations.get(name, -1)
+
+    def destroy(self) -> None:
+        glDeleteProgram(self.id)
+
+    def _is_uniform_unchanged(self, location: int, value) -> bool:
+        """Compara com o último valor enviado para a localização, registrando o novo valor."""
+        if location == -1 or self.uniform_values.get(location) == value:
+            return True
+        self.uniform_values[location] = value
+        return False
+
+    def _get_uniform_locations(self) -> dict[str, int]:
+        """
+        Consulta as uniforms ativas do programa linkado.
+        Arrays de tipos simples são registrados elemento a elemento (ex: 'x[0]', 'x[1]').
+        Membros de blocos de uniforms ficam com localização -1, pois são enviados por UniformBuffer.
+        """
+        locations = {}
+        for i in range(glGetProgramiv(self.id, GL_ACTIVE_UNIFORMS)):
+            name, size, _ = glGetActiveUniform(self.id, i)
+            name = name.decode() if isinstance(name, bytes) else name
+            if name.endswith('[0]'):
+                base_name = name[:-3]
+                locations[base_name] = glGetUniformLocation(self.id, name)
+                for j in range(size):
+                    element_name = f"{base_name}[{j}]"
+                    locations[element_name] = glGetUniformLocation(self.id, element_name)
+            else:
+                locations[name] = glGetUniformLocation(self.id, name)
+        return locations
+
+    def _compile(self, vertex_source: str, fragment_source: str) -> None:
+        # Compila os shaders
+        vertex = self._compile_shader(GL_VERTEX_SHADER, insert_defines(vertex_source, self.defines), 'Vertex Shader')
+        fragment = self._compile_shader(GL_FRAGMENT_SHADER, insert_defines(fragment_source, self.defines), 'Fragment Shader')
+
+        # Linka o programa e verifica erros. Os shaders não são mais necessários depois do link.
+        glProgramParameteri(self.id, GL_PROGRAM_BINARY_RETRIEVABLE_HINT, GL_TRUE)
+        glLinkProgram(self.id)
+        for shader in (vertex, fragment):
+            glDetachShader(self.id, shader)
+            glDeleteShader(shader)
+        if not glGetProgramiv(self.id, GL_LINK_STATUS):
+            print(glGetProgramInfoLog(self.id))
+            raise RuntimeError(f'Linking error ({", ".join(self.defines)})')
+
+    def _load_binary(self, cache_path: str) -> bool:
+        """Carrega o programa do cache. Retorna False se não houver cache ou se o driver recusar o binário."""
+        entry = read_cache(cache_path, CACHE_VERSION)
+        if entry is None:
+            return False
+
+        binary = np.ascontiguousarray(entry.arrays['binary'])
+        try:
+            glProgramBinary(self.id, entry.metadata['format'], binary, binary.nbytes)
+            if glGetProgramiv(self.id, GL_LINK_STATUS):
+                return True
+        except GLError:
+            pass # Formato desconhecido pelo driver (GL_INVALID_ENUM)
+
+        # O driver pode recusar binários antigos mesmo com a mesma versão: recompila em um programa novo
+        print(f"Program binary rejected by the driver, recompiling ({', '.join(self.defines)})")
+        glDeleteProgram(self.id)
+        self.id = glCreateProgram()
+        return False
+
+    def _save_binary(self, cache_path: str) -> None:
+        if not glGetIntegerv(GL_NUM_PROGRAM_BINARY_FORMATS):
+            return # O driver não exporta binários
+
+        size = glGetProgramiv(self.id, GL_PROGRAM_BINARY_LENGTH)
+        binary = np.zeros(size, dtype=np.uint8)
+        length, binary_format = GLsizei(), GLenum()
+        glGetProgramBinary(self.id, size, ctypes.byref(length), ctypes.byref(binary_format), binary)
+        try:
+            write_cache(cache_path, CACHE_VERSION, [], {'format': binary_format.value}, {'binary': binary[:length.value]})
+        except OSError as e:
+            print(f"Could not write program cache {cache_path}: {e}")
+
+    def _compile_shader(self, shader_type: any, shader_code: str, name: str) -> any:
+        # Cria e compila o shader
+        shader = glCreateShader(shader_type)
+        glShaderSource(shader, shader_code)
+
+        glCompileShader(shader)
+        if not glGetShaderiv(shader, GL_COMPILE_STATUS):
+            error = glGetShaderInfoLog(shader).decode()
+            print(error)
+            raise RuntimeError(f"Erro de compilacao do {name} ({', '.join(self.defines)})")
+
+        # Anexa o shader ao programa
+        glAttachShader(self.id, shader)
+        return shader
+
+def get_program_cache_path(vertex_source: str, fragment_source: str, defines: tuple[str, ...]) -> str:
+    """
+    Caminho do cache de um programa em '.cache/programs'. O nome é o hash dos códigos, dos #defines
+    e do fabricante, renderer e versão do driver, então qualquer mudança gera outro arquivo.
+    """
+    driver = [glGetString(name) or b'' for name in (GL_VENDOR, GL_RENDERER, GL_VERSION)]
+    key = hashlib.sha1()
+    for part in (*driver, vertex_source.encode(), fragment_source.encode(), '\n'.join(defines).encode()):
+        key.update(part)
+        key.update(b'\0')
+    return os.path.join(CACHE_FOLDER, CACHE_KIND, f"{key.hexdigest()[:16]}.bin")
+
+def insert_defines(source: str, defines: tuple[str, ...]) -> str:
+    """Insere um #define por item (ex: 'LIT' ou 'LIGHT_COUNT 2') logo após a linha #version."""
+    if not defines:
+        return source
+    version, _, rest = source.partition('\n')
+    lines = [f"#define {define}" for define in defines]
+    # #line mantém os números de linha das mensagens de erro iguais aos do arquivo
+    return '\n'.join([version, *lines, '#line 2', rest])
+
+def read_shader_source(shader_path: str, name: str) -> str:
+    try:
+        with open(shader_path, 'r') as shader_file:
+            return shader_file.read()
+    except IOError as e:
+        print(f"Erro ao abrir {name}")
+        raise e
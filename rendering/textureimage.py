@@ -0,0 +1,22 @@
+from PIL import Image
+import numpy as np
+
+class TextureImage:
+    """
+    Imagem RGBA já decodificada e invertida verticalmente, pronta para glTexImage2D.
+    data são os pixels crus (bytes ou array uint8 contíguo).
+    Não depende de OpenGL, então pode ser produzida em outro processo.
+    """
+    def __init__(self, width: int, height: int, data: bytes | np.ndarray):
+        self.width = width
+        self.height = height
+        self.data = data
+
+    @property
+    def nbytes(self) -> int:
+        return self.width * self.height * 4
+
+def decode_texture(texture_path: str) -> TextureImage:
+    img = Image.open(texture_path).convert("RGBA")
+    img_width, img_height = img.size
+    return TextureImage(img_width, img_height, img.tobytes("raw", "RGBA", 0, -1))
@@ -0,0 +1,244 @@
+from OpenGL.GL import *
+from concurrent.futures import Future, ThreadPoolExecutor
+import numpy as np
+import os
+from rendering.textureimage import TextureImage, decode_texture
+from rendering.mipmaps import load_mip_chain
+
+MIPMAP_FILTERS = {
+    GL_NEAREST_MIPMAP_NEAREST: GL_NEAREST,
+    GL_NEAREST_MIPMAP_LINEAR: GL_NEAREST,
+    GL_LINEAR_MIPMAP_NEAREST: GL_LINEAR,
+    GL_LINEAR_MIPMAP_LINEAR: GL_LINEAR,
+}
+'Filtros de minificação que usam mipmaps, e o filtro de magnificação correspondente.'
+
+def load_texture_levels(texture_path: str, mipmap: bool, image: TextureImage | None = None) -> list[TextureImage]:
+    """Decodifica a textura (se necessário) e, com mipmap, obtém todos os níveis da pirâmide."""
+    if mipmap:
+        return load_mip_chain(texture_path, image)
+    if image is None:
+        image = decode_texture(texture_path)
+    return [image]
+
+class PendingUpload:
+    """Textura esperando decodificação e/ou sendo enviada à GPU aos poucos por um PBO."""
+    def __init__(self, texture_path: str, wrap_type, filter_type, anisotropy: float, levels: list[TextureImage] | None, future: Future | None):
+        self.texture_path = texture_path
+        self.wrap_type = wrap_type
+        self.filter_type = filter_type
+        self.anisotropy = anisotropy
+        self.levels = levels
+        self.future = future
+        self.texture_id = None
+        self.pbo = None
+        self.level = 0
+        self.next_row = 0
+        self.level_offsets: list[int] = []
+
+class TextureEntry:
+    """
+    Textura compartilhada e quantos materiais a utilizam.
+    Enquanto a textura real não termina de carregar, texture_id aponta para um placeholder 1x1.
+    """
+    def __init__(self, key: tuple, texture_id: int):
+        self.key = key
+        self.texture_id = texture_id
+        self.ref_count = 0
+        self.pending: PendingUpload | None = None
+
+class TextureRegistry:
+    """
+    Compartilha texturas OpenGL entre materiais e meshes.
+    Texturas são indexadas pelo caminho resolvido do arquivo e pelos parâmetros de
+    amostragem (wrap/filter/anisotropia), e só são deletadas quando o último material as libera.
+
+    O carregamento é assíncrono: acquire retorna imediatamente com um placeholder,
+    a imagem (e seus mipmaps, se o filtro usar) é preparada em uma thread e update()
+    envia os pixels à GPU por um pixel buffer object, limitado a upload_budget bytes por frame.
+    """
+    def __init__(self, upload_budget: int = 4 * 1024 * 1024, max_workers: int = 4):
+        self.entries: dict[tuple, TextureEntry] = {}
+        self.upload_budget = upload_budget
+        self.max_workers = max_workers
+        self.placeholder_id = None
+        self._executor: ThreadPoolExecutor | None = None
+        self._max_anisotropy: float | None = None
+
+    def acquire(self, texture_path: str, wrap_type, filter_type, image: TextureImage | None = None, anisotropy: float = 1.0) -> TextureEntry:
+        """
+        Retorna a textura, agendando seu carregamento se ainda não existir, e incrementa sua contagem de referências.
+        image permite fornecer a imagem já decodificada, usada apenas se a textura ainda não existir.
+        """
+        key = (os.path.normcase(os.path.realpath(texture_path)), int(wrap_type), int(filter_type), float(anisotropy))
+        entry = self.entries.get(key)
+        if entry is None:
+            entry = TextureEntry(key, self._get_placeholder())
+            mipmap = filter_type in MIPMAP_FILTERS
+            levels, future = None, None
+            if image is not None and not mipmap:
+                levels = [image]
+            else:
+                future = self._get_executor().submit(load_texture_levels, texture_path, mipmap, image)
+            entry.pending = PendingUpload(texture_path, wrap_type, filter_type, anisotropy, levels, future)
+            self.entries[key] = entry
+
+        entry.ref_count += 1
+        return entry
+
+    def release(self, entry: TextureEntry) -> None:
+        """Decrementa a contagem de referências da textura, deletando-a quando chega a zero."""
+        entry.ref_count -= 1
+        if entry.ref_count > 0 or self.entries.get(entry.key) is not entry:
+            return
+
+        del self.entries[entry.key]
+        if entry.pending is not None:
+            self._cancel(entry.pending)
+        if entry.texture_id != self.placeholder_id:
+            glDeleteTextures([entry.texture_id])
+
+    def update(self) -> None:
+        """
+        Deve ser chamado uma vez por frame na thread do contexto OpenGL.
+        Envia partes das texturas já decodificadas até gastar o orçamento do frame.
+        """
+        budget = self.upload_budget
+        for entry in list(self.entries.values()):
+            if budget <= 0:
+                break
+            if entry.pending is not None:
+                budget -= self._stream(entry, budget)
+
+    def finish(self) -> None:
+        """Bloqueia até todas as texturas pendentes terem sido decodificadas e enviadas."""
+        for entry in list(self.entries.values()):
+            if entry.pending is not None and entry.pending.future is not None:
+                entry.pending.future.result()
+            while entry.pending is not None:
+                self._stream(entry, self.upload_budget)
+
+    @property
+    def pending_count(self) -> int:
+        return sum(1 for entry in self.entries.values() if entry.pending is not None)
+
+    def destroy(self) -> None:
+        """Deleta todas as texturas restantes, independente das referências."""
+        if self._executor is not None:
+            self._executor.shutdown(wait=True, cancel_futures=True)
+            self._executor = None
+        for entry in self.entries.values():
+            if entry.pending is not None:
+                self._cancel(entry.pending)
+            if entry.texture_id != self.placeholder_id:
+                glDeleteTextures([entry.texture_id])
+        self.entries.clear()
+        if self.placeholder_id is not None:
+            glDeleteTextures([self.placeholder_id])
+            self.placeholder_id = None
+
+    def _stream(self, entry: TextureEntry, budget: int) -> int:
+        """
+        Envia até budget bytes da textura pendente (ao menos uma linha) e retorna quantos foram enviados.
+        Os níveis de mipmap são enviados em ordem. Quando termina, troca o placeholder pela textura real.
+        """
+        pending = entry.pending
+        if pending.levels is None:
+            if not pending.future.done():
+                return 0
+            pending.levels = pending.future.result()
+            pending.future = None
+
+        if pending.texture_id is None:
+            pending.texture_id = self._create_texture(pending)
+            pending.level_offsets = list(np.cumsum([0] + [level.nbytes for level in pending.levels]))
+            pending.pbo = glGenBuffers(1)
+            glBindBuffer(GL_PIXEL_UNPACK_BUFFER, pending.pbo)
+            glBufferData(GL_PIXEL_UNPACK_BUFFER, int(pending.level_offsets[-1]), None, GL_STREAM_DRAW)
+            glBindBuffer(GL_PIXEL_UNPACK_BUFFER, 0)
+
+        # Envia uma faixa de linhas: CPU -> PBO -> textura (cópia assíncrona no driver)
+        image = pending.levels[pending.level]
+        row_size = image.width * 4
+        rows = min(max(budget // row_size, 1), image.height - pending.next_row)
+        row_offset = pending.next_row * row_size
+        pixels = np.frombuffer(image.data, dtype=np.uint8, count=rows * row_size, offset=row_offset)
+        pbo_offset = int(pending.level_offsets[pending.level]) + row_offset
+
+        glBindBuffer(GL_PIXEL_UNPACK_BUFFER, pending.pbo)
+        glBufferSubData(GL_PIXEL_UNPACK_BUFFER, pbo_offset, pixels.nbytes, pixels)
+        glBindTexture(GL_TEXTURE_2D, pending.texture_id)
+        glTexSubImage2D(GL_TEXTURE_2D, pending.level, 0, pending.next_row, image.width, rows, GL_RGBA, GL_UNSIGNED_BYTE, ctypes.c_void_p(pbo_offset))
+        glBindBuffer(GL_PIXEL_UNPACK_BUFFER, 0)
+
+        pending.next_row += rows
+        if pending.next_row >= image.height:
+            pending.level += 1
+            pending.next_row = 0
+
+        if pending.level >= len(pending.levels):
+            glDeleteBuffers(1, [pending.pbo])
+            entry.texture_id = pending.texture_id
+            entry.pending = None
+        return pixels.nbytes
+
+    def _cancel(self, pending: PendingUpload) -> None:
+        if pending.future is not None:
+            pending.future.cancel()
+        if pending.pbo is not None:
+            glDeleteBuffers(1, [pending.pbo])
+        if pending.texture_id is not None:
+            glDeleteTextures([pending.texture_id])
+
+    def _create_texture(self, pending: PendingUpload) -> int:
+        """Cria a textura com armazenamento alocado para todos os níveis, mas sem conteúdo."""
+        texture_id = glGenTextures(1)
+        filter_type = pending.filter_type
+
+        glBindTexture(GL_TEXTURE_2D, texture_id)
+        glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_WRAP_S, pending.wrap_type)
+        glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_WRAP_T, pending.wrap_type)
+        glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MIN_FILTER, filter_type)
+        glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MAG_FILTER, MIPMAP_FILTERS.get(filter_type, filter_type))
+        glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MAX_LEVEL, len(pending.levels) - 1)
+        if pending.anisotropy > 1.0:
+            anisotropy = min(pending.anisotropy, self._get_max_anisotropy())
+            glTexParameterf(GL_TEXTURE_2D, GL_TEXTURE_MAX_ANISOTROPY, anisotropy)
+
+        for level, image in enumerate(pending.levels):
+            glTexImage2D(
+                GL_TEXTURE_2D, level,
+                GL_RGBA,
+                image.width, image.height, 0,
+                GL_RGBA,
+                GL_UNSIGNED_BYTE,
+                None
+            )
+        return texture_id
+
+    def _get_max_anisotropy(self) -> float:
+        """Anisotropia máxima suportada pelo driver (1.0 se não houver suporte)."""
+        if self._max_anisotropy is None:
+            try:
+                self._max_anisotropy = float(glGetFloatv(GL_MAX_TEXTURE_MAX_ANISOTROPY))
+            except GLError:
+                self._max_anisotropy = 1.0
+        return self._max_anisotropy
+
+    def _get_placeholder(self) -> int:
+        """Textura 1x1 branca, usada enquanto as texturas reais carregam."""
+        if self.placeholder_id is None:
+            self.placeholder_id = glGenTextures(1)
+            glBindTexture(GL_TEXTURE_2D, self.placeholder_id)
+            glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MIN_FILTER, GL_NEAREST)
+            glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MAG_FILTER, GL_NEAREST)
+            white = np.full(4, 255, dtype=np.uint8)
+            glTexImage2D(GL_TEXTURE_2D, 0, GL_RGBA, 1, 1, 0, GL_RGBA, GL_UNSIGNED_BYTE, white)
+        return self.placeholder_id
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.max_workers)
+        return self._executor
+
+texture_registry = TextureRegistry()
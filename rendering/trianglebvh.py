@@ -0,0 +1,264 @@
+import numpy as np
+from rendering.binarycache import get_cache_path, read_cache, write_cache
+
+CACHE_KIND = 'trianglebvh'
+CACHE_VERSION = 1
+SAH_BINS = 12
+'Quantidade de intervalos por eixo avaliados pela heurística de área de superfície (SAH).'
+MIN_LEAF_SIZE = 4
+MAX_LEAF_SIZE = 16
+TRAVERSAL_COST = 2.0
+'Custo de visitar um nó em relação ao de testar um triângulo, usado pela SAH para decidir quando parar.'
+EPSILON = 1e-9
+
+class RayHits:
+    """
+    Resultado de uma consulta com vários raios. Para cada raio: distância (em unidades de direction,
+    inf se não atingiu nada), índice do triângulo atingido (-1 se não atingiu) e coordenadas baricêntricas
+    (u, v) do ponto, tal que ponto = (1 - u - v) * v0 + u * v1 + v * v2.
+    """
+    def __init__(self, distances: np.ndarray, triangles: np.ndarray, barycentrics: np.ndarray):
+        self.distances = distances
+        self.triangles = triangles
+        self.barycentrics = barycentrics
+
+    @property
+    def hit(self) -> np.ndarray:
+        return self.triangles >= 0
+
+class TriangleBVH:
+    """
+    BVH dos triângulos de um mesh, no espaço local do mesh, para ray casting
+    (colisão da câmera, snapping no chão, picking).
+
+    Os nós ficam em arrays: AABB, índice do primeiro filho (o segundo é o seguinte) e, nas folhas,
+    o intervalo de triângulos. Os triângulos são reordenados para que cada folha seja contígua;
+    triangle_ids guarda o índice original de cada um.
+    """
+    def __init__(self, positions: np.ndarray, triangles: np.ndarray, node_min: np.ndarray, node_max: np.ndarray,
+                 node_children: np.ndarray, node_first: np.ndarray, node_count: np.ndarray, triangle_ids: np.ndarray):
+        self.node_min = node_min
+        self.node_max = node_max
+        self.node_children = node_children
+        self.node_first = node_first
+        self.node_count = node_count
+        'Triângulos de cada nó (0 para nós internos).'
+        self.triangle_ids = triangle_ids
+
+        # Vértice 0 e arestas de cada triângulo, na ordem das folhas, prontos para o teste de Möller-Trumbore
+        corners = positions[triangles[triangle_ids]]
+        self.v0 = np.ascontiguousarray(corners[:, 0])
+        self.edge1 = np.ascontiguousarray(corners[:, 1] - corners[:, 0])
+        self.edge2 = np.ascontiguousarray(corners[:, 2] - corners[:, 0])
+
+    @staticmethod
+    def build(positions: np.ndarray, triangles: np.ndarray) -> "TriangleBVH":
+        """
+        Constrói a BVH de cima para baixo, dividindo cada nó pelo melhor plano entre SAH_BINS intervalos
+        dos centróides em cada eixo. Um nó vira folha quando dividir não compensa pelo custo SAH.
+        """
+        positions = np.asarray(positions, dtype=np.float32)
+        triangles = np.asarray(triangles, dtype=np.int64).reshape(-1, 3)
+        corners = positions[triangles]
+        triangle_min = corners.min(axis=1)
+        triangle_max = corners.max(axis=1)
+        centroids = (triangle_min + triangle_max) / 2
+
+        order = np.arange(len(triangles))
+        node_min, node_max, node_children, node_first, node_count = [], [], [], [], []
+
+        def add_node():
+            node_min.append(None)
+            node_max.append(None)
+            node_children.append(-1)
+            node_first.append(0)
+            node_count.append(0)
+            return len(node_min) - 1
+
+        stack = [(add_node(), 0, len(triangles))]
+        while stack:
+            node, start, end = stack.pop()
+            ids = order[start:end]
+            bounds_min = triangle_min[ids].min(axis=0) if len(ids) else np.zeros(3, dtype=np.float32)
+            bounds_max = triangle_max[ids].max(axis=0) if len(ids) else np.zeros(3, dtype=np.float32)
+            node_min[node], node_max[node] = bounds_min, bounds_max
+
+            split = _find_sah_split(centroids[ids], triangle_min[ids], triangle_max[ids], bounds_min, bounds_max) if len(ids) > MIN_LEAF_SIZE else None
+            if split is None and len(ids) > MAX_LEAF_SIZE:
+                # Centróides coincidentes ou SAH sem ganho, mas folha grande demais: divide ao meio
+                axis = int(np.argmax(bounds_max - bounds_min))
+                left_mask = np.zeros(len(ids), dtype=bool)
+                left_mask[np.argsort(centroids[ids, axis], kind='stable')[:len(ids) // 2]] = True
+                split = left_mask
+            if split is None:
+                node_first[node], node_count[node] = start, end - start
+                continue
+
+            left_count = int(np.count_nonzero(split))
+            order[start:end] = np.concatenate([ids[split], ids[~split]])
+            left = add_node()
+            add_node()
+            node_children[node] = left
+            stack.append((left, start, start + left_count))
+            stack.append((left + 1, start + left_count, end))
+
+        return TriangleBVH(
+            positions, triangles,
+            np.array(node_min, dtype=np.float32).reshape(-1, 3), np.array(node_max, dtype=np.float32).reshape(-1, 3),
+            np.array(node_children, dtype=np.int64), np.array(node_first, dtype=np.int64), np.array(node_count, dtype=np.int64),
+            order,
+        )
+
+    def intersect(self, origins: np.ndarray, directions: np.ndarray, max_distance: float = np.inf) -> RayHits:
+        """
+        Encontra o triângulo mais próximo atingido por cada raio (origens e direções (R, 3), no espaço local).
+        Todos os raios descem a árvore juntos: a cada iteração, os pares (raio, nó) ativos são testados de uma vez,
+        e pares cujo nó começa depois do acerto mais próximo já encontrado são descartados.
+        """
+        origins = np.atleast_2d(np.asarray(origins, dtype=np.float32))
+        directions = np.atleast_2d(np.asarray(directions, dtype=np.float32))
+        ray_count = len(origins)
+        with np.errstate(divide='ignore'):
+            inverse_directions = 1 / directions
+
+        distances = np.full(ray_count, max_distance, dtype=np.float32)
+        hit_triangles = np.full(ray_count, -1, dtype=np.int64)
+        barycentrics = np.zeros((ray_count, 2), dtype=np.float32)
+
+        rays = np.arange(ray_count)
+        nodes = np.zeros(ray_count, dtype=np.int64)
+        if len(self.node_count) == 0 or len(self.triangle_ids) == 0:
+            rays = rays[:0]
+
+        while len(rays) > 0:
+            # Raio contra AABB (slab test)
+            with np.errstate(invalid='ignore'):
+                t1 = (self.node_min[nodes] - origins[rays]) * inverse_directions[rays]
+                t2 = (self.node_max[nodes] - origins[rays]) * inverse_directions[rays]
+            t_near = np.max(np.fmin(t1, t2), axis=1)
+            t_far = np.min(np.fmax(t1, t2), axis=1)
+            keep = (t_near <= t_far) & (t_far >= 0) & (t_near <= distances[rays])
+            rays, nodes = rays[keep], nodes[keep]
+
+            # Folhas: testa cada raio contra todos os triângulos da folha
+            leaf = self.node_count[nodes] > 0
+            if np.any(leaf):
+                self._intersect_leaves(rays[leaf], nodes[leaf], origins, directions, distances, hit_triangles, barycentrics)
+
+            # Nós internos: desce para os dois filhos
+            rays, nodes = rays[~leaf], self.node_children[nodes[~leaf]]
+            rays = np.concatenate([rays, rays])
+            nodes = np.concatenate([nodes, nodes + 1])
+
+        distances[hit_triangles < 0] = np.inf
+        # Só indexa os raios que acertaram: sem triângulos, triangle_ids é vazio
+        hit = hit_triangles >= 0
+        original_triangles = np.full(ray_count, -1, dtype=np.int64)
+        original_triangles[hit] = self.triangle_ids[hit_triangles[hit]]
+        return RayHits(distances, original_triangles, barycentrics)
+
+    def _intersect_leaves(self, rays: np.ndarray, nodes: np.ndarray, origins: np.ndarray, directions: np.ndarray,
+                          distances: np.ndarray, hit_triangles: np.ndarray, barycentrics: np.ndarray) -> None:
+        """Möller-Trumbore vetorizado sobre os pares (raio, triângulo) das folhas, atualizando o acerto mais próximo de cada raio."""
+        counts = self.node_count[nodes]
+        pair_rays = np.repeat(rays, counts)
+        offsets = np.arange(len(pair_rays)) - np.repeat(np.cumsum(counts) - counts, counts)
+        pair_triangles = np.repeat(self.node_first[nodes], counts) + offsets
+
+        direction = directions[pair_rays]
+        edge1, edge2 = self.edge1[pair_triangles], self.edge2[pair_triangles]
+        p = np.cross(direction, edge2)
+        determinant = np.einsum('ij,ij->i', edge1, p)
+        valid = np.abs(determinant) > EPSILON
+        inverse_determinant = np.where(valid, 1 / np.where(valid, determinant, 1), 0)
+
+        s = origins[pair_rays] - self.v0[pair_triangles]
+        u = np.einsum('ij,ij->i', s, p) * inverse_determinant
+        q = np.cross(s, edge1)
+        v = np.einsum('ij,ij->i', direction, q) * inverse_determinant
+        t = np.einsum('ij,ij->i', edge2, q) * inverse_determinant
+
+        hit = valid & (u >= 0) & (v >= 0) & (u + v <= 1) & (t >= 0) & (t <= distances[pair_rays])
+        if not np.any(hit):
+            return
+
+        # O acerto mais próximo de cada raio entre os pares
+        pair_rays, pair_triangles, u, v, t = pair_rays[hit], pair_triangles[hit], u[hit], v[hit], t[hit]
+        order = np.lexsort((t, pair_rays))
+        first = order[np.r_[True, pair_rays[order][1:] != pair_rays[order][:-1]]]
+        closest_rays = pair_rays[first]
+        distances[closest_rays] = t[first]
+        hit_triangles[closest_rays] = pair_triangles[first]
+        barycentrics[closest_rays, 0] = u[first]
+        barycentrics[closest_rays, 1] = v[first]
+
+def _find_sah_split(centroids: np.ndarray, triangle_min: np.ndarray, triangle_max: np.ndarray,
+                    bounds_min: np.ndarray, bounds_max: np.ndarray) -> np.ndarray | None:
+    """
+    Avalia, nos três eixos de uma vez, as divisões entre SAH_BINS intervalos dos centróides e retorna
+    a máscara dos triângulos do lado esquerdo da melhor, ou None se nenhuma for melhor do que uma folha.
+    """
+    count = len(centroids)
+    centroid_min = centroids.min(axis=0)
+    centroid_extent = centroids.max(axis=0) - centroid_min
+    if not np.any(centroid_extent > 0):
+        return None
+
+    # Intervalo de cada triângulo em cada eixo, com os eixos em faixas separadas de SAH_BINS
+    with np.errstate(divide='ignore', invalid='ignore'):
+        bins = ((centroids - centroid_min) / centroid_extent * SAH_BINS).astype(np.int64)
+    bins = np.clip(bins, 0, SAH_BINS - 1)
+    keys = (bins + np.arange(3) * SAH_BINS).reshape(-1)
+    bin_counts = np.bincount(keys, minlength=3 * SAH_BINS).reshape(3, SAH_BINS)
+    bin_min = np.full((3 * SAH_BINS, 3), np.inf, dtype=np.float32)
+    bin_max = np.full((3 * SAH_BINS, 3), -np.inf, dtype=np.float32)
+    np.minimum.at(bin_min, keys, np.repeat(triangle_min, 3, axis=0))
+    np.maximum.at(bin_max, keys, np.repeat(triangle_max, 3, axis=0))
+    bin_min = bin_min.reshape(3, SAH_BINS, 3)
+    bin_max = bin_max.reshape(3, SAH_BINS, 3)
+
+    # Custo de cada plano entre os intervalos i e i + 1: área * triângulos de cada lado
+    left_area = _surface_area(np.maximum.accumulate(bin_max, axis=1)[:, :-1] - np.minimum.accumulate(bin_min, axis=1)[:, :-1])
+    right_area = _surface_area(np.maximum.accumulate(bin_max[:, ::-1], axis=1)[:, ::-1][:, 1:] - np.minimum.accumulate(bin_min[:, ::-1], axis=1)[:, ::-1][:, 1:])
+    left_count = np.cumsum(bin_counts, axis=1)[:, :-1]
+    valid = (left_count > 0) & (left_count < count) & (centroid_extent > 0)[:, None]
+    with np.errstate(invalid='ignore'):
+        costs = np.where(valid, left_area * left_count + right_area * (count - left_count), np.inf)
+
+    axis, split_bin = np.unravel_index(int(np.argmin(costs)), costs.shape)
+    if not np.isfinite(costs[axis, split_bin]):
+        return None
+
+    # Compara em unidades de "testes de triângulo": dividir custa uma visita a mais
+    node_area = _surface_area(bounds_max - bounds_min)
+    if node_area > 0 and TRAVERSAL_COST + costs[axis, split_bin] / node_area >= count and count <= MAX_LEAF_SIZE:
+        return None
+    return bins[:, axis] <= split_bin
+
+def _surface_area(extents: np.ndarray) -> np.ndarray:
+    extents = np.maximum(extents, 0)
+    x, y, z = extents[..., 0], extents[..., 1], extents[..., 2]
+    return 2 * (x * y + y * z + z * x)
+
+def load_triangle_bvh(obj_path: str, positions: np.ndarray, triangles: np.ndarray) -> TriangleBVH:
+    """
+    Retorna a BVH dos triângulos de um .obj, lida do cache binário quando ele existir e for válido
+    (o cache é invalidado quando o .obj muda), ou construída e gravada no cache.
+    """
+    cache_path = get_cache_path(CACHE_KIND, obj_path)
+    entry = read_cache(cache_path, CACHE_VERSION)
+    if entry is not None and entry.metadata.get('triangle_count') == len(triangles):
+        arrays = entry.arrays
+        return TriangleBVH(positions, triangles, arrays['node_min'], arrays['node_max'], arrays['node_children'],
+                           arrays['node_first'], arrays['node_count'], arrays['triangle_ids'])
+
+    bvh = TriangleBVH.build(positions, triangles)
+    arrays = {
+        'node_min': bvh.node_min, 'node_max': bvh.node_max, 'node_children': bvh.node_children,
+        'node_first': bvh.node_first, 'node_count': bvh.node_count, 'triangle_ids': bvh.triangle_ids,
+    }
+    try:
+        write_cache(cache_path, CACHE_VERSION, [obj_path], {'triangle_count': len(triangles)}, arrays)
+    except OSError as e:
+        print(f"Could not write triangle BVH cache {cache_path}: {e}")
+    return bvh
@@ -0,0 +1,61 @@
+from OpenGL.GL import *
+import numpy as np
+
+FRAME_BLOCK_BINDING = 0
+LIGHT_BLOCK_BINDING = 1
+MATERIAL_BLOCK_BINDING = 2
+CLUSTER_BLOCK_BINDING = 3
+'Pontos de binding dos blocos FrameBlock, LightBlock, MaterialBlock e ClusterBlock de lit.vert/lit.frag.'
+
+_offset_alignment: int | None = None
+
+class UniformBuffer:
+    """
+    Uniform buffer object (UBO) com layout std140, ligado a um ponto de binding fixo dos shaders.
+    Pode ter vários slots do mesmo bloco, para que conteúdos diferentes usados no mesmo frame
+    não sobrescrevam dados que a GPU ainda não leu.
+    """
+    def __init__(self, size: int, binding: int, slots: int = 1, usage = GL_DYNAMIC_DRAW):
+        alignment = _get_offset_alignment()
+        self.size = size
+        self.binding = binding
+        self.slots = slots
+        self.usage = usage
+        self.stride = (size + alignment - 1) // alignment * alignment
+
+        self.ubo = glGenBuffers(1)
+        glBindBuffer(GL_UNIFORM_BUFFER, self.ubo)
+        glBufferData(GL_UNIFORM_BUFFER, self.stride * slots, None, usage)
+        glBindBuffer(GL_UNIFORM_BUFFER, 0)
+
+    def write(self, data: np.ndarray, slot: int = 0) -> None:
+        """Escreve os dados (já no layout std140) no slot."""
+        glBindBuffer(GL_UNIFORM_BUFFER, self.ubo)
+        glBufferSubData(GL_UNIFORM_BUFFER, slot * self.stride, data.nbytes, data)
+        glBindBuffer(GL_UNIFORM_BUFFER, 0)
+
+    def write_slots(self, data: np.ndarray) -> None:
+        """Escreve um bloco por linha de data, a partir do slot 0, aumentando o buffer se não houver slots suficientes."""
+        glBindBuffer(GL_UNIFORM_BUFFER, self.ubo)
+        if len(data) > self.slots:
+            self.slots = max(len(data), self.slots * 2)
+            glBufferData(GL_UNIFORM_BUFFER, self.stride * self.slots, None, self.usage)
+
+        padded = np.zeros((len(data), self.stride), dtype=np.uint8)
+        padded[:, :data[0].nbytes] = np.ascontiguousarray(data).view(np.uint8).reshape(len(data), -1)
+        glBufferSubData(GL_UNIFORM_BUFFER, 0, padded.nbytes, padded)
+        glBindBuffer(GL_UNIFORM_BUFFER, 0)
+
+    def bind(self, slot: int = 0) -> None:
+        """Liga o intervalo do slot ao ponto de binding do bloco."""
+        glBindBufferRange(GL_UNIFORM_BUFFER, self.binding, self.ubo, slot * self.stride, self.size)
+
+    def destroy(self) -> None:
+        glDeleteBuffers(1, [self.ubo])
+
+def _get_offset_alignment() -> int:
+    """Alinhamento exigido pelo driver para o início de cada intervalo ligado com glBindBufferRange."""
+    global _offset_alignment
+    if _offset_alignment is None:
+        _offset_alignment = int(glGetIntegerv(GL_UNIFORM_BUFFER_OFFSET_ALIGNMENT))
+    return _offset_alignment
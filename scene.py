@@ -11,10 +11,34 @@ from objects.actors.Firefly import Firefly
 from rendering.renderer import Renderer
 from rendering.lightdata import LightData
 from rendering.litmode import LitMode;
+from rendering.assetloader import preload_meshes
+from rendering.portals import PortalSystem, Cell, Portal, CylinderVolume, arc_portal_points
+from objects.transformstore import transform_store
 from camera import Camera
 
+# Meshes usados pela cena, carregados em paralelo antes de montar os objetos
+SCENE_ASSETS = [
+    ("skybox/skybox.obj", "skybox.png"),
+    ("scenario/scenario.obj", None),
+    ("shroom/shroom_outer.obj", None),
+    ("shroom/shroom_inner.obj", None),
+    ("witch/witch.obj", None),
+    ("lamp/HangingLamp.obj", None),
+    ("cauldron/cauldron.obj", None),
+    ("spoon/spoon.obj", None),
+    ("particles/skull1/Skull.obj", None),
+    ("elemental-fire/FireElemental.obj", None),
+    ("frog/frog.obj", None),
+    ("crown/crown.obj", None),
+    ("frog_house/frog_house.obj", None),
+    ("gnomes/gnome1/gnome.obj", None),
+    ("Firefly/firefly.obj", None),
+]
+
 class Scene:
     def __init__(self):
+        preload_meshes(SCENE_ASSETS)
+
         self.container = Object()
         self.interior_container = self._gen_interior()
         self.exterior_container = self._gen_exterior()
@@ -23,6 +47,10 @@ class Scene:
         self.ambient_light = LightData("Ambient Light", [1, 1, 1])
         self.exterior_lights: list[LightData] = [self.firefly.light.light_data]
         self.interior_lights: list[LightData] = [*self.lamp.light_data, self.fire_elemental.light.light_data]
+        self.particle_systems = [self.cauldron.particle_system]
+        'Objetos com instâncias próprias, copiadas para o SceneSnapshot.'
+        self.portal_system = self._gen_portals()
+        self.visible_cells: list[Cell] = []
         
         self.editables = [
             self.ambient_light.intensity,
@@ -35,14 +63,53 @@ class Scene:
         return [self.ambient_light] + self.exterior_lights + self.interior_lights
         
     def render_scene(self, renderer: Renderer, camera: Camera) -> None:
+        """
+        Renderiza a cena vista pela câmera. Com um snapshot no renderer, tudo o que a simulação altera
+        é lido dele, sem tocar no transform_store (que pode estar sendo atualizado em outra thread).
+        """
+        snapshot = renderer.snapshot
         renderer.set_camera_uniforms(camera)
+        if snapshot is None:
+            # Recalcula de uma vez as matrizes de todos os objetos alterados no frame
+            transform_store.update()
+            renderer.set_visibility(transform_store.cull(renderer.frustum))
+        else:
+            renderer.set_visibility(snapshot.cull(renderer.frustum))
         renderer.set_ambient_light(self.ambient_light)
 
-        renderer.set_light_uniforms(self.exterior_lights)
-        self.exterior_container.render(renderer)
-
-        renderer.set_light_uniforms(self.interior_lights)
-        self.interior_container.render(renderer)
+        # Só renderiza (e envia as luzes de) células visíveis a partir da célula da câmera
+        self.visible_cells = self.portal_system.get_visible_cells(camera.position, camera.get_view_matrix(), camera.get_projection_matrix(), snapshot)
+        wall_cells = self.portal_system.get_wall_cells(self.visible_cells)
+        for cell in self.portal_system.cells:
+            if cell in self.visible_cells:
+                renderer.set_light_uniforms(cell.lights)
+                cell.container.render(renderer)
+            elif cell in wall_cells:
+                renderer.set_light_uniforms(cell.lights)
+                for wall in cell.walls:
+                    wall.render(renderer)
+
+        renderer.submit_queue()
+
+    def _gen_portals(self) -> PortalSystem:
+        """
+        Divide a cena entre o interior e o exterior do cogumelo, ligados por portais na porta e nas janelas.
+        As medidas estão no espaço local do cogumelo (o mesmo para as duas peças).
+        """
+        shroom = self.shroom_outer
+        # A casca externa também é a parede vista de dentro
+        exterior = Cell("Exterior", self.exterior_container, self.exterior_lights, walls=[shroom])
+        interior = Cell(
+            "Interior", self.interior_container, self.interior_lights,
+            core=CylinderVolume(shroom, radius=2.3, y_min=0.4, y_max=4.0),
+            envelope=CylinderVolume(shroom, radius=4.0, y_min=-0.5, y_max=9.5),
+        )
+
+        wall_radius = 3.0
+        Portal("Door", shroom, arc_portal_points(0, 27, wall_radius, 0.5, 3.9), interior, exterior)
+        Portal("Window 1", shroom, arc_portal_points(72.5, 25, wall_radius, 1.5, 3.9), interior, exterior)
+        Portal("Window 2", shroom, arc_portal_points(-72.5, 25, wall_radius, 1.5, 3.9), interior, exterior)
+        return PortalSystem([exterior, interior])
 
     def _gen_shroom_piece(self, obj_sub_dir: str):
         """Separamos a construção do cogumelo entre interior e exterior para lidar com luzes."""
@@ -84,10 +151,11 @@ class Scene:
 
         self.skybox = MeshObject("skybox/skybox.obj", "skybox.png")
         self.skybox.set_scale_single(1000)
-        self.skybox.mesh.material_library.get_default().set_filter_mode(GL_NEAREST)
+        self.skybox.mesh.material_library.get_default().set_filter_mode(GL_NEAREST_MIPMAP_LINEAR)
         container.add_child(self.skybox)
 
         self.scenario = MeshObject("scenario/scenario.obj", lit_mode=LitMode.LIT_BACKFACES)
+        self.scenario.mesh.material_library.set_filter_mode(GL_LINEAR_MIPMAP_LINEAR, anisotropy=8)
         self.scenario.set_scale_single(0.4)
         self.scenario.set_pos([0, 0, -50])
         container.add_child(self.scenario)
@@ -5,6 +5,9 @@ import glfw
 from matrixmath import *
 from editablevalue import EditableValue
 from window import Window
+from clock import Clock
+from objects.transformstore import transform_store
+from objects.updatescheduler import update_scheduler
 
 
 class SceneInput:
@@ -18,17 +21,32 @@ class SceneInput:
         self.window = window
 
         input.register_key_callback(glfw.KEY_P, renderer.toggle_wireframe)
+        input.register_key_callback(glfw.KEY_I, lambda: print(renderer.stats))
+        input.register_key_callback(glfw.KEY_L, renderer.toggle_clustered_lighting)
+        # Gnomos dormem parados no chão e acordam com a tecla de pulo
+        for gnome in scene.gnomes:
+            input.register_key_callback(gnome.jump_key, gnome.wake)
 
         self.current_editable: EditableValue = None
         self.editable_values: list[EditableValue] = []
         self._setup_editables()
         
 
-    def update(self, delta_time: float) -> None:
-        for element in self.scene.container.children:
-            element.update(self.input, delta_time)
-        
-        self._update_editables(delta_time)
+    def update(self, clock: Clock, delta_time: float) -> None:
+        """Simula os passos pendentes do relógio e aplica a edição de valores com o tempo real do frame."""
+        self.update_steps(clock)
+        self.update_editables(delta_time)
+
+    def update_steps(self, clock: Clock) -> None:
+        """Simula os passos pendentes do relógio."""
+        for _ in clock.steps():
+            self.update_step(clock)
+
+    def update_step(self, clock: Clock) -> None:
+        """Um passo da simulação: atualiza os objetos agendados, guardando as transformações para a interpolação."""
+        transform_store.begin_step()
+        update_scheduler.update(self.input, clock)
+        transform_store.end_step()
         
     
     def _setup_editables(self):
@@ -59,7 +77,8 @@ class SceneInput:
             self.input.register_key_callback(glfw.KEY_1 + i, lambda i=i: on_edit_key_pressed(i))
         self.input.register_key_callback(self.key_edit_reset, on_reset_key_pressed)
 
-    def _update_editables(self, delta_time: float):
+    def update_editables(self, delta_time: float):
+        """Aplica a edição do valor selecionado. Fica fora dos passos da simulação, na thread do OpenGL."""
         delta_input = self.input.get_1d_axis(self.key_edit_up, self.key_edit_down)
         delta = delta_input * delta_time * self.edit_speed
         self.current_editable.apply_delta(delta)
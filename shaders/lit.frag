@@ -1,26 +1,61 @@
 #version 450 core
 
+// Variantes (#defines inseridos pelo Renderer logo após #version):
+// UNLIT, LIT ou LIT_BACKFACES: modo de iluminação do material
+// CLUSTERED: usa as luzes do cluster do fragmento em vez do LightBlock
+// LIGHT_COUNT n: quantidade de luzes do LightBlock usadas pelo draw (até MAX_LIGHTS)
 #define MAX_LIGHTS 3
+#ifndef LIGHT_COUNT
+#define LIGHT_COUNT MAX_LIGHTS
+#endif
 struct Light {
-    vec3 position;
-    vec3 color;
+    vec4 position; // (xyz) e alcance explícito (w), 0 se não tiver
+    vec4 color; // (rgb)
+};
+struct ClusterLight {
+    vec4 position; // (xyz) e alcance (w)
+    vec4 color; // (rgb) e 1 se o alcance for explícito (w)
+    uvec4 groups; // máscara dos grupos de luzes que recebem esta luz (x)
 };
 
 // Recebe do programa
-// -- Camera e luzes
-uniform vec3 viewPos; // posicao do observador/camera
-uniform vec3 ambientLightColor;
-uniform Light lights[MAX_LIGHTS];
-uniform int numLights;
-uniform bool lit; // Se false, retorna a cor da textura sem aplicar luz.
+// -- Dados do frame (std140, igual em lit.vert)
+layout(std140, binding = 0) uniform FrameBlock {
+	mat4 view;
+	mat4 projection;
+	vec4 viewPos; // posicao do observador/camera (xyz)
+	vec4 ambientLightColor; // (rgb)
+	vec4 lightParamMultipliers; // multiplicadores globais de ka, kd, ks e ns
+};
+// -- Luzes do passo atual
+layout(std140, binding = 1) uniform LightBlock {
+	int numLights;
+	Light lights[MAX_LIGHTS];
+};
 // -- Material atual
+layout(std140, binding = 2) uniform MaterialBlock {
+	vec4 materialKa; // coeficiente de reflexao ambiente (rgb)
+	vec4 materialKd; // coeficiente de reflexao difusa (rgb)
+	vec4 materialKs; // coeficiente de reflexao especular (rgb)
+	float materialNs; // expoente de reflexao
+	float colorMultiplier; // multiplica a cor da textura
+};
+// -- Iluminação clusterizada: grade de clusters e, por cluster, o trecho da lista de índices de luzes
+layout(std140, binding = 3) uniform ClusterBlock {
+	uvec4 clusterGrid; // clusters em x, y e profundidade
+	vec4 clusterDepth; // near e escala das fatias exponenciais de profundidade
+};
+layout(std430, binding = 0) readonly buffer ClusterLightBuffer {
+	ClusterLight clusterLights[];
+};
+layout(std430, binding = 1) readonly buffer ClusterBuffer {
+	uvec2 clusters[]; // início e quantidade em lightIndices
+};
+layout(std430, binding = 2) readonly buffer LightIndexBuffer {
+	uint lightIndices[];
+};
+uniform int lightGroup; // Grupo de luzes do draw atual (modo clusterizado)
 uniform sampler2D tex; // textura
-uniform float colorMultiplier; // multiplica a cor da textura
-uniform vec3 ka; // coeficiente de reflexao ambiente
-uniform vec3 kd; // coeficiente de reflexao difusa
-uniform vec3 ks; // coeficiente de reflexao especular
-uniform float ns; // expoente de reflexao 
-uniform bool lightBackfaces; // Se true, ilumina ambas as faces do modelo (útil para grama e modelos de 1 face)
 
 // Recebe da vertex shader
 in vec2 v_uv;
@@ -30,6 +65,12 @@ in vec3 v_normal;
 // Output da fragment shader
 out vec4 fragColor;
 
+// Parâmetros do material já multiplicados pelos valores globais
+vec3 ka;
+vec3 kd;
+vec3 ks;
+float ns;
+
 vec3 calc_diffuse(vec3 color, vec3 lightDir, vec3 norm) {
 	float diff = max(dot(norm, lightDir), 0.0);
     return kd * diff * color;
@@ -56,44 +97,78 @@ float calc_attenuation(float d) {
     return 1.0 / (constant + linear * d + quadratic * d * d);
 }
 
+void add_light(Light light, vec3 viewDir, vec3 norm, inout vec3 diffuse, inout vec3 specular) {
+	// Precisamos da distância pra atenuação de qualquer forma, então nem usamos o normalize
+	vec3 vecToLight = light.position.xyz - v_fragPos;
+	float distToLight = length(vecToLight);
+	vec3 lightDir = vecToLight / distToLight;
+
+	// Atenuação aplicada em cada valor. Luzes com alcance explícito se apagam suavemente até ele.
+	float attenuation = calc_attenuation(distToLight);
+	if (light.position.w > 0.0) {
+		float window = clamp(1.0 - pow(distToLight / light.position.w, 4.0), 0.0, 1.0);
+		attenuation *= window * window;
+	}
+	diffuse += calc_diffuse(light.color.rgb, lightDir, norm) * attenuation;
+	specular += calc_specular(light.color.rgb, viewDir, lightDir, norm) * attenuation;
+}
+
+uint get_cluster_index() {
+	vec4 viewFragPos = view * vec4(v_fragPos, 1.0);
+	vec4 clipFragPos = projection * viewFragPos;
+	vec2 tile = (clipFragPos.xy / clipFragPos.w * 0.5 + 0.5) * vec2(clusterGrid.xy);
+	float slice = log(-viewFragPos.z / clusterDepth.x) * clusterDepth.y;
+	uvec3 cluster = uvec3(clamp(ivec3(tile, slice), ivec3(0), ivec3(clusterGrid.xyz) - 1));
+	return (cluster.z * clusterGrid.y + cluster.y) * clusterGrid.x + cluster.x;
+}
+
 void main(){
     vec4 texColor = texture(tex, v_uv);
 	texColor = vec4(texColor.rgb * colorMultiplier, texColor.a);
 	if (texColor.a < 0.9) discard;
 
-	// Não é ideal usar if ao invés de outro shader
-	if (!lit) {
-		fragColor = texColor;
-		return;
-	}
+#ifdef UNLIT
+	fragColor = texColor;
+	return;
+#endif
 
 	// Normalmente backfaces são descartados, mas por especificação do trabalho apenas ignoramos iluminação.
-	if (!gl_FrontFacing && !lightBackfaces) {
+	// LIT_BACKFACES ilumina ambas as faces do modelo (útil para grama e modelos de 1 face)
+#ifndef LIT_BACKFACES
+	if (!gl_FrontFacing) {
 		fragColor = texColor;
 		return;
 	}
+#endif
     
+	ka = materialKa.rgb * lightParamMultipliers.x;
+	kd = materialKd.rgb * lightParamMultipliers.y;
+	ks = materialKs.rgb * lightParamMultipliers.z;
+	ns = materialNs * lightParamMultipliers.w;
+
 	// Calculando reflexao difusa e especular
-	vec3 viewDir = normalize(viewPos - v_fragPos);
+	vec3 viewDir = normalize(viewPos.xyz - v_fragPos);
 	vec3 norm = normalize(v_normal);
 	vec3 diffuse = vec3(0.0);
 	vec3 specular = vec3(0.0);
-	for (int i = 0; i < MAX_LIGHTS; i++) {
-		if (i >= numLights) break;
-
-		// Precisamos da distância pra atenuação de qualquer forma, então nem usamos o normalize
-		Light light = lights[i];
-		vec3 vecToLight = light.position - v_fragPos;
-		float distToLight = length(vecToLight);
-		vec3 lightDir = vecToLight / distToLight;
-
-		// Atenuação aplicada em cada valor
-		float attenuation = calc_attenuation(distToLight);
-		diffuse += calc_diffuse(light.color, lightDir, norm) * attenuation;
-		specular += calc_specular(light.color, viewDir, lightDir, norm) * attenuation;
-	};
+#ifdef CLUSTERED
+	{
+		uvec2 cluster = clusters[get_cluster_index()];
+		uint groupMask = 1u << uint(lightGroup);
+		for (uint i = cluster.x; i < cluster.x + cluster.y; i++) {
+			ClusterLight light = clusterLights[lightIndices[i]];
+			if ((light.groups.x & groupMask) == 0u) continue;
+			float lightRange = light.color.w > 0.0 ? light.position.w : 0.0;
+			add_light(Light(vec4(light.position.xyz, lightRange), light.color), viewDir, norm, diffuse, specular);
+		}
+	}
+#else
+	for (int i = 0; i < LIGHT_COUNT; i++) {
+		add_light(lights[i], viewDir, norm, diffuse, specular);
+	}
+#endif
 	
 	// Aplicando o modelo de iluminacao
-	vec3 ambient = ka * ambientLightColor;
+	vec3 ambient = ka * ambientLightColor.rgb;
 	fragColor = vec4(texColor.rgb * (ambient + diffuse + specular), 1.0);
 }
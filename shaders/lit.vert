@@ -4,11 +4,20 @@
 layout(location = 0) in vec3 in_position;
 layout(location = 1) in vec2 in_uv;
 layout(location = 2) in vec3 in_normal;
+// Vem da instância
+layout(location = 3) in mat4 in_model;
+layout(location = 7) in mat4 in_mvp; // projection * view * model, calculada na CPU
+layout(location = 11) in mat3 in_normalMatrix; // inversa transposta da parte 3x3 de model, calculada na CPU
 
 // Recebe do programa
-uniform mat4 model;
-uniform mat4 view;
-uniform mat4 projection;
+// -- Dados do frame (std140, igual em lit.frag)
+layout(std140, binding = 0) uniform FrameBlock {
+	mat4 view;
+	mat4 projection;
+	vec4 viewPos; // posicao do observador/camera (xyz)
+	vec4 ambientLightColor; // (rgb)
+	vec4 lightParamMultipliers; // multiplicadores globais de ka, kd, ks e ns
+};
 
 // Vai pra fragment shader
 out vec2 v_uv;
@@ -16,9 +25,8 @@ out vec3 v_fragPos; //posicao do fragmento (i.e., posicao na superficie onde a i
 out vec3 v_normal;
 
 void main() {
-    gl_Position = projection * view * model * vec4(in_position, 1.0);
+	gl_Position = in_mvp * vec4(in_position, 1.0);
 	v_uv = in_uv;
-	v_fragPos = vec3(model * vec4(in_position, 1.0));
-	// Idealmente a matriz de normal é calculada na cpu e passada para o shader.
-	v_normal = normalize(mat3(transpose(inverse(model))) * in_normal); // descarta translacao e escala
+	v_fragPos = vec3(in_model * vec4(in_position, 1.0));
+	v_normal = normalize(in_normalMatrix * in_normal); // descarta translacao e escala
 }
@@ -0,0 +1,66 @@
+import threading
+import time
+
+class SimulationThread:
+    """
+    Roda a simulação de cada frame em uma thread separada, em paralelo com a renderização do frame anterior.
+
+    A cada frame, a thread do OpenGL chama run_frame(job): espera a simulação do frame anterior terminar,
+    inicia job (que simula os passos do frame e publica um SceneSnapshot) e retorna o resultado do job anterior.
+    Enquanto job altera o transform_store, o frame anterior é renderizado a partir do snapshot, que não muda.
+    A imagem fica um frame atrás da simulação.
+
+    Em Python, as duas threads só rodam de fato ao mesmo tempo enquanto uma delas está fora do GIL
+    (chamadas do OpenGL, operações do numpy, swap_buffers esperando o monitor).
+    """
+    def __init__(self):
+        self._job: callable = None
+        self._result = None
+        self._error: BaseException | None = None
+        self._running = True
+        self._start = threading.Event()
+        self._done = threading.Event()
+        self._done.set()
+        self.wait_time = 0.0
+        'Tempo que a thread do OpenGL esperou pela simulação no último run_frame, em segundos.'
+
+        self._thread = threading.Thread(target=self._run, name="Simulation", daemon=True)
+        self._thread.start()
+
+    def run_frame(self, job: callable):
+        """Espera o job anterior, inicia job em segundo plano e retorna o resultado do anterior (None na primeira chamada)."""
+        previous = self.wait()
+        self._job = job
+        self._done.clear()
+        self._start.set()
+        return previous
+
+    def wait(self):
+        """Espera o job atual terminar e retorna o seu resultado, relançando a exceção se ele falhou."""
+        start = time.perf_counter()
+        self._done.wait()
+        self.wait_time = time.perf_counter() - start
+        if self._error is not None:
+            error, self._error = self._error, None
+            raise error
+        return self._result
+
+    def stop(self) -> None:
+        """Espera o job atual e encerra a thread."""
+        self._done.wait()
+        self._running = False
+        self._start.set()
+        self._thread.join()
+
+    def _run(self) -> None:
+        while True:
+            self._start.wait()
+            self._start.clear()
+            if not self._running:
+                return
+            try:
+                self._result = self._job()
+            except BaseException as e:
+                self._error = e
+            finally:
+                self._done.set()
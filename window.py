@@ -5,11 +5,12 @@ class Window:
     """
     Classe que representa e configura a janela do glfw.
     """
-    def __init__(self, width: int, height: int, title: str, bg_color: tuple=(1.0, 1.0, 1.0, 1.0)):
+    def __init__(self, width: int, height: int, title: str, bg_color: tuple=(1.0, 1.0, 1.0, 1.0), vsync: bool = True):
         self.width = width
         self.height = height
         self.title = title
         self.bg_color = bg_color
+        self.vsync = vsync
         
         self._last_time = 0
         self.delta_time = 0
@@ -29,8 +30,8 @@ class Window:
         glfw.make_context_current(window)
         glfw.show_window(window)
 
-        # Limita a taxa de quadros para o deltaTime funcionar
-        glfw.swap_interval(1)
+        # Sincroniza com o monitor. A simulação usa passos fixos (ver Clock), então não depende da taxa de quadros.
+        glfw.swap_interval(1 if self.vsync else 0)
     
     def should_close(self) -> bool:
         return glfw.window_should_close(self.window)
@@ -57,6 +58,9 @@ class Window:
         glfw.swap_buffers(self.window)
         glfw.poll_events()
 
+    def close(self) -> None:
+        glfw.set_window_should_close(self.window, True)
+
     def destroy(self) -> None:
         glfw.destroy_window(self.window)
         glfw.terminate()
\ No newline at end of file